@@ -1,5 +1,7 @@
 """Chat API endpoints"""
+import asyncio
 import logging
+import time
 from typing import Optional, Dict, Any
 from fastapi import APIRouter, HTTPException, Body
 from fastapi.responses import StreamingResponse
@@ -9,8 +11,11 @@ import json
 
 from app.schemas.chat import StreamChatRequest
 from app.core.agent_factory import create_agent
-from app.core.config import load_agent_config, list_available_agents
+from app.core.config import load_agent_config, list_available_agents, AGENT_CONFIG_PATH
 from app.core.agent_config import AgentConfig
+from app.core.tracing import finish_trace, span, start_trace, tracer, use_trace
+from app.memory.executor import get_embedding_executor
+from app.memory.registry import registry_stats
 
 logger = logging.getLogger("api")
 agent_logger = logging.getLogger("agent")
@@ -47,6 +52,43 @@ def get_agent(config_path: str, use_tools: bool = False):
     return _agent_cache[cache_key]
 
 
+async def prewarm_agent(config_path: str = AGENT_CONFIG_PATH, use_tools: bool = False) -> Dict[str, float]:
+    """
+    Build and cache the agent, then run one embedding forward pass, so the
+    first request does not pay config parsing, prompt building or model loading
+    
+    Args:
+        config_path: Path to config file
+        use_tools: Whether to use tools
+        
+    Returns:
+        Timings in seconds (agent build, embedding warm-up)
+    """
+    start = time.perf_counter()
+    # Agent construction loads YAML, templates and possibly model weights; keep the loop free
+    agent = await asyncio.to_thread(get_agent, config_path, use_tools)
+    timings = {"agent_build": round(time.perf_counter() - start, 3)}
+    
+    memory = getattr(agent, 'memory', None)
+    if memory:
+        start = time.perf_counter()
+        await memory.embedding_model.aembed_texts(["warmup"], max_length=memory.max_length)
+        timings["embedding_warmup"] = round(time.perf_counter() - start, 3)
+    
+    agent_logger.info(f"Pre-warmed agent {config_path} (use_tools={use_tools}): {timings}")
+    return timings
+
+
+def close_agents():
+    """Close and drop all cached agents (flushes shared memory indexes)"""
+    for cache_key, agent in list(_agent_cache.items()):
+        try:
+            agent.close()
+        except Exception as e:
+            agent_logger.warning(f"Failed to close agent {cache_key}: {e}")
+    _agent_cache.clear()
+
+
 @router.post("/chat/stream")
 async def stream_chat_handler(request: StreamChatRequest):
     """
@@ -68,7 +110,10 @@ async def stream_chat_handler(request: StreamChatRequest):
         #     config_path = "configs/agent.yaml"
         
         # Single agent configuration
-        config_path = "configs/agent.yaml"
+        config_path = AGENT_CONFIG_PATH
+        
+        # Spans of this turn; finished when the stream ends
+        trace = start_trace("chat.turn", conversation_id=request.conversation_id)
         
         logger.info(
             f"Chat request - Conversation: {request.conversation_id}, "
@@ -77,37 +122,42 @@ async def stream_chat_handler(request: StreamChatRequest):
         
         # Get agent
         use_tools = request.use_tools if hasattr(request, 'use_tools') else False
-        agent = get_agent(config_path, use_tools=use_tools)
-        
-        agent_logger.info(
-            f"Processing message - Agent: {agent.agent_name}, "
-            f"Conversation: {request.conversation_id}"
-        )
+        with use_trace(trace):
+            with span("agent.lookup", use_tools=use_tools):
+                agent = get_agent(config_path, use_tools=use_tools)
+            
+            agent_logger.info(
+                f"Processing message - Agent: {agent.agent_name}, "
+                f"Conversation: {request.conversation_id}"
+            )
         
         # Process message
         async def generate():
-            try:
-                chunk_count = 0
-                async for chunk in agent.process_message(
-                    user_message=request.message,
-                    conversation_id=request.conversation_id
-                ):
-                    chunk_count += 1
-                    yield chunk
-                
-                agent_logger.info(
-                    f"Message processed - Agent: {agent.agent_name}, "
-                    f"Conversation: {request.conversation_id}, "
-                    f"Chunks: {chunk_count}"
-                )
-            except Exception as e:
-                agent_logger.error(
-                    f"Error in chat stream - Agent: {agent.agent_name}, "
-                    f"Conversation: {request.conversation_id}, "
-                    f"Error: {e}",
-                    exc_info=True
-                )
-                yield {"data": json.dumps({"error": "Đã xảy ra lỗi khi xử lý yêu cầu."})}
+            with use_trace(trace):
+                try:
+                    chunk_count = 0
+                    async for chunk in agent.process_message(
+                        user_message=request.message,
+                        conversation_id=request.conversation_id
+                    ):
+                        chunk_count += 1
+                        yield chunk
+                    
+                    agent_logger.info(
+                        f"Message processed - Agent: {agent.agent_name}, "
+                        f"Conversation: {request.conversation_id}, "
+                        f"Chunks: {chunk_count}"
+                    )
+                except Exception as e:
+                    agent_logger.error(
+                        f"Error in chat stream - Agent: {agent.agent_name}, "
+                        f"Conversation: {request.conversation_id}, "
+                        f"Error: {e}",
+                        exc_info=True
+                    )
+                    yield {"data": json.dumps({"error": "Đã xảy ra lỗi khi xử lý yêu cầu."})}
+                finally:
+                    finish_trace(trace)
         
         return EventSourceResponse(generate())
         
@@ -116,6 +166,106 @@ async def stream_chat_handler(request: StreamChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/memory/stats")
+async def get_memory_stats():
+    """
+    Get embedding executor stats (queue depth, running jobs, wait/run time)
+    per-agent memory stats (cases, index, micro-batching) and the shared
+    embedding model/memory registry (reference counts)
+    
+    Returns:
+        Memory statistics
+    """
+    agents = {
+        cache_key: agent.memory.stats()
+        for cache_key, agent in _agent_cache.items()
+        if getattr(agent, 'memory', None)
+    }
+    return {
+        "executor": get_embedding_executor().stats(),
+        "registry": registry_stats(),
+        "agents": agents
+    }
+
+
+@router.get("/conversations/stats")
+async def get_conversation_stats():
+    """
+    Get conversation store stats per cached agent
+    (conversation count, bytes, evictions, largest conversations)
+    
+    Returns:
+        Conversation store statistics
+    """
+    return {
+        "agents": {
+            cache_key: agent.conversations.stats()
+            for cache_key, agent in _agent_cache.items()
+        }
+    }
+
+
+@router.get("/response-cache/stats")
+async def get_response_cache_stats():
+    """
+    Get semantic response cache stats per cached agent
+    (size, hits, misses, bypasses by reason, evictions)
+    
+    Returns:
+        Response cache statistics
+    """
+    return {
+        "agents": {
+            cache_key: agent.response_cache.stats()
+            for cache_key, agent in _agent_cache.items()
+            if getattr(agent, 'response_cache', None)
+        }
+    }
+
+
+@router.get("/llm/stats")
+async def get_llm_stats():
+    """
+    Get LLM client stats per cached agent
+    (calls, attempts, retries by reason, hedges, latency percentiles,
+    rate limiter quota levels and queue wait percentiles)
+    
+    Returns:
+        LLM client statistics
+    """
+    return {
+        "agents": {
+            cache_key: agent.client.stats()
+            for cache_key, agent in _agent_cache.items()
+        }
+    }
+
+
+@router.get("/tracing/stats")
+async def get_tracing_stats():
+    """
+    Get per-stage latency of chat turns (count, mean, p50/p95/p99 in ms per span name)
+    
+    Returns:
+        Tracing statistics
+    """
+    return tracer.stats()
+
+
+@router.get("/tracing/recent")
+async def get_recent_traces(limit: int = 20):
+    """
+    Get the span breakdown of the most recent chat turns, newest first
+    
+    Args:
+        limit: Max traces to return
+        
+    Returns:
+        Recent traces
+    """
+    return {"traces": tracer.recent(limit)}
+
+
 @router.get("/agents")
 async def list_agents():
     """
@@ -186,7 +336,7 @@ async def reset_agent_conversation(agent_name: str, request_data: ResetRequest =
         conversation_id = request_data.conversation_id if request_data else None
         
         # Always use default agent config
-        config_path = "configs/agent.yaml"
+        config_path = AGENT_CONFIG_PATH
         agent = get_agent(config_path, use_tools=False)
         
         # Reset conversation
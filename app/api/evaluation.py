@@ -1,13 +1,15 @@
 """API endpoints for evaluation and comparison"""
+import asyncio
 import logging
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Body
-from pydantic import BaseModel
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Body, Query
+from pydantic import BaseModel, Field
 
-from app.core.config import load_agent_config
+from app.core.config import load_agent_config, AGENT_CONFIG_PATH
 from app.core.agent_factory import create_agent
 from app.evaluation.comparator import ResponseComparator
-from app.evaluation.metrics import EvaluationMetrics
+from app.evaluation.metrics import get_evaluation_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -20,30 +22,80 @@ class CompareRequest(BaseModel):
     conversation_id: Optional[str] = None
 
 
+class BatchCompareRequest(BaseModel):
+    """Request model for batch comparison"""
+    queries: List[str] = Field(..., min_length=1, max_length=200)
+    concurrency: int = Field(4, ge=1, le=32)
+
+
+# Agent pair (with / without memory) per config path, reused across comparisons
+_comparison_agents: Dict[str, Tuple[Any, Any]] = {}
+_comparison_agents_lock = asyncio.Lock()
+
+
+def _create_comparison_agents(config_path: str) -> Tuple[Any, Any]:
+    """Build one agent with memory and one without from the same config"""
+    config = load_agent_config(config_path)
+    
+    # Create agent with memory
+    config_with_memory = config.model_copy(deep=True)
+    config_with_memory.memory.enabled = True
+    agent_with_memory = create_agent(config=config_with_memory)
+    
+    # Create agent without memory
+    config_without_memory = config.model_copy(deep=True)
+    config_without_memory.memory.enabled = False
+    agent_without_memory = create_agent(config=config_without_memory)
+    
+    return agent_with_memory, agent_without_memory
+
+
+async def get_comparison_agents(config_path: str = AGENT_CONFIG_PATH) -> Tuple[Any, Any]:
+    """
+    Get or create the cached agent pair for a config
+    
+    Args:
+        config_path: Agent config file
+        
+    Returns:
+        (agent with memory, agent without memory)
+    """
+    agents = _comparison_agents.get(config_path)
+    if agents is None:
+        async with _comparison_agents_lock:
+            agents = _comparison_agents.get(config_path)
+            if agents is None:
+                # Loads the embedding model: keep it off the event loop
+                agents = await asyncio.to_thread(_create_comparison_agents, config_path)
+                _comparison_agents[config_path] = agents
+                logger.info(f"Created comparison agents for {config_path}")
+    return agents
+
+
+def close_comparison_agents():
+    """Close and drop the cached comparison agents"""
+    for config_path, agents in list(_comparison_agents.items()):
+        for agent in agents:
+            try:
+                agent.close()
+            except Exception as e:
+                logger.warning(f"Failed to close comparison agent {config_path}: {e}")
+    _comparison_agents.clear()
+
+
 @router.post("/compare")
 async def compare_with_without_memory(request: CompareRequest = Body(...)):
     """
     Compare agent responses with and without memory
     
-    This endpoint creates two agent instances:
+    Uses a cached pair of agents built from the same config:
     - One with memory enabled
     - One with memory disabled
     
-    Then compares their responses to the same query.
+    Both answer the same query concurrently, then their responses are compared.
     """
     try:
-        # Load config
-        config = load_agent_config('configs/agent.yaml')
-        
-        # Create agent with memory
-        config_with_memory = config.model_copy(deep=True)
-        config_with_memory.memory.enabled = True
-        agent_with_memory = create_agent(config=config_with_memory)
-        
-        # Create agent without memory
-        config_without_memory = config.model_copy(deep=True)
-        config_without_memory.memory.enabled = False
-        agent_without_memory = create_agent(config=config_without_memory)
+        agent_with_memory, agent_without_memory = await get_comparison_agents()
         
         # Compare responses
         comparator = ResponseComparator()
@@ -64,23 +116,80 @@ async def compare_with_without_memory(request: CompareRequest = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/compare/batch")
+async def compare_batch(request: BatchCompareRequest = Body(...)):
+    """
+    Compare a list of queries with and without memory
+    
+    At most `concurrency` queries are compared at a time; returns per-query
+    results and aggregate latency deltas.
+    """
+    try:
+        agent_with_memory, agent_without_memory = await get_comparison_agents()
+        
+        comparator = ResponseComparator()
+        batch = await comparator.compare_batch(
+            agent_with_memory=agent_with_memory,
+            agent_without_memory=agent_without_memory,
+            queries=request.queries,
+            concurrency=request.concurrency
+        )
+        
+        return {
+            "success": True,
+            **batch
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in batch comparison: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/statistics")
-async def get_evaluation_statistics():
+async def get_evaluation_statistics(
+    window_minutes: Optional[float] = Query(None, gt=0, description="Only metrics from the last N minutes")
+):
     """
     Get evaluation statistics from logged metrics
     """
     try:
-        metrics = EvaluationMetrics()
-        stats = metrics.get_statistics()
+        metrics = get_evaluation_metrics()
+        since = time.time() - window_minutes * 60 if window_minutes else None
+        # Flushes queued metrics and reads the file tail: keep it off the event loop
+        stats = await asyncio.to_thread(metrics.get_statistics, since)
         return {
             "success": True,
-            "statistics": stats
+            "statistics": stats,
+            "writer": metrics.writer.stats(),
+            "aggregates": metrics.aggregator.stats()
         }
     except Exception as e:
         logger.error(f"Error getting statistics: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/statistics/timeseries")
+async def get_evaluation_timeseries(
+    window_minutes: float = Query(60, gt=0, description="Time range to return"),
+    bucket_seconds: int = Query(60, gt=0, description="Bucket size (multiple of the stored 60s buckets)")
+):
+    """
+    Get metric counts and response time quantiles per time bucket
+    """
+    try:
+        metrics = get_evaluation_metrics()
+        since = time.time() - window_minutes * 60
+        series = await asyncio.to_thread(metrics.get_timeseries, since, None, bucket_seconds)
+        return {
+            "success": True,
+            "bucket_seconds": max(bucket_seconds // metrics.aggregator.bucket_seconds, 1) * metrics.aggregator.bucket_seconds,
+            "buckets": series
+        }
+    except Exception as e:
+        logger.error(f"Error getting timeseries: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/log-response")
 async def log_response(
     has_memory: bool = Body(...),
@@ -93,7 +202,7 @@ async def log_response(
     Manually log a response for evaluation
     """
     try:
-        metrics = EvaluationMetrics()
+        metrics = get_evaluation_metrics()
         metrics.log_response(
             query=query,
             response=response,
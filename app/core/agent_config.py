@@ -9,6 +9,7 @@ class ToolConfig(BaseModel):
     description: str
     handler: str  # Path to handler function
     parameters: Dict[str, Any]
+    timeout: Optional[float] = None  # Max seconds per call (None = no limit)
 
 
 class MemoryConfig(BaseModel):
@@ -20,9 +21,33 @@ class MemoryConfig(BaseModel):
     storage_type: str = "jsonl"  # database or jsonl
     storage_path: str = "memory/cases.jsonl"  # Path to JSONL file
     device: str = "auto"  # auto, cpu, cuda
+    embedding_backend: str = "torch"  # torch (fp32), torch_int8 (dynamic quantization, CPU), onnx (requires onnxruntime, CPU)
+    embedding_threads: int = 0  # Intra-op threads for embedding inference (0 = library default)
+    embedding_min_cosine: float = 0.98  # Non-torch backends must match fp32 within this cosine, else torch is used
+    onnx_dir: str = "memory/onnx"  # Where exported ONNX embedding models are cached
     filter_negative: bool = True  # Filter out negative cases (reward=0) when retrieving
     include_negative_examples: bool = False  # Include negative examples in prompt (if not filtered)
     max_negative_examples: int = 2  # Max negative examples to show
+    index_type: str = "flat"  # flat (exact), ivf (pure NumPy), hnsw (requires faiss-cpu)
+    ivf_nlist: int = 0  # IVF clusters (0 = auto, 4 * sqrt(cases))
+    ivf_nprobe: int = 16  # IVF clusters scanned per query (higher = better recall, slower)
+    hnsw_m: int = 32  # HNSW graph degree
+    hnsw_ef_construction: int = 80  # HNSW build-time candidate list size
+    hnsw_ef_search: int = 64  # HNSW query-time candidate list size (higher = better recall, slower)
+    executor_workers: int = 2  # Threads for embedding/retrieval off the event loop (concurrency limit)
+    batch_max_wait_ms: float = 2.0  # Micro-batch window for concurrent query embeddings (0 disables)
+    batch_max_size: int = 64  # Max queries embedded in one micro-batch
+    query_cache_size: int = 1024  # Query embeddings cached by normalized text (0 disables)
+    result_cache_size: int = 1024  # Top-k result lists cached until the next new case (0 disables)
+
+
+class ProviderConfig(BaseModel):
+    """OpenAI-compatible endpoint the provider router can send requests to"""
+    name: str
+    provider: str = "openai"  # openai, gemini, anthropic (sets the default base_url and API key variable)
+    base_url: Optional[str] = None  # e.g. http://localhost:8000/v1 for a local vLLM
+    model_name: Optional[str] = None  # Defaults to model.model_name
+    api_key_env: Optional[str] = None  # Env var holding the API key (defaults per provider, e.g. OPENAI_API_KEY)
 
 
 class ModelConfig(BaseModel):
@@ -31,12 +56,50 @@ class ModelConfig(BaseModel):
     model_name: str = "gpt-4o-mini"  # gpt-4.1-mini or gpt-4o-mini
     temperature: float = 0.7
     max_tokens: Optional[int] = 2000
+    base_url: Optional[str] = None  # OpenAI-compatible endpoint (e.g. local vLLM); defaults to OPENAI_BASE_URL
+    timeout: float = 60.0  # Per-attempt read/write timeout in seconds (streams: max gap between chunks)
+    connect_timeout: float = 5.0  # Connection timeout in seconds
+    max_retries: int = 2  # Extra attempts on connection errors, timeouts, 408/409/429/5xx
+    retry_base_delay: float = 0.5  # First retry backoff in seconds (doubles per attempt, jittered)
+    retry_max_delay: float = 8.0  # Retry backoff cap in seconds
+    max_connections: int = 100  # Shared HTTP connection pool size
+    max_keepalive_connections: int = 20  # Idle connections kept in the shared pool
+    hedge_requests: bool = False  # Send a duplicate request when the first is slower than the hedge delay
+    hedge_delay_ms: Optional[float] = None  # Hedge delay (None = observed p95 time to first chunk)
+    rate_limit: bool = False  # Queue LLM calls on a client-side RPM/TPM limiter (per conversation, round-robin)
+    rate_limit_rpm: int = 500  # Initial requests per minute; corrected from x-ratelimit-* response headers
+    rate_limit_tpm: int = 200000  # Initial tokens per minute (prompt + max_tokens); corrected from headers
+    stream_usage: bool = True  # Ask for usage on streams (prompt and cached_tokens, for prompt cache hit rate)
+    providers: List[ProviderConfig] = Field(default_factory=list)  # Route across these endpoints (empty = single client from the fields above)
+    router_ewma_alpha: float = 0.2  # Weight of the newest sample in a provider's latency/error averages
+    router_error_penalty_s: float = 5.0  # Seconds added to a provider's score per unit of error rate
+    router_failure_threshold: int = 3  # Consecutive failures before a provider is cooled down
+    router_cooldown_s: float = 30.0  # Cooled-down providers are only used when all others fail
+    router_explore_rate: float = 0.05  # Fraction of requests sent to a random provider to refresh its latency
 
 
 class ConversationConfig(BaseModel):
     """Conversation configuration schema"""
     max_steps: int = 4
     enable_memory_injection: bool = True
+    max_parallel_tools: int = 4  # Max tool calls executing at once per agent
+    store: str = "memory"  # Conversation store backend
+    max_conversations: int = 1000  # Least recently used conversations beyond this are evicted
+    conversation_ttl_seconds: Optional[float] = 3600  # Drop conversations idle this long (None = never)
+    max_turns: Optional[int] = None  # Turns kept per conversation (None = unlimited)
+    max_prompt_tokens: Optional[int] = None  # System prompt + tools + history budget; oldest turns are trimmed (None = unlimited)
+    min_history_tokens: int = 2000  # History budget floor when the system prompt alone nears max_prompt_tokens
+    trim_to_fraction: float = 0.75  # Over max_turns/max_prompt_tokens, drop oldest turns down to this fraction (keeps the cached prefix stable between trims)
+
+
+class ResponseCacheConfig(BaseModel):
+    """Semantic response cache schema (stateless first turns only)"""
+    enabled: bool = False
+    similarity_threshold: float = 0.95  # Min query cosine similarity to reuse a response
+    ttl_seconds: Optional[float] = 3600  # Cached responses expire after this (None = never)
+    max_size: int = 1000  # Max cached responses per agent (oldest dropped first)
+    max_query_chars: int = 200  # Longer messages bypass the cache
+    bypass_patterns: List[str] = Field(default_factory=lambda: [r"\d"])  # Regexes; matching messages bypass the cache (default: any digit - dates, times, phones, seat counts)
 
 
 class AgentConfig(BaseModel):
@@ -46,6 +109,7 @@ class AgentConfig(BaseModel):
     memory: MemoryConfig = Field(default_factory=MemoryConfig)
     model: ModelConfig = Field(default_factory=ModelConfig)
     conversation: ConversationConfig = Field(default_factory=ConversationConfig)
+    response_cache: ResponseCacheConfig = Field(default_factory=ResponseCacheConfig)
 
     class Config:
         extra = "allow"  # Allow extra fields for flexibility
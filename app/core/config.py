@@ -11,9 +11,23 @@ load_dotenv()
 
 # Environment variables
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Optional OpenAI-compatible endpoint
 DATABASE_URL = os.getenv("DATABASE_URL")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 PORT = int(os.getenv("PORT", "8000"))
+AGENT_CONFIG_PATH = os.getenv("AGENT_CONFIG_PATH", "configs/agent.yaml")
+# Build the agent and warm the embedding model at startup instead of on the first request
+PREWARM_AGENT = os.getenv("PREWARM_AGENT", "false").lower() in ("1", "true", "yes")
+# Per-request span timing (see /api/tracing/stats); OpenTelemetry export needs opentelemetry-api + an SDK/exporter
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACING_OTEL_EXPORT = os.getenv("TRACING_OTEL_EXPORT", "false").lower() in ("1", "true", "yes")
+TRACING_RECENT = int(os.getenv("TRACING_RECENT", "100"))  # Finished traces kept for /api/tracing/recent
+# Background evaluation metrics writer (queue/drop counters in /api/evaluation/statistics)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "1.0"))  # Max seconds a record waits before being written
+METRICS_MAX_BATCH = int(os.getenv("METRICS_MAX_BATCH", "256"))  # Records per write; a full batch is written right away
+METRICS_MAX_QUEUE = int(os.getenv("METRICS_MAX_QUEUE", "10000"))  # Max queued records (memory bound)
+METRICS_OVERFLOW = os.getenv("METRICS_OVERFLOW", "drop_oldest")  # drop_oldest, drop_newest or block when the queue is full
+METRICS_BLOCK_TIMEOUT = float(os.getenv("METRICS_BLOCK_TIMEOUT", "1.0"))  # Max seconds a blocked caller waits (overflow=block)
 
 
 def load_agent_config(config_path: str) -> AgentConfig:
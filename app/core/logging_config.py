@@ -6,6 +6,7 @@ from logging.handlers import RotatingFileHandler
 from typing import Optional
 
 from app.core.config import LOG_LEVEL
+from app.core.tracing import TraceContextFilter
 
 
 def setup_logging(
@@ -34,7 +35,7 @@ def setup_logging(
     
     # Create formatters
     detailed_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        '%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s %(span)s] %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
@@ -43,9 +44,13 @@ def setup_logging(
         datefmt='%Y-%m-%d %H:%M:%S'
     )
     
+    # Adds trace_id / span of the current request to every record
+    trace_filter = TraceContextFilter()
+    
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
+    console_handler.addFilter(trace_filter)
     console_handler.setFormatter(simple_formatter)
     root_logger.addHandler(console_handler)
     
@@ -58,6 +63,7 @@ def setup_logging(
         backupCount=5
     )
     app_handler.setLevel(level)
+    app_handler.addFilter(trace_filter)
     app_handler.setFormatter(detailed_formatter)
     root_logger.addHandler(app_handler)
     
@@ -69,6 +75,7 @@ def setup_logging(
         backupCount=5
     )
     api_handler.setLevel(logging.INFO)
+    api_handler.addFilter(trace_filter)
     api_handler.setFormatter(detailed_formatter)
     
     api_logger = logging.getLogger("api")
@@ -83,6 +90,7 @@ def setup_logging(
         backupCount=5
     )
     agent_handler.setLevel(logging.INFO)
+    agent_handler.addFilter(trace_filter)
     agent_handler.setFormatter(detailed_formatter)
     
     agent_logger = logging.getLogger("agent")
@@ -97,6 +105,7 @@ def setup_logging(
         backupCount=5
     )
     error_handler.setLevel(logging.ERROR)
+    error_handler.addFilter(trace_filter)
     error_handler.setFormatter(detailed_formatter)
     root_logger.addHandler(error_handler)
     
@@ -0,0 +1,111 @@
+"""Streaming statistics: running totals and mergeable quantile sketches"""
+import math
+from typing import Any, Dict, Optional
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error (log-spaced bins)
+
+    Each value lands in bin ceil(log_gamma(x)); any quantile is answered
+    within `relative_accuracy` of the true value, using a few hundred bins
+    for latencies from milliseconds to minutes.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float):
+        if value <= 1e-9:
+            self.zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+
+    def merge(self, other: "QuantileSketch"):
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile q (0..1), None if empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint of the bin (gamma^(k-1), gamma^k]
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"a": self.relative_accuracy, "z": self.zero_count, "b": {str(k): c for k, c in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["a"])
+        sketch.zero_count = data["z"]
+        sketch.bins = {int(k): c for k, c in data["b"].items()}
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        return sketch
+
+
+class RunningStats:
+    """Count, sum, min, max and a quantile sketch of one measurement"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.sketch = QuantileSketch()
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.sketch.add(value)
+
+    def merge(self, other: "RunningStats"):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.sketch.merge(other.sketch)
+
+    def summary(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 3),
+            "min": round(self.min, 3),
+            "max": round(self.max, 3),
+            "p50": round(self.sketch.quantile(0.5), 3),
+            "p95": round(self.sketch.quantile(0.95), 3),
+            "p99": round(self.sketch.quantile(0.99), 3),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"n": self.count, "t": self.total, "lo": self.min, "hi": self.max, "s": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningStats":
+        stats = cls()
+        stats.count, stats.total, stats.min, stats.max = data["n"], data["t"], data["lo"], data["hi"]
+        stats.sketch = QuantileSketch.from_dict(data["s"])
+        return stats
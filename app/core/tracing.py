@@ -0,0 +1,266 @@
+"""Lightweight in-process tracer: per-request spans via contextvars, aggregate stats, optional OpenTelemetry export"""
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from app.core.config import TRACING_ENABLED, TRACING_OTEL_EXPORT, TRACING_RECENT
+from app.core.stats import RunningStats
+
+logger = logging.getLogger(__name__)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    """One timed stage of a trace (perf_counter seconds)"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], start: float, attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start = start
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+
+class Trace:
+    """Spans of one request (e.g. a chat turn)"""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.start_ns = time.time_ns()  # Wall clock anchor for exporting
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "duration_ms": round(self.duration * 1000, 3),
+            "spans": [
+                {
+                    "name": s.name,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "offset_ms": round((s.start - self.start) * 1000, 3),
+                    "duration_ms": round(s.duration * 1000, 3),
+                    **({"attributes": s.attributes} if s.attributes else {}),
+                }
+                for s in sorted(self.spans, key=lambda s: s.start)
+            ],
+        }
+
+
+class Tracer:
+    """Collects finished traces: per-span-name duration stats and the most recent traces"""
+
+    def __init__(self, recent: int = 100, otel_export: bool = False):
+        """
+        Initialize tracer
+
+        Args:
+            recent: Finished traces kept for inspection
+            otel_export: Replay finished traces into OpenTelemetry (if installed)
+        """
+        self._lock = threading.Lock()
+        self._durations: Dict[str, RunningStats] = {}
+        self._recent: Deque[Trace] = deque(maxlen=recent)
+        self._traces = 0
+        self.otel_export = otel_export
+        self._otel_tracer = None
+
+    def finish(self, trace: Trace):
+        """Record a finished trace and log its breakdown"""
+        trace.end = time.perf_counter()
+        with self._lock:
+            self._traces += 1
+            self._recent.append(trace)
+            self._durations.setdefault(trace.name, RunningStats()).add(trace.duration * 1000)
+            for s in trace.spans:
+                self._durations.setdefault(s.name, RunningStats()).add(s.duration * 1000)
+        logger.info(
+            f"Trace {trace.name} {trace.trace_id[:8]} {trace.duration * 1000:.1f}ms: "
+            + ", ".join(f"{s.name}={s.duration * 1000:.1f}ms" for s in sorted(trace.spans, key=lambda s: s.start))
+        )
+        if self.otel_export:
+            self._export_otel(trace)
+
+    def _export_otel(self, trace: Trace):
+        """Replay a finished trace as OpenTelemetry spans with the recorded timestamps"""
+        if self._otel_tracer is None:
+            try:
+                from opentelemetry import trace as otel_trace
+            except ImportError:
+                logger.warning("TRACING_OTEL_EXPORT is set but opentelemetry-api is not installed; export disabled")
+                self.otel_export = False
+                return
+            self._otel_tracer = otel_trace.get_tracer("bot_nhaXe")
+        from opentelemetry import trace as otel_trace
+
+        def ns(t: float) -> int:
+            return trace.start_ns + int((t - trace.start) * 1e9)
+
+        def attrs(values: Dict[str, Any]) -> Dict[str, Any]:
+            return {k: v if isinstance(v, (str, bool, int, float)) else str(v) for k, v in values.items() if v is not None}
+
+        try:
+            root = self._otel_tracer.start_span(trace.name, start_time=trace.start_ns, attributes=attrs(trace.attributes))
+            contexts = {None: otel_trace.set_span_in_context(root)}
+            # Parents start no later (and end no earlier) than their children
+            for s in sorted(trace.spans, key=lambda s: (s.start, -(s.end or 0))):
+                parent = contexts.get(s.parent_id, contexts[None])
+                otel_span = self._otel_tracer.start_span(
+                    s.name, context=parent, start_time=ns(s.start), attributes=attrs(s.attributes)
+                )
+                contexts[s.span_id] = otel_trace.set_span_in_context(otel_span)
+                otel_span.end(end_time=ns(s.end))
+            root.end(end_time=ns(trace.end))
+        except Exception as e:
+            logger.warning(f"OpenTelemetry export failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get duration stats (ms) per trace/span name"""
+        with self._lock:
+            return {
+                "traces": self._traces,
+                "spans": {name: stats.summary() for name, stats in sorted(self._durations.items())},
+            }
+
+    def recent(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the most recent finished traces, newest first"""
+        with self._lock:
+            traces = list(self._recent)[-limit:]
+        return [t.to_dict() for t in reversed(traces)]
+
+    def reset(self):
+        """Clear collected stats and recent traces"""
+        with self._lock:
+            self._durations.clear()
+            self._recent.clear()
+            self._traces = 0
+
+
+tracer = Tracer(recent=TRACING_RECENT, otel_export=TRACING_OTEL_EXPORT)
+
+
+def start_trace(name: str, **attributes) -> Optional[Trace]:
+    """
+    Start a trace (None when tracing is disabled)
+
+    Activate it with use_trace() where its spans run and end it with finish_trace().
+    """
+    if not TRACING_ENABLED:
+        return None
+    return Trace(name, attributes)
+
+
+@contextmanager
+def use_trace(trace: Optional[Trace]) -> Iterator[Optional[Trace]]:
+    """Make a trace current for spans and log records in this context"""
+    if trace is None:
+        yield None
+        return
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        try:
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+        except ValueError:
+            # Exited from another context (async generator closed elsewhere)
+            _current_span.set(None)
+            _current_trace.set(None)
+
+
+def finish_trace(trace: Optional[Trace]):
+    """End a trace and hand it to the tracer (once)"""
+    if trace is not None and trace.end is None:
+        tracer.finish(trace)
+
+
+@contextmanager
+def traced(name: str, **attributes) -> Iterator[Optional[Trace]]:
+    """Start, activate and finish a trace around a block"""
+    trace = start_trace(name, **attributes)
+    try:
+        with use_trace(trace):
+            yield trace
+    finally:
+        finish_trace(trace)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """
+    Time a block as a child of the current span (no-op outside a trace)
+
+    Don't yield from an async generator inside the block: the span would
+    stay current for the consumer's code until the generator resumes.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, time.perf_counter(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = type(e).__name__
+        raise
+    finally:
+        current.end = time.perf_counter()
+        trace.spans.append(current)
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            _current_span.set(parent)
+
+
+def record_span(name: str, duration: float, **attributes):
+    """Record a stage timed elsewhere (seconds), ending now, under the current span"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    end = time.perf_counter()
+    recorded = Span(name, parent.span_id if parent else None, end - duration, attributes)
+    recorded.end = end
+    trace.spans.append(recorded)
+
+
+class TraceContextFilter(logging.Filter):
+    """Add trace_id and span (current span name) to every log record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        trace = _current_trace.get()
+        current = _current_span.get()
+        record.trace_id = trace.trace_id[:8] if trace else "-"
+        record.span = current.name if current else "-"
+        return True
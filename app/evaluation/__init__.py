@@ -1,6 +1,8 @@
 """Evaluation module for measuring memory effectiveness"""
-from app.evaluation.metrics import EvaluationMetrics
+from app.evaluation.metrics import EvaluationMetrics, get_evaluation_metrics
+from app.evaluation.metrics_writer import MetricsWriter
+from app.evaluation.aggregates import MetricsAggregator
 from app.evaluation.comparator import ResponseComparator
 
-__all__ = ["EvaluationMetrics", "ResponseComparator"]
+__all__ = ["EvaluationMetrics", "get_evaluation_metrics", "MetricsWriter", "MetricsAggregator", "ResponseComparator"]
 
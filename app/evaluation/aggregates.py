@@ -0,0 +1,366 @@
+"""Incremental aggregates over the metrics JSONL: running totals, quantile sketches, time buckets"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.core.stats import QuantileSketch, RunningStats
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+# Bytes read per chunk when scanning the file tail
+SCAN_CHUNK = 1 << 20
+
+
+# Response time series kept per rollup
+TIMINGS = ("with_memory", "without_memory", "comparison_with_memory", "comparison_without_memory")
+
+
+class Rollup:
+    """Aggregates of a set of metric records (everything, or one time bucket)"""
+
+    def __init__(self):
+        self.comparisons = 0
+        self.with_memory = 0
+        self.without_memory = 0
+        # Sums behind the comparison averages
+        self.sums = {"time_with": 0.0, "time_without": 0.0, "length_with": 0.0, "length_without": 0.0}
+        self.response_time = {name: RunningStats() for name in TIMINGS}
+
+    def add(self, metric: Dict[str, Any]):
+        """Add one record (same classification as the full-file scan it replaces)"""
+        if "response_with_memory" in metric:
+            self.comparisons += 1
+            time_with = metric.get("response_time_with_memory", 0) or 0
+            time_without = metric.get("response_time_without_memory", 0) or 0
+            self.sums["time_with"] += time_with
+            self.sums["time_without"] += time_without
+            self.sums["length_with"] += metric.get("response_length_with_memory", 0)
+            self.sums["length_without"] += metric.get("response_length_without_memory", 0)
+            if metric.get("response_time_with_memory") is not None:
+                self.response_time["comparison_with_memory"].add(time_with)
+            if metric.get("response_time_without_memory") is not None:
+                self.response_time["comparison_without_memory"].add(time_without)
+        else:
+            name = "with_memory" if metric.get("has_memory") else "without_memory"
+            setattr(self, name, getattr(self, name) + 1)
+            if metric.get("response_time") is not None:
+                self.response_time[name].add(metric["response_time"])
+
+    def merge(self, other: "Rollup"):
+        self.comparisons += other.comparisons
+        self.with_memory += other.with_memory
+        self.without_memory += other.without_memory
+        for key, value in other.sums.items():
+            self.sums[key] += value
+        for name in TIMINGS:
+            self.response_time[name].merge(other.response_time[name])
+
+    def summary(self) -> Dict[str, Any]:
+        """Statistics in the /api/evaluation/statistics shape, plus response time quantiles"""
+        stats: Dict[str, Any] = {
+            "total_comparisons": self.comparisons,
+            "total_with_memory": self.with_memory,
+            "total_without_memory": self.without_memory,
+            "total_metrics": self.comparisons + self.with_memory + self.without_memory,
+        }
+        if self.comparisons:
+            n = self.comparisons
+            avg_time_with = self.sums["time_with"] / n
+            avg_time_without = self.sums["time_without"] / n
+            avg_length_with = self.sums["length_with"] / n
+            avg_length_without = self.sums["length_without"] / n
+            stats["comparison_stats"] = {
+                "avg_response_time_with_memory": round(avg_time_with, 3),
+                "avg_response_time_without_memory": round(avg_time_without, 3),
+                "avg_response_length_with_memory": round(avg_length_with, 1),
+                "avg_response_length_without_memory": round(avg_length_without, 1),
+                "time_difference": round(avg_time_with - avg_time_without, 3),
+                "length_difference": round(avg_length_with - avg_length_without, 1),
+            }
+        stats["response_time"] = {
+            name: running.summary() for name, running in self.response_time.items() if running.count
+        }
+        return stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "c": self.comparisons, "w": self.with_memory, "wo": self.without_memory, "sums": self.sums,
+            "rt": {name: running.to_dict() for name, running in self.response_time.items() if running.count},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Rollup":
+        rollup = cls()
+        rollup.comparisons, rollup.with_memory, rollup.without_memory = data["c"], data["w"], data["wo"]
+        rollup.sums.update(data["sums"])
+        for name, running in data["rt"].items():
+            rollup.response_time[name] = RunningStats.from_dict(running)
+        return rollup
+
+
+def _record_time(metric: Dict[str, Any]) -> Optional[float]:
+    """Epoch seconds of a record's (local, ISO) timestamp"""
+    try:
+        return datetime.fromisoformat(metric["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class MetricsAggregator:
+    """
+    Running statistics over a metrics JSONL file
+
+    Records are added as the metrics writer appends them; anything else in
+    the file (other processes, records from before startup) is picked up by
+    scanning from the last processed byte offset. The aggregates and that
+    offset are checkpointed next to the file, so after a restart only the
+    tail written since the checkpoint is parsed. Per-bucket rollups (one
+    per `bucket_seconds`) answer windowed queries.
+    """
+
+    def __init__(
+        self,
+        metrics_path: str,
+        bucket_seconds: int = 60,
+        max_buckets: int = 7 * 24 * 60,
+        checkpoint_interval: float = 30.0
+    ):
+        """
+        Initialize aggregator from its checkpoint (if valid)
+
+        Args:
+            metrics_path: Metrics JSONL file
+            bucket_seconds: Time bucket size for windowed rollups
+            max_buckets: Buckets kept (oldest dropped; default 7 days of minutes)
+            checkpoint_interval: Min seconds between checkpoint writes
+        """
+        self.metrics_path = metrics_path
+        self.checkpoint_path = f"{metrics_path}.stats.json"
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.RLock()
+        self._reset()
+        self._last_checkpoint = time.monotonic()
+        self._load_checkpoint()
+
+    def _reset(self):
+        self.offset = 0
+        self.file_id: Optional[List[int]] = None
+        self.totals = Rollup()
+        self.buckets: Dict[int, Rollup] = {}
+        self.scanned_bytes = 0
+        self._dirty = False
+
+    def _file_id(self) -> Optional[List[int]]:
+        """(device, inode) of the metrics file, to detect replacement"""
+        try:
+            stat = os.stat(self.metrics_path)
+        except FileNotFoundError:
+            return None
+        return [stat.st_dev, stat.st_ino]
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CHECKPOINT_VERSION or data.get("bucket_seconds") != self.bucket_seconds:
+                return
+            self.offset = data["offset"]
+            self.file_id = data["file_id"]
+            self.totals = Rollup.from_dict(data["totals"])
+            self.buckets = {int(k): Rollup.from_dict(v) for k, v in data["buckets"].items()}
+            logger.info(f"Metrics aggregates restored from checkpoint at offset {self.offset}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable metrics checkpoint {self.checkpoint_path}: {e}")
+            self._reset()
+
+    def checkpoint(self):
+        """Persist aggregates and the processed offset (atomic replace)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": CHECKPOINT_VERSION,
+                "bucket_seconds": self.bucket_seconds,
+                "offset": self.offset,
+                "file_id": self.file_id,
+                "totals": self.totals.to_dict(),
+                "buckets": {str(k): v.to_dict() for k, v in self.buckets.items()},
+            }
+            self._dirty = False
+            self._last_checkpoint = time.monotonic()
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.checkpoint_path)
+        except Exception as e:
+            logger.error(f"Error writing metrics checkpoint: {e}", exc_info=True)
+
+    def _add(self, metric: Dict[str, Any]):
+        self.totals.add(metric)
+        timestamp = _record_time(metric)
+        if timestamp is None:
+            return
+        start = int(timestamp // self.bucket_seconds * self.bucket_seconds)
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = Rollup()
+            if len(self.buckets) > self.max_buckets:
+                for old in sorted(self.buckets)[:len(self.buckets) - self.max_buckets]:
+                    del self.buckets[old]
+        bucket.add(metric)
+
+    def on_batch_written(self, records: Iterable[Dict[str, Any]], start_offset: int, end_offset: int):
+        """
+        Add records the metrics writer just appended at [start_offset, end_offset)
+
+        Skipped if other bytes precede them unprocessed; refresh() then reads
+        them from the file in order.
+        """
+        with self._lock:
+            if start_offset != self.offset or self.file_id is None and start_offset != 0:
+                return
+            if self.file_id is None:
+                self.file_id = self._file_id()
+            for record in records:
+                self._add(record)
+            self.offset = end_offset
+            self._dirty = True
+            due = time.monotonic() - self._last_checkpoint >= self.checkpoint_interval
+        if due:
+            self.checkpoint()
+
+    def refresh(self):
+        """Scan records appended since the processed offset (whole file if it was replaced or truncated)"""
+        with self._lock:
+            file_id = self._file_id()
+            if file_id is None:
+                if self.offset:
+                    self._reset()
+                return
+            size = os.path.getsize(self.metrics_path)
+            if file_id != self.file_id or size < self.offset:
+                if self.file_id is not None:
+                    logger.info("Metrics file replaced or truncated, rebuilding aggregates")
+                self._reset()
+                self.file_id = file_id
+            if size == self.offset:
+                return
+            with open(self.metrics_path, "rb") as f:
+                f.seek(self.offset)
+                pending = b""
+                while True:
+                    chunk = f.read(SCAN_CHUNK)
+                    if not chunk:
+                        break
+                    lines = (pending + chunk).split(b"\n")
+                    pending = lines.pop()  # Incomplete last line: wait for the rest
+                    for line in lines:
+                        self.offset += len(line) + 1
+                        self.scanned_bytes += len(line) + 1
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            self._add(json.loads(line))
+                        except (json.JSONDecodeError, UnicodeDecodeError):
+                            continue
+            self._dirty = True
+        self.checkpoint()
+
+    def statistics(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Get statistics for all records, or for records in [since, until)
+
+        Args:
+            since: Window start (epoch seconds, rounded down to a bucket)
+            until: Window end (epoch seconds; default now)
+
+        Returns:
+            Statistics dictionary
+        """
+        with self._lock:
+            if since is None and until is None:
+                return self.totals.summary()
+            rollup = Rollup()
+            for start, bucket in self.buckets.items():
+                if (since is None or start + self.bucket_seconds > since) and (until is None or start < until):
+                    rollup.merge(bucket)
+        stats = rollup.summary()
+        stats["window"] = {
+            "since": datetime.fromtimestamp(since).isoformat() if since is not None else None,
+            "until": datetime.fromtimestamp(until).isoformat() if until is not None else None,
+        }
+        return stats
+
+    def timeseries(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        bucket_seconds: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-bucket counts and response time quantiles
+
+        Args:
+            since: Window start (epoch seconds)
+            until: Window end (epoch seconds)
+            bucket_seconds: Output bucket size (multiple of the stored size; default the stored size)
+
+        Returns:
+            One entry per non-empty bucket, oldest first
+        """
+        size = max(self.bucket_seconds, (bucket_seconds or self.bucket_seconds) // self.bucket_seconds * self.bucket_seconds)
+        with self._lock:
+            merged: Dict[int, Rollup] = {}
+            for start, bucket in self.buckets.items():
+                if (since is not None and start + self.bucket_seconds <= since) or (until is not None and start >= until):
+                    continue
+                merged.setdefault(start // size * size, Rollup()).merge(bucket)
+        series = []
+        for start in sorted(merged):
+            summary = merged[start].summary()
+            series.append({
+                "start": datetime.fromtimestamp(start).isoformat(),
+                "total_metrics": summary["total_metrics"],
+                "total_comparisons": summary["total_comparisons"],
+                "total_with_memory": summary["total_with_memory"],
+                "total_without_memory": summary["total_without_memory"],
+                "response_time": summary["response_time"],
+            })
+        return series
+
+    def stats(self) -> Dict[str, Any]:
+        """Get offset, bucket count and bytes scanned from the file"""
+        with self._lock:
+            return {
+                "offset": self.offset,
+                "buckets": len(self.buckets),
+                "bucket_seconds": self.bucket_seconds,
+                "scanned_bytes": self.scanned_bytes,
+                "checkpoint_path": self.checkpoint_path,
+            }
+
+
+_aggregators: Dict[str, MetricsAggregator] = {}
+_aggregators_lock = threading.Lock()
+
+
+def get_metrics_aggregator(metrics_path: str) -> MetricsAggregator:
+    """Get the process-wide aggregator for a metrics file (created on first use)"""
+    key = os.path.abspath(metrics_path)
+    with _aggregators_lock:
+        aggregator = _aggregators.get(key)
+        if aggregator is None:
+            aggregator = MetricsAggregator(metrics_path)
+            _aggregators[key] = aggregator
+        return aggregator
@@ -1,9 +1,13 @@
 """Compare responses with and without memory"""
+import asyncio
+import json
 import logging
+import statistics
 import time
-from typing import Dict, Any, Optional, Tuple
+import uuid
+from typing import Dict, Any, List, Optional
 
-from app.evaluation.metrics import EvaluationMetrics
+from app.evaluation.metrics import EvaluationMetrics, get_evaluation_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -18,9 +22,43 @@ class ResponseComparator:
         Args:
             metrics: Optional metrics tracker
         """
-        self.metrics = metrics or EvaluationMetrics()
+        self.metrics = metrics or get_evaluation_metrics()
         logger.info("ResponseComparator initialized")
     
+    async def _run_arm(self, agent, query: str, conversation_id: str) -> Dict[str, Any]:
+        """
+        Run one agent on a query and collect the streamed response
+        
+        Args:
+            agent: Agent instance
+            query: User query
+            conversation_id: Conversation ID
+            
+        Returns:
+            Response, total time and time to first chunk (seconds)
+        """
+        start_time = time.perf_counter()
+        time_to_first_chunk = None
+        parts: List[str] = []
+        
+        async for chunk in agent.process_message(query, conversation_id):
+            try:
+                data = json.loads(chunk.get("data", "{}"))
+            except (TypeError, ValueError):
+                continue
+            if "content" in data:
+                if time_to_first_chunk is None:
+                    time_to_first_chunk = time.perf_counter() - start_time
+                parts.append(data["content"])
+            elif "error" in data and not parts:
+                raise RuntimeError(data["error"])
+        
+        return {
+            "response": "".join(parts),
+            "response_time": round(time.perf_counter() - start_time, 3),
+            "time_to_first_chunk": round(time_to_first_chunk, 3) if time_to_first_chunk is not None else None
+        }
+    
     async def compare_responses(
         self,
         agent_with_memory,
@@ -31,11 +69,15 @@ class ResponseComparator:
         """
         Compare responses from agent with and without memory
         
+        Both agents run concurrently. Without a conversation_id, the query
+        runs in a throwaway conversation that is reset afterwards, so reused
+        agents don't carry history from earlier comparisons.
+        
         Args:
             agent_with_memory: Agent instance with memory enabled
             agent_without_memory: Agent instance with memory disabled
             query: User query
-            conversation_id: Optional conversation ID
+            conversation_id: Optional conversation ID (history kept across calls)
             
         Returns:
             Comparison results
@@ -47,70 +89,43 @@ class ResponseComparator:
             "comparison": {}
         }
         
-        # Get response with memory
+        ephemeral = not conversation_id
+        if ephemeral:
+            conversation_id = f"compare-{uuid.uuid4().hex}"
+        
         try:
-            start_time = time.time()
-            response_with_memory = ""
-            memory_cases_used = 0
-            
-            async for chunk in agent_with_memory.process_message(query, conversation_id):
-                chunk_data = chunk.get("data", "{}")
-                import json
-                try:
-                    data = json.loads(chunk_data)
-                    if "content" in data:
-                        response_with_memory += data["content"]
-                except:
-                    pass
-            
-            time_with_memory = time.time() - start_time
-            
+            with_memory, without_memory = await asyncio.gather(
+                self._run_arm(agent_with_memory, query, conversation_id),
+                self._run_arm(agent_without_memory, query, conversation_id),
+                return_exceptions=True
+            )
+        finally:
+            if ephemeral:
+                agent_with_memory.reset_conversation(conversation_id)
+                agent_without_memory.reset_conversation(conversation_id)
+        
+        memory_cases_used = 0
+        if isinstance(with_memory, Exception):
+            logger.error(f"Error getting response with memory: {with_memory}", exc_info=with_memory)
+            results["with_memory"] = {"error": str(with_memory)}
+        else:
             # Count memory cases used (if available)
             if hasattr(agent_with_memory, 'memory') and agent_with_memory.memory:
-                # Try to get last retrieval count from logs or agent state
                 memory_cases_used = agent_with_memory.memory.get_case_count()
-            
-            results["with_memory"] = {
-                "response": response_with_memory,
-                "response_time": round(time_with_memory, 3),
-                "memory_cases_used": memory_cases_used
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting response with memory: {e}", exc_info=True)
-            results["with_memory"] = {"error": str(e)}
+            with_memory["memory_cases_used"] = memory_cases_used
+            results["with_memory"] = with_memory
         
-        # Get response without memory
-        try:
-            start_time = time.time()
-            response_without_memory = ""
-            
-            async for chunk in agent_without_memory.process_message(query, conversation_id):
-                chunk_data = chunk.get("data", "{}")
-                import json
-                try:
-                    data = json.loads(chunk_data)
-                    if "content" in data:
-                        response_without_memory += data["content"]
-                except:
-                    pass
-            
-            time_without_memory = time.time() - start_time
-            
-            results["without_memory"] = {
-                "response": response_without_memory,
-                "response_time": round(time_without_memory, 3)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting response without memory: {e}", exc_info=True)
-            results["without_memory"] = {"error": str(e)}
+        if isinstance(without_memory, Exception):
+            logger.error(f"Error getting response without memory: {without_memory}", exc_info=without_memory)
+            results["without_memory"] = {"error": str(without_memory)}
+        else:
+            results["without_memory"] = without_memory
         
         # Calculate comparison metrics
         if results["with_memory"].get("response") and results["without_memory"].get("response"):
             results["comparison"] = {
                 "response_length_diff": len(results["with_memory"]["response"]) - len(results["without_memory"]["response"]),
-                "response_time_diff": results["with_memory"]["response_time"] - results["without_memory"]["response_time"],
+                "response_time_diff": round(results["with_memory"]["response_time"] - results["without_memory"]["response_time"], 3),
                 "responses_are_different": results["with_memory"]["response"] != results["without_memory"]["response"]
             }
             
@@ -125,4 +140,83 @@ class ResponseComparator:
             )
         
         return results
+    
+    async def compare_batch(
+        self,
+        agent_with_memory,
+        agent_without_memory,
+        queries: List[str],
+        concurrency: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Compare a list of queries, at most `concurrency` at a time
+        
+        Each query runs in its own throwaway conversation.
+        
+        Args:
+            agent_with_memory: Agent instance with memory enabled
+            agent_without_memory: Agent instance with memory disabled
+            queries: User queries
+            concurrency: Max comparisons in flight
+            
+        Returns:
+            Per-query results (in input order) and an aggregate summary
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def compare_one(query: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.compare_responses(agent_with_memory, agent_without_memory, query)
+        
+        start_time = time.perf_counter()
+        results = await asyncio.gather(*(compare_one(query) for query in queries))
+        wall_time = time.perf_counter() - start_time
+        
+        return {
+            "results": results,
+            "summary": summarize_comparisons(results, wall_time, concurrency)
+        }
+
 
+def _distribution(values: List[float]) -> Dict[str, Any]:
+    """Mean and nearest-rank p50/p95 of a list of seconds"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(pick(0.5), 3),
+        "p95": round(pick(0.95), 3),
+    }
+
+
+def summarize_comparisons(results: List[Dict[str, Any]], wall_time: float, concurrency: int) -> Dict[str, Any]:
+    """
+    Aggregate latency deltas over batch comparison results
+    
+    Args:
+        results: compare_responses results
+        wall_time: Seconds for the whole batch
+        concurrency: Concurrency the batch ran with
+        
+    Returns:
+        Counts, wall time and latency distributions per arm and of the deltas
+    """
+    compared = [r for r in results if r["comparison"]]
+    times_with = [r["with_memory"]["response_time"] for r in compared]
+    times_without = [r["without_memory"]["response_time"] for r in compared]
+    return {
+        "queries": len(results),
+        "compared": len(compared),
+        "failed": len(results) - len(compared),
+        "concurrency": concurrency,
+        "wall_time": round(wall_time, 3),
+        "response_time_with_memory": _distribution(times_with),
+        "response_time_without_memory": _distribution(times_without),
+        "response_time_diff": _distribution([r["comparison"]["response_time_diff"] for r in compared]),
+        "responses_different": sum(r["comparison"]["responses_are_different"] for r in compared),
+    }
@@ -1,15 +1,26 @@
 """Metrics for evaluating memory effectiveness"""
 import logging
-import json
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from pathlib import Path
 
+from app.core.config import (
+    METRICS_BLOCK_TIMEOUT, METRICS_FLUSH_INTERVAL, METRICS_MAX_BATCH, METRICS_MAX_QUEUE, METRICS_OVERFLOW
+)
+from app.evaluation.aggregates import MetricsAggregator, get_metrics_aggregator
+from app.evaluation.metrics_writer import MetricsWriter, get_metrics_writer
+
 logger = logging.getLogger(__name__)
 
 
 class EvaluationMetrics:
-    """Track and compare metrics for memory effectiveness"""
+    """
+    Track and compare metrics for memory effectiveness
+    
+    Records are handed to the shared background writer for the file, so
+    logging never does disk I/O on the caller's thread (or event loop).
+    Statistics come from running aggregates the writer updates per batch.
+    """
     
     def __init__(self, metrics_path: str = "evaluation/metrics.jsonl"):
         """
@@ -19,9 +30,37 @@ class EvaluationMetrics:
             metrics_path: Path to JSONL file for storing metrics
         """
         self.metrics_path = Path(metrics_path)
-        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        self.aggregator: MetricsAggregator = get_metrics_aggregator(str(self.metrics_path))
+        self._ensure_writer()
         logger.info(f"Evaluation metrics initialized: {self.metrics_path}")
     
+    def _ensure_writer(self) -> MetricsWriter:
+        """
+        Get the shared writer for the file, starting its thread if needed
+        
+        Re-creates the writer if it was closed at a previous shutdown.
+        Batching and overflow settings come from the METRICS_* environment
+        variables (app.core.config).
+        
+        Returns:
+            Shared MetricsWriter
+        """
+        return get_metrics_writer(
+            str(self.metrics_path),
+            flush_interval=METRICS_FLUSH_INTERVAL,
+            max_batch=METRICS_MAX_BATCH,
+            max_queue=METRICS_MAX_QUEUE,
+            overflow=METRICS_OVERFLOW,
+            block_timeout=METRICS_BLOCK_TIMEOUT,
+            on_batch=self.aggregator.on_batch_written,
+            on_close=self.aggregator.checkpoint
+        )
+    
+    @property
+    def writer(self) -> MetricsWriter:
+        """Shared writer for the file"""
+        return self._ensure_writer()
+    
     def log_comparison(
         self,
         query: str,
@@ -59,13 +98,10 @@ class EvaluationMetrics:
         if metadata:
             metric.update(metadata)
         
-        try:
-            with open(self.metrics_path, 'a', encoding='utf-8') as f:
-                json_line = json.dumps(metric, ensure_ascii=False)
-                f.write(json_line + '\n')
-            logger.info(f"Logged comparison metric: {self.metrics_path}")
-        except Exception as e:
-            logger.error(f"Error logging metric: {e}", exc_info=True)
+        if self.writer.write(metric):
+            logger.info(f"Queued comparison metric: {self.metrics_path}")
+        else:
+            logger.warning(f"Metrics queue full, dropped a record: {self.metrics_path}")
     
     def log_response(
         self,
@@ -100,86 +136,78 @@ class EvaluationMetrics:
         if metadata:
             metric.update(metadata)
         
-        try:
-            with open(self.metrics_path, 'a', encoding='utf-8') as f:
-                json_line = json.dumps(metric, ensure_ascii=False)
-                f.write(json_line + '\n')
-            logger.debug(f"Logged response metric: has_memory={has_memory}")
-        except Exception as e:
-            logger.error(f"Error logging metric: {e}", exc_info=True)
+        if self.writer.write(metric):
+            logger.debug(f"Queued response metric: has_memory={has_memory}")
+        else:
+            logger.warning(f"Metrics queue full, dropped a record: {self.metrics_path}")
     
-    def get_statistics(self) -> Dict[str, Any]:
+    def get_statistics(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Get statistics from logged metrics
         
+        Served from running aggregates; only records appended since the
+        last update are read from the file.
+        
+        Args:
+            since: Only records at or after this time (epoch seconds)
+            until: Only records before this time (epoch seconds)
+            
         Returns:
             Dictionary with statistics
         """
+        # Include records still queued for the writer
+        self.writer.flush()
         if not self.metrics_path.exists():
             return {"error": "No metrics file found"}
         
-        comparisons = []
-        with_memory = []
-        without_memory = []
-        
         try:
-            with open(self.metrics_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        metric = json.loads(line)
-                        
-                        # Check if it's a comparison
-                        if "response_with_memory" in metric:
-                            comparisons.append(metric)
-                        elif metric.get("has_memory"):
-                            with_memory.append(metric)
-                        else:
-                            without_memory.append(metric)
-                    except json.JSONDecodeError:
-                        continue
-            
-            stats = {
-                "total_comparisons": len(comparisons),
-                "total_with_memory": len(with_memory),
-                "total_without_memory": len(without_memory),
-                "total_metrics": len(comparisons) + len(with_memory) + len(without_memory)
-            }
-            
-            if comparisons:
-                # Calculate averages for comparisons
-                avg_time_with = sum(
-                    m.get("response_time_with_memory", 0) or 0 
-                    for m in comparisons
-                ) / len(comparisons)
-                avg_time_without = sum(
-                    m.get("response_time_without_memory", 0) or 0 
-                    for m in comparisons
-                ) / len(comparisons)
-                
-                avg_length_with = sum(
-                    m.get("response_length_with_memory", 0) 
-                    for m in comparisons
-                ) / len(comparisons)
-                avg_length_without = sum(
-                    m.get("response_length_without_memory", 0) 
-                    for m in comparisons
-                ) / len(comparisons)
-                
-                stats["comparison_stats"] = {
-                    "avg_response_time_with_memory": round(avg_time_with, 3),
-                    "avg_response_time_without_memory": round(avg_time_without, 3),
-                    "avg_response_length_with_memory": round(avg_length_with, 1),
-                    "avg_response_length_without_memory": round(avg_length_without, 1),
-                    "time_difference": round(avg_time_with - avg_time_without, 3),
-                    "length_difference": round(avg_length_with - avg_length_without, 1),
-                }
-            
-            return stats
-            
+            self.aggregator.refresh()
+            return self.aggregator.statistics(since, until)
         except Exception as e:
             logger.error(f"Error getting statistics: {e}", exc_info=True)
             return {"error": str(e)}
+    
+    def get_timeseries(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        bucket_seconds: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get per-bucket counts and response time quantiles
+        
+        Args:
+            since: Window start (epoch seconds)
+            until: Window end (epoch seconds)
+            bucket_seconds: Bucket size (rounded to the stored bucket size)
+            
+        Returns:
+            One entry per non-empty bucket, oldest first
+        """
+        self.writer.flush()
+        self.aggregator.refresh()
+        return self.aggregator.timeseries(since, until, bucket_seconds)
+
 
+_shared_metrics: Dict[str, EvaluationMetrics] = {}
+
+
+def get_evaluation_metrics(metrics_path: str = "evaluation/metrics.jsonl") -> EvaluationMetrics:
+    """
+    Get the process-wide metrics tracker for a file (shared by all agents)
+    
+    Args:
+        metrics_path: Path to JSONL file for storing metrics
+        
+    Returns:
+        Shared EvaluationMetrics
+    """
+    metrics = _shared_metrics.get(metrics_path)
+    if metrics is None:
+        metrics = EvaluationMetrics(metrics_path)
+        _shared_metrics[metrics_path] = metrics
+    return metrics
@@ -0,0 +1,278 @@
+"""Background, batched JSONL writer for evaluation metrics"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class MetricsWriter:
+    """
+    Group-commit metric records to a JSONL file from one background thread
+
+    `write()` only appends to an in-memory queue, so callers (including the
+    event loop) never touch the disk. The writer thread wakes every
+    `flush_interval` seconds, or as soon as `max_batch` records are queued,
+    and appends the whole batch with a single open/write. The queue holds at
+    most `max_queue` records; when the disk cannot keep up, `overflow`
+    decides what happens: drop the oldest queued record, drop the new one,
+    or block the caller (only for callers off the event loop).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 1.0,
+        max_batch: int = 256,
+        max_queue: int = 10000,
+        overflow: str = "drop_oldest",
+        block_timeout: float = 1.0,
+        on_batch: Optional[Callable[[List[Dict[str, Any]], int, int], None]] = None,
+        on_close: Optional[Callable[[], None]] = None
+    ):
+        """
+        Initialize writer and start its thread
+
+        Args:
+            path: JSONL file to append to
+            flush_interval: Max seconds a record waits before being written
+            max_batch: Records per write; a full batch is written right away
+            max_queue: Max queued records (memory bound)
+            overflow: drop_oldest, drop_newest or block when the queue is full
+            block_timeout: Max seconds a blocked caller waits before its record is dropped
+            on_batch: Called from the writer thread with (records, start_offset, end_offset)
+                after each successful append
+            on_close: Called once after the final batch on close
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow} (expected one of {', '.join(OVERFLOW_POLICIES)})")
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.on_batch = on_batch
+        self.on_close = on_close
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._cond = threading.Condition()
+        self._in_flight = 0  # Records taken from the queue but not yet written
+        self._flush_waiters = 0
+        self._closed = False
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+        self._write_errors = 0
+        self._max_depth = 0
+        self._write_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue a record (returns immediately unless the overflow policy is block)
+
+        Args:
+            record: JSON-serializable metric
+
+        Returns:
+            False if the record (or, for drop_oldest, an older one) was dropped
+        """
+        with self._cond:
+            if self._closed:
+                self._dropped += 1
+                return False
+            accepted = True
+            if len(self._queue) >= self.max_queue:
+                if self.overflow == "drop_newest":
+                    self._dropped += 1
+                    return False
+                if self.overflow == "drop_oldest":
+                    self._queue.popleft()
+                    self._dropped += 1
+                    accepted = False
+                else:
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0 or not self._cond.wait(remaining):
+                            self._dropped += 1
+                            return False
+            self._queue.append(record)
+            self._max_depth = max(self._max_depth, len(self._queue))
+            if len(self._queue) >= self.max_batch:
+                self._cond.notify_all()
+            return accepted
+
+    def _run(self):
+        """Writer thread: collect batches and append them"""
+        while True:
+            with self._cond:
+                if not self._queue and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                elif len(self._queue) < self.max_batch and not self._closed and not self._flush_waiters:
+                    # Give a partial batch until the interval to fill up
+                    self._cond.wait(self.flush_interval)
+                if not self._queue:
+                    if self._closed:
+                        return
+                    continue
+                count = min(len(self._queue), self.max_batch)
+                batch = [self._queue.popleft() for _ in range(count)]
+                self._in_flight = count
+                # Wake blocked writers (queue has room) and flush() waiters
+                self._cond.notify_all()
+            self._write_batch(batch)
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _write_batch(self, batch):
+        """Append one batch with a single write"""
+        start = time.perf_counter()
+        lines = []
+        records = []
+        unserializable = 0
+        for record in batch:
+            try:
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+                records.append(record)
+            except (TypeError, ValueError) as e:
+                unserializable += 1
+                logger.error(f"Unserializable metric dropped: {e}")
+        data = "".join(lines).encode("utf-8")
+        written = False
+        try:
+            with open(self.path, "ab") as f:
+                start_offset = f.tell()
+                f.write(data)
+            written = True
+        except Exception as e:
+            logger.error(f"Error writing {len(lines)} metrics to {self.path}: {e}", exc_info=True)
+        finally:
+            # Counters are read by stats() on other threads
+            with self._cond:
+                self._write_seconds += time.perf_counter() - start
+                self._write_errors += unserializable
+                if written:
+                    self._written += len(lines)
+                    self._batches += 1
+                else:
+                    self._write_errors += 1
+                    self._dropped += len(lines)
+        if not written:
+            return
+        if self.on_batch is not None:
+            try:
+                self.on_batch(records, start_offset, start_offset + len(data))
+            except Exception as e:
+                logger.error(f"Metrics batch listener failed: {e}", exc_info=True)
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """
+        Wait until everything queued so far has been written
+
+        Args:
+            timeout: Max seconds to wait (None = no limit)
+
+        Returns:
+            True if the queue drained in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            # Write partial batches now instead of at the next interval
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._queue or self._in_flight:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(0.05 if remaining is None else min(remaining, 0.05))
+                return True
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """
+        Write the remaining records and stop the thread
+
+        Args:
+            timeout: Max seconds to wait for the final flush
+        """
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"Metrics writer for {self.path} did not finish within {timeout}s")
+        if self.on_close is not None:
+            try:
+                self.on_close()
+            except Exception as e:
+                logger.error(f"Metrics close listener failed: {e}", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth, written/dropped counts and batch sizes"""
+        with self._cond:
+            return {
+                "path": self.path,
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_depth,
+                "max_queue": self.max_queue,
+                "overflow": self.overflow,
+                "written": self._written,
+                "batches": self._batches,
+                "avg_batch_size": round(self._written / self._batches, 1) if self._batches else 0.0,
+                "dropped": self._dropped,
+                "write_errors": self._write_errors,
+                "write_ms_total": round(self._write_seconds * 1000, 1),
+            }
+
+
+_writers: Dict[str, MetricsWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_metrics_writer(path: str, **kwargs) -> MetricsWriter:
+    """
+    Get the process-wide writer for a file (created on first use)
+
+    Args:
+        path: JSONL file
+        **kwargs: MetricsWriter options, only used when created
+
+    Returns:
+        Shared MetricsWriter
+    """
+    key = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None or writer._closed:
+            writer = MetricsWriter(path, **kwargs)
+            _writers[key] = writer
+        return writer
+
+
+def close_metrics_writers(timeout: Optional[float] = 5.0):
+    """Flush and stop all writers (on shutdown)"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout)
+
+
+# Scripts exit without a lifespan shutdown; don't lose their last batch
+atexit.register(close_metrics_writers)
@@ -1,21 +1,47 @@
 """Main FastAPI application"""
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.routes import router as api_router
 from app.api.middleware import RequestLoggingMiddleware
+from app.api.chat import prewarm_agent, close_agents
+from app.api.evaluation import close_comparison_agents
+from app.core.config import PREWARM_AGENT
 from app.core.logging_config import setup_logging
+from app.services.openai_client import close_shared_http_clients
+from app.evaluation.metrics_writer import close_metrics_writers
 
 # Setup logging
 setup_logging()
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Optionally pre-warm the agent on startup; close cached agents, HTTP pools and metrics writers on shutdown"""
+    if PREWARM_AGENT:
+        try:
+            await prewarm_agent()
+        except Exception as e:
+            # The agent is built lazily on the first request instead
+            logger.error(f"Agent pre-warm failed: {e}", exc_info=True)
+    yield
+    close_agents()
+    close_comparison_agents()
+    await close_shared_http_clients()
+    # Off the event loop: waits for the final metrics batch to be written
+    await asyncio.to_thread(close_metrics_writers)
+
+
 app = FastAPI(
     title="bot_nhaXe - Single Agent",
     description="Simple AI agent with prompt-only configuration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
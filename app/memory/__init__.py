@@ -1,6 +1,17 @@
 """Memory module for non-parametric case-based reasoning"""
-from app.memory.non_parametric import NonParametricMemory
-from app.memory.case_storage import CaseStorage
+import importlib
 
 __all__ = ["NonParametricMemory", "CaseStorage"]
 
+# Resolved on first access, so importing app.memory.<submodule> (executor,
+# registry) does not pull in torch/transformers when memory is disabled
+_LAZY_IMPORTS = {
+    "NonParametricMemory": "app.memory.non_parametric",
+    "CaseStorage": "app.memory.case_storage",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        return getattr(importlib.import_module(_LAZY_IMPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,120 @@
+"""Micro-batching of concurrent query embeddings"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+import torch
+
+from app.memory.embedding import EmbeddingModel
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """
+    Collect single-text embedding requests and run them as one batch
+
+    The first request in an empty batch opens a window of `max_wait_ms`; the
+    batch is flushed when the window closes or `max_batch_size` requests have
+    arrived, whichever comes first. One forward pass runs in the embedding
+    executor and each caller gets its own row back. Identical texts in a batch
+    are embedded once.
+    """
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        max_wait_ms: float = 2.0,
+        max_batch_size: int = 64,
+        max_length: int = 256
+    ):
+        """
+        Initialize batcher
+
+        Args:
+            embedding_model: Model used for the batched forward pass
+            max_wait_ms: Max time a request waits for others to join its batch
+            max_batch_size: Flush as soon as this many requests are pending
+            max_length: Max sequence length for embedding
+        """
+        self.embedding_model = embedding_model
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.max_length = max_length
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._requests = 0
+        self._batched_requests = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+
+    async def embed(self, text: str) -> torch.Tensor:
+        """
+        Embed one text, batched with concurrent callers
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Normalized embedding, shape (dim,)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self._requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Detach the pending batch and start its forward pass"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+            # Keep a reference until done so the task is not garbage collected
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed a batch in the executor and resolve callers' futures"""
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self._batches += 1
+        self._batched_requests += len(batch)
+        self._max_batch_seen = max(self._max_batch_seen, len(batch))
+        try:
+            vecs = await self.embedding_model.aembed_texts(
+                texts,
+                batch_size=max(len(texts), 1),
+                max_length=self.max_length
+            )
+        except Exception as e:
+            logger.error(f"Batched embedding failed for {len(batch)} requests: {e}", exc_info=True)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        row = {text: i for i, text in enumerate(texts)}
+        for text, future in batch:
+            if not future.done():
+                # Copy: a view would keep the whole batch tensor alive in caches
+                future.set_result(vecs[row[text]].clone())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get batching counters"""
+        return {
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch_size": self.max_batch_size,
+            "requests": self._requests,
+            "batches": self._batches,
+            "avg_batch_size": round(self._batched_requests / self._batches, 2) if self._batches else 0.0,
+            "max_batch_seen": self._max_batch_seen,
+            "pending": len(self._pending),
+        }
@@ -2,7 +2,7 @@
 import json
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
@@ -53,15 +53,15 @@ class CaseStorage:
         
         return cases
     
-    def add_case(
+    def build_case(
         self,
         user_message: str,
         assistant_response: str,
         reward: Optional[int] = None,
         metadata: Optional[Dict[str, Any]] = None
-    ) -> bool:
+    ) -> Dict[str, Any]:
         """
-        Add a new case to storage
+        Build a case dictionary (not yet written)
         
         Args:
             user_message: User message (key field for retrieval)
@@ -70,7 +70,7 @@ class CaseStorage:
             metadata: Optional additional metadata
             
         Returns:
-            True if successful
+            Case dictionary
         """
         case = {
             "user_message": user_message,
@@ -84,15 +84,62 @@ class CaseStorage:
         if metadata:
             case.update(metadata)
         
+        return case
+    
+    def append_case(self, case: Dict[str, Any]) -> int:
+        """
+        Append a case as one JSONL line
+        
+        Args:
+            case: Case dictionary
+            
+        Returns:
+            Number of bytes written (0 on failure)
+        """
         try:
-            with open(self.storage_path, 'a', encoding='utf-8') as f:
-                json_line = json.dumps(case, ensure_ascii=False)
-                f.write(json_line + '\n')
+            line = (json.dumps(case, ensure_ascii=False) + '\n').encode('utf-8')
+            with open(self.storage_path, 'ab') as f:
+                f.write(line)
             logger.info(f"Added case to memory: {self.storage_path}")
-            return True
+            return len(line)
         except Exception as e:
             logger.error(f"Error adding case to {self.storage_path}: {e}", exc_info=True)
-            return False
+            return 0
+    
+    def add_case(
+        self,
+        user_message: str,
+        assistant_response: str,
+        reward: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Add a new case to storage
+        
+        Args:
+            user_message: User message (key field for retrieval)
+            assistant_response: Assistant response (value field)
+            reward: Optional reward (1 for positive, 0 for negative)
+            metadata: Optional additional metadata
+            
+        Returns:
+            True if successful
+        """
+        case = self.build_case(user_message, assistant_response, reward, metadata)
+        return self.append_case(case) > 0
+    
+    def file_signature(self) -> Optional[Tuple[int, int]]:
+        """
+        Get (size, mtime_ns) of the JSONL file, used to detect external edits
+        
+        Returns:
+            Signature tuple or None if the file does not exist
+        """
+        try:
+            stat = self.storage_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
     
     def get_case_count(self) -> int:
         """Get total number of cases"""
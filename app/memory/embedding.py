@@ -1,12 +1,43 @@
 """Embedding utilities for memory retrieval"""
 import logging
-from typing import List, Tuple
+import threading
+from typing import List, Optional, Tuple
 import torch
 import torch.nn.functional as F
 from transformers import AutoTokenizer, AutoModel
 
+from app.memory.embedding_backends import PooledEncoder, TorchBackend, create_embedding_backend
+from app.memory.executor import EmbeddingExecutor, get_embedding_executor
+
 logger = logging.getLogger(__name__)
 
+# Representative queries used to check a quantized/exported backend against fp32
+CALIBRATION_TEXTS = [
+    "Còn vé đi Hải Phòng không?",
+    "Mấy giờ xe chạy vậy em?",
+    "Giá vé bao nhiêu một người?",
+    "Cho anh đặt 2 vé tối mai nhé",
+    "Điểm đón ở đâu?",
+    "Tôi muốn hủy vé đã đặt",
+    "Xe có wifi và nước uống không?",
+    "Hello, do you have tickets for tomorrow morning?",
+]
+
+
+def resolve_device(device: str = "auto") -> torch.device:
+    """
+    Resolve a device setting to a torch device
+    
+    Args:
+        device: "auto", "cpu" or "cuda" (cuda falls back to cpu if unavailable)
+        
+    Returns:
+        torch.device
+    """
+    if device == "cpu":
+        return torch.device("cpu")
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
 
 class EmbeddingModel:
     """Embedding model wrapper for semantic search"""
@@ -14,7 +45,12 @@ class EmbeddingModel:
     def __init__(
         self,
         model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
-        device: str = "auto"
+        device: str = "auto",
+        executor: Optional[EmbeddingExecutor] = None,
+        backend: str = "torch",
+        num_threads: int = 0,
+        onnx_dir: str = "memory/onnx",
+        min_cosine: float = 0.98
     ):
         """
         Initialize embedding model
@@ -22,29 +58,68 @@ class EmbeddingModel:
         Args:
             model_name: HuggingFace model name
             device: Device to use ("auto", "cpu", "cuda")
+            executor: Thread pool for aembed_texts (default: shared embedding executor)
+            backend: Inference backend (torch, torch_int8, onnx)
+            num_threads: Intra-op threads for inference (0 = library default)
+            onnx_dir: Directory for exported ONNX models
+            min_cosine: Min cosine similarity to fp32 torch on calibration texts
+                required to keep a non-torch backend (else falls back to torch)
         """
         self.model_name = model_name
+        self.executor = executor or get_embedding_executor()
+        # Fast tokenizers are not safe to call from several threads at once
+        self._tokenizer_lock = threading.Lock()
         
         # Determine device
-        if device == "cpu":
-            self.device = torch.device("cpu")
-        elif device == "cuda" and torch.cuda.is_available():
-            self.device = torch.device("cuda")
-        else:
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.device = resolve_device(device)
         
         logger.info(f"Loading embedding model: {model_name} on {self.device}")
         
         try:
             self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModel.from_pretrained(model_name)
-            self.model.to(self.device)
-            self.model.eval()
-            logger.info(f"Embedding model loaded successfully")
+            model = AutoModel.from_pretrained(model_name)
+            model.to(self.device)
+            model.eval()
+            self.hidden_size = model.config.hidden_size
+            encoder = PooledEncoder(model)
+            self.backend = create_embedding_backend(
+                backend,
+                encoder,
+                self.device,
+                model_name,
+                num_threads=num_threads,
+                onnx_dir=onnx_dir
+            )
+            if self.backend.name != "torch":
+                self._validate_backend(TorchBackend(encoder, self.device), min_cosine)
+            logger.info(f"Embedding model loaded successfully (backend: {self.backend.name})")
         except Exception as e:
             logger.error(f"Failed to load embedding model: {e}", exc_info=True)
             raise
     
+    def _validate_backend(self, reference: TorchBackend, min_cosine: float):
+        """
+        Compare the backend with fp32 torch on calibration texts; fall back to
+        the reference if any embedding drifts below min_cosine
+        
+        Args:
+            reference: fp32 torch backend
+            min_cosine: Required cosine similarity per text
+        """
+        backend = self.backend
+        vecs = self.embed_texts(CALIBRATION_TEXTS)
+        self.backend = reference
+        expected = self.embed_texts(CALIBRATION_TEXTS)
+        worst = float((vecs * expected).sum(dim=1).min())
+        if worst < min_cosine:
+            logger.warning(
+                f"Embedding backend {backend.name} min cosine {worst:.4f} < {min_cosine}, "
+                f"using torch"
+            )
+            return
+        self.backend = backend
+        logger.info(f"Embedding backend {backend.name} validated (min cosine {worst:.4f})")
+    
     @torch.no_grad()
     def embed_texts(
         self,
@@ -64,31 +139,39 @@ class EmbeddingModel:
             Tensor of embeddings (normalized)
         """
         if not texts:
-            return torch.empty(0, self.model.config.hidden_size)
+            return torch.empty(0, self.hidden_size)
         
         vecs = []
         for i in range(0, len(texts), batch_size):
             batch = texts[i:i + batch_size]
-            enc = self.tokenizer(
-                batch,
-                padding=True,
-                truncation=True,
-                max_length=max_length,
-                return_tensors="pt"
-            )
-            enc = {k: v.to(self.device) for k, v in enc.items()}
-            
-            out = self.model(**enc, return_dict=True)
+            with self._tokenizer_lock:
+                enc = self.tokenizer(
+                    batch,
+                    padding=True,
+                    truncation=True,
+                    max_length=max_length,
+                    return_tensors="pt"
+                )
             
             # Get embedding (pooler_output or first token)
-            if hasattr(out, "pooler_output") and out.pooler_output is not None:
-                e = out.pooler_output
-            else:
-                e = out.last_hidden_state[:, 0, :]
+            e = self.backend(dict(enc))
             
             # Normalize (L2 norm)
             e = F.normalize(e, p=2, dim=1)
-            vecs.append(e.cpu())
+            vecs.append(e)
         
-        return torch.cat(vecs, dim=0) if vecs else torch.empty(0, self.model.config.hidden_size)
-
+        return torch.cat(vecs, dim=0) if vecs else torch.empty(0, self.hidden_size)
+    
+    async def aembed_texts(
+        self,
+        texts: List[str],
+        batch_size: int = 64,
+        max_length: int = 256
+    ) -> torch.Tensor:
+        """Async embed_texts: runs in the embedding executor, off the event loop"""
+        return await self.executor.run(
+            self.embed_texts,
+            texts,
+            batch_size=batch_size,
+            max_length=max_length
+        )
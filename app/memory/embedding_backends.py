@@ -0,0 +1,185 @@
+"""Inference backends for the embedding model (PyTorch fp32, dynamic int8, ONNX Runtime)"""
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+
+class PooledEncoder(nn.Module):
+    """HF encoder returning the unnormalized sentence vector (pooler output, else [CLS])"""
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: torch.Tensor,
+        token_type_ids: Optional[torch.Tensor] = None
+    ) -> torch.Tensor:
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if token_type_ids is not None:
+            inputs["token_type_ids"] = token_type_ids
+        out = self.model(**inputs, return_dict=True)
+        if getattr(out, "pooler_output", None) is not None:
+            return out.pooler_output
+        return out.last_hidden_state[:, 0, :]
+
+
+class TorchBackend:
+    """Eager PyTorch forward pass"""
+
+    name = "torch"
+
+    def __init__(self, encoder: PooledEncoder, device: torch.device):
+        self.encoder = encoder
+        self.device = device
+
+    @torch.no_grad()
+    def __call__(self, enc: Dict[str, torch.Tensor]) -> torch.Tensor:
+        enc = {k: v.to(self.device) for k, v in enc.items()}
+        return self.encoder(**enc).cpu()
+
+
+class TorchInt8Backend(TorchBackend):
+    """PyTorch with Linear layers dynamically quantized to int8 (CPU only)"""
+
+    name = "torch_int8"
+
+    def __init__(self, encoder: PooledEncoder):
+        quantized = torch.ao.quantization.quantize_dynamic(encoder, {nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized, torch.device("cpu"))
+
+
+class OnnxBackend:
+    """ONNX Runtime session over an exported copy of the encoder (CPU)"""
+
+    name = "onnx"
+
+    def __init__(self, encoder: PooledEncoder, onnx_path: Path, num_threads: int = 0):
+        """
+        Initialize backend, exporting the encoder on first use
+
+        Args:
+            encoder: fp32 encoder to export
+            onnx_path: Exported model file (reused if present)
+            num_threads: ONNX Runtime intra-op threads (0 = runtime default)
+        """
+        import onnxruntime as ort
+
+        if not onnx_path.exists():
+            export_onnx(encoder, onnx_path)
+
+        options = ort.SessionOptions()
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def __call__(self, enc: Dict[str, torch.Tensor]) -> torch.Tensor:
+        feeds = {k: v.cpu().numpy() for k, v in enc.items() if k in self.input_names}
+        return torch.from_numpy(self.session.run(None, feeds)[0])
+
+
+def export_onnx(encoder: PooledEncoder, onnx_path: Path):
+    """
+    Export the encoder with dynamic batch and sequence axes
+
+    Args:
+        encoder: fp32 encoder
+        onnx_path: Output file (written atomically)
+    """
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    uses_token_types = getattr(encoder.model.config, "type_vocab_size", 0) > 0
+    input_names = ["input_ids", "attention_mask"] + (["token_type_ids"] if uses_token_types else [])
+    # Second row is padded so the traced graph keeps the attention mask
+    attention_mask = torch.ones(2, 8, dtype=torch.long)
+    attention_mask[1, 4:] = 0
+    dummy = tuple(
+        attention_mask if name == "attention_mask" else torch.ones(2, 8, dtype=torch.long)
+        for name in input_names
+    )
+    axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    axes["embedding"] = {0: "batch"}
+
+    tmp_path = onnx_path.with_suffix(".tmp")
+    logger.info(f"Exporting embedding model to ONNX: {onnx_path}")
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                encoder.cpu(),
+                dummy,
+                str(tmp_path),
+                input_names=input_names,
+                output_names=["embedding"],
+                dynamic_axes=axes,
+                opset_version=17,
+                dynamo=False
+            )
+    finally:
+        # Export switches the module to training mode (dropout on)
+        encoder.eval()
+    os.replace(tmp_path, onnx_path)
+
+
+def onnx_path_for(onnx_dir: str, model_name: str) -> Path:
+    """Exported model path for a HuggingFace model name"""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name).strip("_")
+    return Path(onnx_dir) / f"{slug}.onnx"
+
+
+def create_embedding_backend(
+    backend: str,
+    encoder: PooledEncoder,
+    device: torch.device,
+    model_name: str,
+    num_threads: int = 0,
+    onnx_dir: str = "memory/onnx"
+):
+    """
+    Create an embedding backend
+
+    Falls back to the fp32 torch backend (with a warning) when the requested
+    backend cannot run here: int8/ONNX on a CUDA device, onnxruntime not
+    installed, or the ONNX export failing.
+
+    Args:
+        backend: torch, torch_int8 or onnx
+        encoder: fp32 encoder (already on device)
+        device: Resolved device
+        model_name: HuggingFace model name (names the exported ONNX file)
+        num_threads: Intra-op threads (0 = library default)
+        onnx_dir: Directory for exported ONNX models
+
+    Returns:
+        Backend callable mapping tokenized inputs to unnormalized vectors
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+    if backend != "torch" and device.type != "cpu":
+        logger.warning(f"Embedding backend {backend} is CPU only, using torch on {device}")
+        backend = "torch"
+
+    if backend in ("torch", "torch_int8") and num_threads > 0:
+        # Process-wide setting; it also applies to other torch work in this process
+        torch.set_num_threads(num_threads)
+
+    if backend == "torch_int8":
+        return TorchInt8Backend(encoder)
+    if backend == "onnx":
+        try:
+            return OnnxBackend(encoder, onnx_path_for(onnx_dir, model_name), num_threads)
+        except ImportError:
+            logger.warning("onnxruntime not installed, falling back to torch embedding backend")
+        except Exception as e:
+            logger.error(f"ONNX backend failed to initialize: {e}, falling back to torch", exc_info=True)
+    return TorchBackend(encoder, device)
@@ -0,0 +1,109 @@
+"""Bounded thread pool for running embedding inference off the event loop"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.tracing import record_span
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingExecutor:
+    """Thread pool with queue-depth and wait-time accounting"""
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Initialize executor
+
+        Args:
+            max_workers: Max concurrent embedding/retrieval jobs (the concurrency limit)
+        """
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="embedding")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_run = 0.0
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking function in the pool and await its result
+
+        Args:
+            fn: Blocking function
+            *args, **kwargs: Arguments for fn
+
+        Returns:
+            Result of fn
+        """
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += started - submitted
+            record_span("embedding.queue_wait", started - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._total_run += time.perf_counter() - started
+
+        loop = asyncio.get_running_loop()
+        # Carry the caller's context (current trace/span) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._pool, context.run, job)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and timing counters"""
+        with self._lock:
+            completed = self._completed
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": completed,
+                "max_queue_depth": self._max_queue_depth,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 3) if completed else 0.0,
+                "avg_run_ms": round(self._total_run / completed * 1000, 3) if completed else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop worker threads"""
+        self._pool.shutdown(wait=wait)
+
+
+_executor: Optional[EmbeddingExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_embedding_executor(max_workers: int = 2) -> EmbeddingExecutor:
+    """
+    Get the process-wide embedding executor (created on first use)
+
+    Args:
+        max_workers: Pool size, only used when the executor is created
+
+    Returns:
+        Shared EmbeddingExecutor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = EmbeddingExecutor(max_workers=max_workers)
+            logger.info(f"Embedding executor started with {max_workers} workers")
+        return _executor
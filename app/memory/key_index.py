@@ -0,0 +1,217 @@
+"""Persistent key-embedding index for memory retrieval"""
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+import torch
+
+from app.memory.vector_index import FlatIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _update_hash(h, keys: List[str]):
+    """Feed an ordered list of keys into a running hash"""
+    for key in keys:
+        h.update(key.encode("utf-8"))
+        h.update(b"\x00")
+    return h
+
+
+def _keys_hash(keys: List[str]) -> str:
+    """Hash an ordered list of keys (used to detect stale persisted embeddings)"""
+    return _update_hash(hashlib.sha1(), keys).hexdigest()
+
+
+def index_path_for(storage_path: str, model_name: str) -> Path:
+    """
+    Get the index file path stored alongside the cases JSONL
+
+    Args:
+        storage_path: Path to the cases JSONL file
+        model_name: Embedding model name (part of the file name)
+
+    Returns:
+        Path like memory/cases.all-MiniLM-L6-v2.emb.pt
+    """
+    storage = Path(storage_path)
+    model_slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name.split("/")[-1])
+    return storage.with_name(f"{storage.stem}.{model_slug}.emb.pt")
+
+
+class KeyEmbeddingIndex:
+    """Contiguous matrix of normalized key embeddings, persisted to disk"""
+
+    def __init__(
+        self,
+        index_path: Path,
+        model_name: str,
+        save_interval: int = 100,
+        backend=None
+    ):
+        """
+        Initialize key-embedding index
+
+        Args:
+            index_path: Path of the persisted index file
+            model_name: Embedding model name (stored to invalidate on model change)
+            save_interval: Persist after this many appended keys (see append)
+            backend: Search backend from create_vector_index (default: exact flat search)
+        """
+        self.index_path = Path(index_path)
+        self.model_name = model_name
+        self.save_interval = save_interval
+        self.backend = backend or FlatIndex()
+        # Rows [0, _count) of _buffer are valid; spare capacity makes append amortized O(1)
+        self._buffer: Optional[torch.Tensor] = None
+        self._count = 0
+        self._hasher = hashlib.sha1()
+        self._unsaved = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def embeddings(self) -> Optional[torch.Tensor]:
+        """Key embeddings, shape (num_keys, dim)"""
+        if self._buffer is None:
+            return None
+        return self._buffer[:self._count]
+
+    @property
+    def keys_hash(self) -> str:
+        """Hash over all indexed keys, in order"""
+        return self._hasher.hexdigest()
+
+    def _set(self, embeddings: Optional[torch.Tensor], keys: List[str]):
+        """Replace index contents"""
+        self._buffer = embeddings.float().contiguous() if embeddings is not None else None
+        self._count = 0 if embeddings is None else embeddings.shape[0]
+        self._hasher = _update_hash(hashlib.sha1(), keys)
+        if self._buffer is not None:
+            self.backend.build(self.embeddings.numpy())
+        else:
+            # Don't keep (and later append to) vectors of the previous contents
+            self.backend.reset()
+
+    def _load(self) -> Optional[dict]:
+        """Load persisted index file (None if missing or unreadable)"""
+        if not self.index_path.exists():
+            return None
+        try:
+            data = torch.load(self.index_path, map_location="cpu")
+        except Exception as e:
+            logger.warning(f"Failed to load key index {self.index_path}: {e}, rebuilding")
+            return None
+        if data.get("model_name") != self.model_name:
+            logger.info(f"Key index {self.index_path} built with another model, rebuilding")
+            return None
+        return data
+
+    def save(self):
+        """Persist index to disk"""
+        if self.embeddings is None:
+            return
+        self._unsaved = 0
+        try:
+            tmp_path = self.index_path.with_suffix(".tmp")
+            torch.save({
+                "model_name": self.model_name,
+                "count": len(self),
+                "keys_hash": self.keys_hash,
+                "embeddings": self.embeddings.clone(),
+            }, tmp_path)
+            tmp_path.replace(self.index_path)
+            logger.debug(f"Saved key index: {self.index_path} ({len(self)} keys)")
+        except Exception as e:
+            logger.warning(f"Failed to save key index {self.index_path}: {e}")
+
+    def sync(
+        self,
+        keys: List[str],
+        embed_fn: Callable[[List[str]], torch.Tensor]
+    ):
+        """
+        Make the index match the given keys, embedding only what is missing
+
+        If the persisted index covers a prefix of keys (same model, same hash
+        over the first `count` keys), only the remaining tail is embedded.
+        Otherwise all keys are re-embedded.
+
+        Args:
+            keys: Ordered list of keys (one per retrievable case)
+            embed_fn: Function embedding a list of texts into normalized vectors
+        """
+        data = self._load()
+        embeddings = None
+        count = 0
+        if data is not None:
+            count = int(data.get("count", 0))
+            if count <= len(keys) and data.get("keys_hash") == _keys_hash(keys[:count]):
+                embeddings = data["embeddings"]
+            else:
+                count = 0
+
+        missing = keys[count:]
+        if missing:
+            logger.info(f"Embedding {len(missing)} keys for index {self.index_path}")
+            new_vecs = embed_fn(missing)
+            embeddings = new_vecs if embeddings is None else torch.cat([embeddings, new_vecs], dim=0)
+
+        self._set(embeddings, keys)
+
+        if missing or data is None or count != int(data.get("count", -1)):
+            self.save()
+
+    def append(self, keys: List[str], vecs: torch.Tensor):
+        """
+        Append embeddings for new keys without touching existing rows
+
+        The file on disk is rewritten every `save_interval` appended keys (and
+        on flush); an older file is still a valid prefix for sync.
+
+        Args:
+            keys: New keys, in order
+            vecs: Their normalized embeddings, shape (len(keys), dim)
+        """
+        if not keys:
+            return
+        vecs = vecs.float()
+        if self._buffer is None:
+            self._buffer = torch.empty(0, vecs.shape[1])
+        needed = self._count + vecs.shape[0]
+        if needed > self._buffer.shape[0]:
+            capacity = max(needed, 2 * self._buffer.shape[0], 64)
+            grown = torch.empty(capacity, vecs.shape[1])
+            grown[:self._count] = self._buffer[:self._count]
+            self._buffer = grown
+        self._buffer[self._count:needed] = vecs
+        start, self._count = self._count, needed
+        _update_hash(self._hasher, keys)
+        self.backend.add(self.embeddings.numpy(), start)
+
+        self._unsaved += len(keys)
+        if self._unsaved >= self.save_interval:
+            self.save()
+
+    def flush(self):
+        """Persist any appended keys not yet saved"""
+        if self._unsaved:
+            self.save()
+
+    def search(self, query_vec: torch.Tensor, k: int) -> Tuple[List[float], List[int]]:
+        """
+        Cosine search over all keys (exact or approximate, depending on backend)
+
+        Args:
+            query_vec: Normalized query vector, shape (dim,)
+            k: Number of results
+
+        Returns:
+            (scores, indices) sorted by descending score
+        """
+        if self.embeddings is None or len(self) == 0:
+            return [], []
+        query = query_vec.reshape(-1).float().numpy()
+        return self.backend.search(self.embeddings.numpy(), query, k)
@@ -1,10 +1,17 @@
 """Non-parametric memory implementation - adapted from Memento"""
 import logging
+import threading
 from typing import List, Dict, Any, Tuple, Optional
 import torch
 
+from app.core.tracing import span
 from app.memory.case_storage import CaseStorage
-from app.memory.embedding import EmbeddingModel
+from app.memory.registry import acquire_embedding_model, release_embedding_model
+from app.memory.executor import EmbeddingExecutor, get_embedding_executor
+from app.memory.batcher import EmbeddingBatcher
+from app.memory.query_cache import LRUCache, normalize_query
+from app.memory.key_index import KeyEmbeddingIndex, index_path_for
+from app.memory.vector_index import create_vector_index
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +25,17 @@ class NonParametricMemory:
         embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
         device: str = "auto",
         key_field: str = "user_message",
-        value_field: str = "assistant_response"
+        value_field: str = "assistant_response",
+        incremental: bool = True,
+        index_type: str = "flat",
+        index_params: Optional[Dict[str, Any]] = None,
+        executor: Optional[EmbeddingExecutor] = None,
+        batch_max_wait_ms: float = 2.0,
+        batch_max_size: int = 64,
+        embedding_backend: str = "torch",
+        embedding_options: Optional[Dict[str, Any]] = None,
+        query_cache_size: int = 1024,
+        result_cache_size: int = 1024
     ):
         """
         Initialize non-parametric memory
@@ -29,25 +46,108 @@ class NonParametricMemory:
             device: Device for embedding model
             key_field: Field name for query (default: "user_message")
             value_field: Field name for response (default: "assistant_response")
+            incremental: Append new cases in memory instead of reloading the file
+            index_type: Search backend (flat, ivf, hnsw)
+            index_params: Backend knobs passed to create_vector_index (ivf_nprobe, hnsw_ef_search, ...)
+            executor: Thread pool for the async API (default: shared embedding executor)
+            batch_max_wait_ms: Micro-batching window for aretrieve query embeddings (0 disables)
+            batch_max_size: Max queries per micro-batch
+            embedding_backend: Embedding inference backend (torch, torch_int8, onnx)
+            embedding_options: Backend knobs passed to EmbeddingModel (num_threads, onnx_dir, min_cosine)
+            query_cache_size: Query embeddings cached by normalized text (0 disables)
+            result_cache_size: Top-k result lists cached until the next add_case/reload (0 disables)
         """
         self.storage = CaseStorage(storage_path)
-        self.embedding_model = EmbeddingModel(embedding_model_name, device)
+        self.executor = executor or get_embedding_executor()
+        # Shared with other memories using the same model, device and backend
+        self.embedding_model = acquire_embedding_model(
+            embedding_model_name,
+            device,
+            executor=self.executor,
+            backend=embedding_backend,
+            **(embedding_options or {})
+        )
         self.key_field = key_field
         self.value_field = value_field
+        self.max_length = 256
+        self.incremental = incremental
+        self.batcher: Optional[EmbeddingBatcher] = None
+        if batch_max_wait_ms > 0:
+            self.batcher = EmbeddingBatcher(
+                self.embedding_model,
+                max_wait_ms=batch_max_wait_ms,
+                max_batch_size=batch_max_size,
+                max_length=self.max_length
+            )
+        
+        # Guards cases/pairs/index against concurrent retrieve and add_case in executor threads
+        self._lock = threading.RLock()
+        
+        # Repeated queries skip the forward pass (and the search, until cases change)
+        self.query_cache = LRUCache(query_cache_size) if query_cache_size > 0 else None
+        self.result_cache = LRUCache(result_cache_size) if result_cache_size > 0 else None
+        # Bumped whenever cases change; results computed under an older generation are not cached
+        self._generation = 0
+        
+        # Precomputed key embeddings, persisted alongside the JSONL file; a
+        # quantized/exported backend gets its own file so vectors are not mixed
+        index_model_id = embedding_model_name
+        if self.embedding_model.backend.name != "torch":
+            index_model_id = f"{embedding_model_name}@{self.embedding_model.backend.name}"
+        self.index = KeyEmbeddingIndex(
+            index_path_for(storage_path, index_model_id),
+            index_model_id,
+            backend=create_vector_index(index_type, **(index_params or {}))
+        )
         
         # Load cases and extract pairs
         self._cases: List[Dict[str, Any]] = []
         self._pairs: List[Tuple[str, Any, int]] = []
+        self._file_signature: Optional[Tuple[int, int]] = None
         self._reload_memory()
         
         logger.info(f"Non-parametric memory initialized with {len(self._cases)} cases")
     
     def _reload_memory(self):
         """Reload cases from storage and extract pairs"""
-        self._cases = self.storage.load_cases()
-        self._pairs = self._extract_pairs(self._cases)
+        with self._lock:
+            # Take the signature before reading so a concurrent edit forces another reload
+            self._file_signature = self.storage.file_signature()
+            self._cases = self.storage.load_cases()
+            self._pairs = self._extract_pairs(self._cases)
+            self.index.sync([p[0] for p in self._pairs], self._embed_keys)
+            self._invalidate_results()
         logger.debug(f"Reloaded memory: {len(self._cases)} cases, {len(self._pairs)} pairs")
     
+    def _invalidate_results(self):
+        """Drop cached result lists after cases changed (call with the lock held)"""
+        self._generation += 1
+        if self.result_cache is not None:
+            self.result_cache.clear()
+    
+    def _cached_results(self, result_key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Get a copy of cached results for (normalized query, top_k, filter_negative, max_length)"""
+        if self.result_cache is None:
+            return None
+        cached = self.result_cache.get(result_key)
+        return [dict(r) for r in cached] if cached is not None else None
+    
+    def _embed_query(self, query: str, normalized: str, max_length: int) -> torch.Tensor:
+        """Embed a query, using the query embedding cache"""
+        cache_key = (normalized, max_length)
+        if self.query_cache is not None:
+            query_vec = self.query_cache.get(cache_key)
+            if query_vec is not None:
+                return query_vec
+        query_vec = self.embedding_model.embed_texts([query], max_length=max_length)[0]
+        if self.query_cache is not None:
+            self.query_cache.put(cache_key, query_vec)
+        return query_vec
+    
+    def _embed_keys(self, keys: List[str]) -> torch.Tensor:
+        """Embed case keys for the index"""
+        return self.embedding_model.embed_texts(keys, max_length=self.max_length)
+    
     def _extract_pairs(
         self,
         cases: List[Dict[str, Any]]
@@ -82,7 +182,8 @@ class NonParametricMemory:
         Args:
             query: Query text
             top_k: Number of top results to return
-            max_length: Max sequence length for embedding
+            max_length: Max sequence length for query embedding
+            filter_negative: Skip cases with reward=0
             
         Returns:
             List of retrieved cases with scores
@@ -91,48 +192,76 @@ class NonParametricMemory:
             logger.debug("No cases in memory, returning empty list")
             return []
         
+        normalized = normalize_query(query)
+        result_key = (normalized, top_k, filter_negative, max_length)
+        cached = self._cached_results(result_key)
+        if cached is not None:
+            return cached
+        
+        generation = self._generation
         try:
-            # Embed query
-            query_vec = self.embedding_model.embed_texts(
-                [query],
-                max_length=max_length
-            )[0].unsqueeze(0)
-            
-            # Embed all keys
-            keys = [p[0] for p in self._pairs]
-            key_vecs = self.embedding_model.embed_texts(
-                keys,
-                max_length=max_length
-            )
-            
-            # Compute similarity (cosine similarity = dot product of normalized vectors)
-            sims = (query_vec @ key_vecs.T).squeeze(0)
-            
-            # Get top-k
-            k = min(top_k, len(self._pairs))
-            topk_scores, topk_idx = torch.topk(sims, k)
+            # Embed query only (keys are precomputed in the index)
+            with span("memory.embed_query"):
+                query_vec = self._embed_query(query, normalized, max_length)
+        except Exception as e:
+            logger.error(f"Error retrieving cases: {e}", exc_info=True)
+            return []
+        
+        return self._search(query_vec, top_k, filter_negative, result_key, generation)
+    
+    def _search(
+        self,
+        query_vec: torch.Tensor,
+        top_k: int,
+        filter_negative: bool,
+        result_key: Optional[Tuple] = None,
+        generation: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the index with an embedded query and build result dicts
+        
+        Args:
+            query_vec: Normalized query embedding
+            top_k: Number of top results to return
+            filter_negative: Skip cases with reward=0
+            result_key: Result cache key (None = do not cache)
+            generation: Case generation the query started under; results are
+                not cached if cases changed since
             
-            # Build results
-            results = []
-            for rank, (score, idx) in enumerate(zip(topk_scores.tolist(), topk_idx.tolist()), 1):
-                key, value, line_index = self._pairs[idx]
+        Returns:
+            List of retrieved cases with scores
+        """
+        try:
+            with self._lock:
+                # Cosine similarity search over precomputed key embeddings
+                with span("memory.index_search", index=type(self.index.backend).__name__):
+                    topk_scores, topk_idx = self.index.search(query_vec, top_k)
                 
-                # Check reward if filtering negative cases
-                if filter_negative and line_index < len(self._cases):
-                    reward = self._cases[line_index].get('reward', 1)
-                    if reward == 0:  # Skip negative cases
-                        continue
+                # Build results (skipping negative cases if filtering)
+                with span("memory.filter", filter_negative=filter_negative):
+                    results = []
+                    for rank, (score, idx) in enumerate(zip(topk_scores, topk_idx), 1):
+                        key, value, line_index = self._pairs[idx]
+                    
+                        # Check reward if filtering negative cases
+                        if filter_negative and line_index < len(self._cases):
+                            reward = self._cases[line_index].get('reward', 1)
+                            if reward == 0:  # Skip negative cases
+                                continue
+                    
+                        results.append({
+                            "rank": rank,
+                            "score": round(float(score), 6),
+                            "user_message": key,
+                            "assistant_response": value,
+                            "line_index": line_index
+                        })
                 
-                results.append({
-                    "rank": rank,
-                    "score": round(float(score), 6),
-                    "user_message": key,
-                    "assistant_response": value,
-                    "line_index": line_index
-                })
-            
-            # If filtered, we might have fewer results, so take top_k
-            results = results[:top_k]
+                    # If filtered, we might have fewer results, so take top_k
+                    results = results[:top_k]
+                
+                if self.result_cache is not None and result_key is not None and generation == self._generation:
+                    self.result_cache.put(result_key, [dict(r) for r in results])
             
             logger.debug(
                 f"Retrieved {len(results)} cases for query "
@@ -163,20 +292,165 @@ class NonParametricMemory:
         Returns:
             True if successful
         """
-        success = self.storage.add_case(
+        case = self.storage.build_case(
             user_message=user_message,
             assistant_response=assistant_response,
             reward=reward,
             metadata=metadata
         )
         
-        if success:
-            # Reload memory to include new case
-            self._reload_memory()
+        # Embed the key before taking the lock so retrievals are not blocked on it
+        new_pairs = self._extract_pairs([case])
+        key_vecs = self._embed_keys([new_pairs[0][0]]) if new_pairs and self.incremental else None
+        
+        with self._lock:
+            signature_before = self.storage.file_signature()
+            written = self.storage.append_case(case)
+            if not written:
+                return False
+            
+            if not self.incremental:
+                self._reload_memory()
+                return True
+            
+            # Only our own line may have been added since the last load/append;
+            # anything else means the file was edited externally
+            signature_after = self.storage.file_signature()
+            expected_size = (self._file_signature[0] if self._file_signature else 0) + written
+            if (
+                signature_before != self._file_signature
+                or signature_after is None
+                or signature_after[0] != expected_size
+            ):
+                logger.info("Memory file changed externally, reloading")
+                self._reload_memory()
+                return True
+            
+            self._file_signature = signature_after
+            self._append_case(case, key_vecs)
+            self._invalidate_results()
+        return True
+    
+    def _append_case(self, case: Dict[str, Any], key_vecs: Optional[torch.Tensor]):
+        """Append a stored case (and its key embedding) to in-memory cases, pairs and index"""
+        line_index = len(self._cases)
+        self._cases.append(case)
+        
+        new_pairs = self._extract_pairs([case])
+        if not new_pairs:
+            return
+        key, value, _ = new_pairs[0]
+        self._pairs.append((key, value, line_index))
+        self.index.append([key], key_vecs)
+    
+    async def aretrieve(
+        self,
+        query: str,
+        top_k: int = 4,
+        max_length: int = 256,
+        filter_negative: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Async retrieve: runs in the embedding executor, off the event loop
+        
+        The query embedding goes through the micro-batcher (if enabled) so
+        concurrent requests share one forward pass.
+        """
+        if not self.batcher or max_length != self.batcher.max_length:
+            return await self.executor.run(
+                self.retrieve,
+                query,
+                top_k=top_k,
+                max_length=max_length,
+                filter_negative=filter_negative
+            )
+        
+        if not self._pairs:
+            return []
+        
+        # Cache hits are answered on the event loop without a thread hop
+        normalized = normalize_query(query)
+        result_key = (normalized, top_k, filter_negative, max_length)
+        cached = self._cached_results(result_key)
+        if cached is not None:
+            return cached
+        
+        generation = self._generation
+        try:
+            with span("memory.embed_query"):
+                query_vec = await self.aembed_query(query, max_length)
+        except Exception as e:
+            logger.error(f"Error retrieving cases: {e}", exc_info=True)
+            return []
+        
+        with span("memory.search"):
+            return await self.executor.run(self._search, query_vec, top_k, filter_negative, result_key, generation)
+    
+    async def aembed_query(self, query: str, max_length: int = 256) -> torch.Tensor:
+        """
+        Embed a query off the event loop, through the query cache and micro-batcher
+        
+        Args:
+            query: Query text
+            max_length: Max sequence length
+            
+        Returns:
+            Normalized embedding, shape (dim,)
+        """
+        normalized = normalize_query(query)
+        if self.query_cache is not None:
+            query_vec = self.query_cache.get((normalized, max_length))
+            if query_vec is not None:
+                return query_vec
         
-        return success
+        if self.batcher and max_length == self.batcher.max_length:
+            query_vec = await self.batcher.embed(query)
+        else:
+            query_vec = (await self.embedding_model.aembed_texts([query], max_length=max_length))[0]
+        if self.query_cache is not None:
+            self.query_cache.put((normalized, max_length), query_vec)
+        return query_vec
+    
+    async def aadd_case(
+        self,
+        user_message: str,
+        assistant_response: str,
+        reward: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Async add_case: runs in the embedding executor, off the event loop"""
+        return await self.executor.run(
+            self.add_case,
+            user_message,
+            assistant_response,
+            reward=reward,
+            metadata=metadata
+        )
+    
+    def flush(self):
+        """Persist index rows appended since the last save"""
+        self.index.flush()
+    
+    def close(self):
+        """Persist the index and release the shared embedding model"""
+        self.flush()
+        if self.embedding_model is not None:
+            release_embedding_model(self.embedding_model)
+            self.embedding_model = None
     
     def get_case_count(self) -> int:
         """Get total number of cases"""
         return len(self._cases)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get memory statistics (cases, index backend, micro-batching)"""
+        return {
+            "cases": len(self._cases),
+            "indexed_keys": len(self.index),
+            "index_type": type(self.index.backend).__name__,
+            "embedding_backend": self.embedding_model.backend.name if self.embedding_model else None,
+            "query_cache": self.query_cache.stats() if self.query_cache is not None else None,
+            "result_cache": self.result_cache.stats() if self.result_cache is not None else None,
+            "batcher": self.batcher.stats() if self.batcher else None,
+        }
 
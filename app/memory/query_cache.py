@@ -0,0 +1,89 @@
+"""Bounded LRU caches for query embeddings and retrieval results"""
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+# Punctuation/symbols trimmed from both ends ("còn vé không?" == "Còn vé không")
+_EDGE_CHARS = " \t\n.,!?;:…\"'()[]-~"
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query for cache lookups
+
+    NFC (so composed and decomposed Vietnamese diacritics match), case-folded,
+    whitespace collapsed, punctuation trimmed from the ends.
+
+    Args:
+        text: Raw query
+
+    Returns:
+        Normalized text
+    """
+    text = unicodedata.normalize("NFC", text).casefold()
+    return _WHITESPACE.sub(" ", text).strip(_EDGE_CHARS)
+
+
+class LRUCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters"""
+
+    def __init__(self, max_size: int):
+        """
+        Initialize cache
+
+        Args:
+            max_size: Max entries kept (least recently used are evicted)
+        """
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a value (None on miss) and mark it most recently used"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self._misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entry if full"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        """Drop all entries (counted as one invalidation)"""
+        with self._lock:
+            self._data.clear()
+            self._invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get size and hit-rate counters"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,252 @@
+"""Process-wide reference-counted registry of embedding models and memories"""
+import logging
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Optional
+
+from app.memory.executor import EmbeddingExecutor
+
+if TYPE_CHECKING:
+    from app.memory.embedding import EmbeddingModel
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Shared value plus reference count"""
+
+    __slots__ = ("value", "refs", "params")
+
+    def __init__(self, value: Any, params: Dict[str, Any]):
+        self.value = value
+        self.refs = 0
+        self.params = params
+
+
+class RefCountedRegistry:
+    """
+    Share one instance per key between owners
+
+    `acquire` creates the value on first use and bumps its reference count;
+    `release` drops it (calling `on_close`) when the last owner lets go.
+    Values are created outside the registry lock, so a slow load only makes
+    callers for the same key wait.
+    """
+
+    def __init__(self, name: str, on_close: Optional[Callable[[Any], None]] = None):
+        """
+        Initialize registry
+
+        Args:
+            name: Name used in logs and stats
+            on_close: Called with the value when its last reference is released
+        """
+        self.name = name
+        self.on_close = on_close
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, _Entry] = {}
+        # Keys being created; other callers for the key wait on the event instead of loading twice
+        self._pending: Dict[Hashable, threading.Event] = {}
+        self._created = 0
+        self._reused = 0
+
+    def acquire(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        params: Optional[Dict[str, Any]] = None,
+        strict: Iterable[str] = ()
+    ) -> Any:
+        """
+        Get the shared value for key, creating it if needed
+
+        Args:
+            key: Identity of the shared value
+            factory: Builds the value on first use
+            params: Construction parameters; a later caller with different ones
+                gets the existing value and a warning
+            strict: Params that must match the existing value's (ValueError otherwise)
+
+        Returns:
+            Shared value
+        """
+        params = params or {}
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._check_params(key, entry.params, params, strict)
+                    self._reused += 1
+                    entry.refs += 1
+                    return entry.value
+                pending = self._pending.get(key)
+                creating = pending is None
+                if creating:
+                    pending = self._pending[key] = threading.Event()
+            if not creating:
+                # Another caller is loading it: wait, then take its entry (or retry if it failed)
+                pending.wait()
+                continue
+            try:
+                value = factory()
+            except BaseException:
+                with self._lock:
+                    del self._pending[key]
+                pending.set()
+                raise
+            with self._lock:
+                entry = _Entry(value, params)
+                entry.refs = 1
+                self._entries[key] = entry
+                self._created += 1
+                del self._pending[key]
+            pending.set()
+            logger.info(f"Registry {self.name}: created {key}")
+            return value
+
+    def _check_params(self, key: Hashable, existing: Dict[str, Any], params: Dict[str, Any], strict: Iterable[str]):
+        """Raise on a strict param mismatch, warn on any other"""
+        if params == existing:
+            return
+        conflicts = [name for name in strict if params.get(name) != existing.get(name)]
+        if conflicts:
+            raise ValueError(
+                f"Registry {self.name}: {key} already created with "
+                + ", ".join(f"{name}={existing.get(name)!r}" for name in conflicts)
+                + ", requested "
+                + ", ".join(f"{name}={params.get(name)!r}" for name in conflicts)
+            )
+        logger.warning(f"Registry {self.name}: {key} already created with {existing}, ignoring {params}")
+
+    def release(self, value: Any) -> bool:
+        """
+        Drop one reference to a shared value
+
+        Args:
+            value: Value returned by acquire
+
+        Returns:
+            True if this was the last reference and the value was closed
+        """
+        with self._lock:
+            for key, entry in self._entries.items():
+                if entry.value is value:
+                    break
+            else:
+                logger.warning(f"Registry {self.name}: release of unknown value")
+                return False
+            entry.refs -= 1
+            if entry.refs > 0:
+                return False
+            del self._entries[key]
+        logger.info(f"Registry {self.name}: closed {key}")
+        if self.on_close:
+            try:
+                self.on_close(entry.value)
+            except Exception as e:
+                logger.warning(f"Registry {self.name}: failed to close {key}: {e}", exc_info=True)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get live entries with reference counts"""
+        with self._lock:
+            return {
+                "live": len(self._entries),
+                "created": self._created,
+                "reused": self._reused,
+                "entries": [{"key": str(key), "refs": entry.refs} for key, entry in self._entries.items()],
+            }
+
+
+# Memory arguments that change what is stored or returned for a case file
+MEMORY_IDENTITY_PARAMS = (
+    "device", "key_field", "value_field", "index_type", "index_params",
+    "embedding_backend", "embedding_options",
+)
+
+_embedding_models = RefCountedRegistry("embedding_models")
+_memories = RefCountedRegistry("memories", on_close=lambda memory: memory.close())
+
+
+def acquire_embedding_model(
+    model_name: str,
+    device: str = "auto",
+    executor: Optional[EmbeddingExecutor] = None,
+    backend: str = "torch",
+    **backend_options
+) -> "EmbeddingModel":
+    """
+    Get the shared EmbeddingModel for (model_name, device, backend)
+
+    Args:
+        model_name: HuggingFace model name
+        device: Device ("auto" is resolved first, so it shares with the concrete device)
+        executor: Thread pool used if the model is created here
+        backend: Inference backend (torch, torch_int8, onnx)
+        **backend_options: num_threads, onnx_dir, min_cosine (the first caller's win)
+
+    Returns:
+        Shared EmbeddingModel (call release_embedding_model when done)
+    """
+    from app.memory.embedding import EmbeddingModel, resolve_device
+
+    resolved = str(resolve_device(device))
+    return _embedding_models.acquire(
+        (model_name, resolved, backend),
+        lambda: EmbeddingModel(model_name, resolved, executor=executor, backend=backend, **backend_options),
+        params=backend_options
+    )
+
+
+def release_embedding_model(model: "EmbeddingModel") -> bool:
+    """Drop one reference to a shared EmbeddingModel"""
+    return _embedding_models.release(model)
+
+
+def acquire_memory(
+    storage_path: str,
+    embedding_model_name: str,
+    device: str = "auto",
+    **kwargs
+):
+    """
+    Get the shared NonParametricMemory for (storage_path, embedding_model_name)
+
+    Args:
+        storage_path: Path to the JSONL case file
+        embedding_model_name: HuggingFace model name
+        device: Device for the embedding model
+        **kwargs: Other NonParametricMemory arguments; tuning options (batching,
+            caches) are the first caller's, while a different index or
+            embedding backend for the same case file raises ValueError
+
+    Returns:
+        Shared NonParametricMemory (call release_memory when done)
+    """
+    from app.memory.non_parametric import NonParametricMemory
+
+    key = (os.path.realpath(storage_path), embedding_model_name)
+    return _memories.acquire(
+        key,
+        lambda: NonParametricMemory(
+            storage_path=storage_path,
+            embedding_model_name=embedding_model_name,
+            device=device,
+            **kwargs
+        ),
+        params={"device": device, **{k: v for k, v in kwargs.items() if k != "executor"}},
+        strict=MEMORY_IDENTITY_PARAMS
+    )
+
+
+def release_memory(memory) -> bool:
+    """Drop one reference to a shared memory (flushed and closed on the last release)"""
+    return _memories.release(memory)
+
+
+def registry_stats() -> Dict[str, Any]:
+    """Get shared embedding models and memories with reference counts"""
+    return {
+        "embedding_models": _embedding_models.stats(),
+        "memories": _memories.stats(),
+    }
@@ -0,0 +1,247 @@
+"""Vector search backends for the key-embedding index"""
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _topk(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, sorted descending"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class FlatIndex:
+    """Exact inner-product search over all vectors"""
+
+    def build(self, vectors: np.ndarray):
+        """Build from all vectors (nothing to precompute)"""
+
+    def add(self, vectors: np.ndarray, start: int):
+        """Register rows vectors[start:] (nothing to do)"""
+
+    def reset(self):
+        """Forget all vectors (nothing to do)"""
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        """
+        Search nearest vectors
+
+        Args:
+            vectors: All indexed vectors, shape (n, dim)
+            query: Query vector, shape (dim,)
+            k: Number of results
+
+        Returns:
+            (scores, indices) sorted by descending score
+        """
+        scores = vectors @ query
+        idx = _topk(scores, k)
+        return scores[idx].tolist(), idx.tolist()
+
+
+class IVFIndex:
+    """
+    Inverted-file index (pure NumPy)
+
+    Vectors are clustered with spherical k-means into `nlist` lists; a query
+    only scans the `nprobe` lists whose centroids are closest. Higher nprobe
+    gives better recall at higher latency. Below `min_train_size` vectors the
+    index falls back to exact search.
+    """
+
+    def __init__(
+        self,
+        nlist: int = 0,
+        nprobe: int = 16,
+        min_train_size: int = 2000,
+        train_iterations: int = 10,
+        retrain_growth: float = 4.0
+    ):
+        """
+        Initialize IVF index
+
+        Args:
+            nlist: Number of clusters (0 = 4 * sqrt(n))
+            nprobe: Number of clusters scanned per query
+            min_train_size: Use exact search below this many vectors
+            train_iterations: k-means iterations
+            retrain_growth: Retrain once the index grows by this factor
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.train_iterations = train_iterations
+        self.retrain_growth = retrain_growth
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[np.ndarray] = []
+        self._trained_size = 0
+        self._flat = FlatIndex()
+
+    def _train(self, vectors: np.ndarray):
+        """Run spherical k-means on a sample of vectors"""
+        n = vectors.shape[0]
+        nlist = self.nlist or int(4 * np.sqrt(n))
+        nlist = max(1, min(nlist, n // 39 or 1))
+        rng = np.random.default_rng(0)
+
+        sample_size = min(n, nlist * 64)
+        sample = vectors[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.train_iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Re-seed empty clusters from random sample points
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids.astype(np.float32)
+        self._trained_size = n
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid per vector (chunked to bound memory)"""
+        out = np.empty(vectors.shape[0], dtype=np.int64)
+        for i in range(0, vectors.shape[0], 65536):
+            out[i:i + 65536] = np.argmax(vectors[i:i + 65536] @ self.centroids.T, axis=1)
+        return out
+
+    def build(self, vectors: np.ndarray):
+        """Train centroids and assign all vectors to lists"""
+        self.centroids = None
+        self.lists = []
+        if vectors.shape[0] < self.min_train_size:
+            return
+        self._train(vectors)
+        assign = self._assign(vectors)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(len(self.centroids) + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        logger.info(f"Built IVF index: {vectors.shape[0]} vectors, {len(self.centroids)} lists")
+
+    def reset(self):
+        """Forget centroids and lists (back to untrained exact search)"""
+        self.centroids = None
+        self.lists = []
+        self._trained_size = 0
+
+    def add(self, vectors: np.ndarray, start: int):
+        """Assign rows vectors[start:] to their lists (retrain when grown enough)"""
+        n = vectors.shape[0]
+        if self.centroids is None:
+            if n >= self.min_train_size:
+                self.build(vectors)
+            return
+        if n >= self._trained_size * self.retrain_growth:
+            self.build(vectors)
+            return
+        new_ids = np.arange(start, n)
+        for list_id, row in zip(self._assign(vectors[start:]), new_ids):
+            self.lists[list_id] = np.append(self.lists[list_id], row)
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        """Search the nprobe closest lists (exact search if untrained)"""
+        if self.centroids is None:
+            return self._flat.search(vectors, query, k)
+        probe = _topk(self.centroids @ query, self.nprobe)
+        candidates = np.concatenate([self.lists[i] for i in probe])
+        if candidates.size == 0:
+            return [], []
+        scores = vectors[candidates] @ query
+        idx = _topk(scores, k)
+        return scores[idx].tolist(), candidates[idx].tolist()
+
+
+class HNSWIndex:
+    """HNSW graph index backed by faiss-cpu (optional dependency)"""
+
+    def __init__(self, m: int = 32, ef_construction: int = 80, ef_search: int = 64):
+        """
+        Initialize HNSW index
+
+        Args:
+            m: Graph degree (memory/recall trade-off)
+            ef_construction: Candidate list size while building
+            ef_search: Candidate list size per query (recall/latency knob)
+        """
+        import faiss  # Optional dependency, imported only when selected
+
+        self._faiss = faiss
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._index = None
+
+    def _new_index(self, dim: int):
+        index = self._faiss.IndexHNSWFlat(dim, self.m, self._faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = self.ef_construction
+        index.hnsw.efSearch = self.ef_search
+        return index
+
+    def build(self, vectors: np.ndarray):
+        """Build graph over all vectors"""
+        self._index = self._new_index(vectors.shape[1])
+        if vectors.shape[0]:
+            self._index.add(np.ascontiguousarray(vectors))
+            logger.info(f"Built HNSW index: {vectors.shape[0]} vectors")
+
+    def reset(self):
+        """Drop the graph"""
+        self._index = None
+
+    def add(self, vectors: np.ndarray, start: int):
+        """Insert rows vectors[start:] into the graph"""
+        if self._index is None:
+            self._index = self._new_index(vectors.shape[1])
+        self._index.add(np.ascontiguousarray(vectors[start:]))
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, k: int) -> Tuple[List[float], List[int]]:
+        """Approximate search (vectors are stored inside the faiss index)"""
+        if self._index is None or self._index.ntotal == 0:
+            return [], []
+        scores, idx = self._index.search(query.reshape(1, -1), min(k, self._index.ntotal))
+        keep = idx[0] >= 0
+        return scores[0][keep].tolist(), idx[0][keep].tolist()
+
+
+def create_vector_index(
+    index_type: str = "flat",
+    ivf_nlist: int = 0,
+    ivf_nprobe: int = 16,
+    hnsw_m: int = 32,
+    hnsw_ef_construction: int = 80,
+    hnsw_ef_search: int = 64
+):
+    """
+    Create a vector search backend
+
+    Args:
+        index_type: flat, ivf or hnsw
+        ivf_nlist: IVF cluster count (0 = auto)
+        ivf_nprobe: IVF clusters scanned per query
+        hnsw_m: HNSW graph degree
+        hnsw_ef_construction: HNSW build-time candidate list size
+        hnsw_ef_search: HNSW query-time candidate list size
+
+    Returns:
+        Index backend instance
+    """
+    if index_type == "flat":
+        return FlatIndex()
+    if index_type == "ivf":
+        return IVFIndex(nlist=ivf_nlist, nprobe=ivf_nprobe)
+    if index_type == "hnsw":
+        try:
+            return HNSWIndex(m=hnsw_m, ef_construction=hnsw_ef_construction, ef_search=hnsw_ef_search)
+        except ImportError:
+            logger.warning("faiss is not installed, falling back to IVF index for index_type=hnsw")
+            return IVFIndex(nlist=ivf_nlist, nprobe=ivf_nprobe)
+    raise ValueError(f"Unknown index_type: {index_type}")
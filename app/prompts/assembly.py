@@ -0,0 +1,32 @@
+"""Request message assembly: stable cacheable prefix, volatile current turn"""
+from typing import Any, Callable, Dict, List, Optional
+
+
+def with_rendered_turn(
+    messages: List[Dict[str, Any]],
+    render: Optional[Callable[[str], str]]
+) -> List[Dict[str, Any]]:
+    """
+    Rewrite the current (last) user message for this request only
+
+    Per-turn context (retrieved examples, current time, booking state) is
+    attached to the latest user message at request time instead of being
+    stored in history. History then holds raw user messages, so the system
+    prompt, tools and all earlier turns form a byte-identical prefix across
+    requests that provider-side prompt caching can reuse.
+
+    Args:
+        messages: Conversation history (not modified)
+        render: Maps the raw user message to the content to send (None = unchanged)
+
+    Returns:
+        Messages to send
+    """
+    if render is None:
+        return messages
+    for index in range(len(messages) - 1, -1, -1):
+        if messages[index].get("role") == "user":
+            messages = list(messages)
+            messages[index] = {**messages[index], "content": render(messages[index]["content"])}
+            break
+    return messages
@@ -1,7 +1,117 @@
 """Prompt framework for building agent prompts with template variables"""
-from typing import Dict, Any, Optional
-from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple, Union
+import os
 import re
+import threading
+
+_VARIABLE = re.compile(r'\{\{([^}]+)\}\}')
+
+# Compiled templates: by file path (with mtime/size to detect edits) and by content
+_file_cache: Dict[str, Tuple[int, int, "CompiledTemplate"]] = {}
+_content_cache: Dict[str, "CompiledTemplate"] = {}
+_cache_lock = threading.Lock()
+# Inline templates cached by content, beyond this the cache is reset
+MAX_CONTENT_CACHE = 256
+
+
+class CompiledTemplate:
+    """
+    Template parsed once into literal segments and variable slots
+    
+    Rendering joins the literals with looked-up values; no regex runs per
+    render. Semantics match the original substitution: {{A.B}} looks up
+    nested dicts, None renders as "", and unresolved placeholders are kept.
+    """
+    
+    __slots__ = ("source", "segments")
+    
+    def __init__(self, source: str):
+        """
+        Parse template
+        
+        Args:
+            source: Template string with {{VARIABLE}} placeholders
+        """
+        self.source = source
+        # str = literal, (path, placeholder) = variable slot
+        self.segments: List[Union[str, Tuple[Tuple[str, ...], str]]] = []
+        position = 0
+        for match in _VARIABLE.finditer(source):
+            if match.start() > position:
+                self.segments.append(source[position:match.start()])
+            self.segments.append((tuple(match.group(1).split('.')), match.group(0)))
+            position = match.end()
+        if position < len(source):
+            self.segments.append(source[position:])
+    
+    @staticmethod
+    def _resolve(path: Tuple[str, ...], placeholder: str, variables: Dict[str, Any]) -> str:
+        value: Any = variables
+        for part in path:
+            if not isinstance(value, dict) or part not in value:
+                return placeholder
+            value = value[part]
+        return str(value) if value is not None else ""
+    
+    def render(self, variables: Dict[str, Any]) -> str:
+        """
+        Render template
+        
+        Args:
+            variables: Dictionary of variable values
+            
+        Returns:
+            String with variables replaced
+        """
+        resolve = self._resolve
+        return "".join([
+            segment if isinstance(segment, str) else resolve(segment[0], segment[1], variables)
+            for segment in self.segments
+        ])
+
+
+def compile_template(source: str) -> CompiledTemplate:
+    """Compiled form of an inline template (cached by content)"""
+    compiled = _content_cache.get(source)
+    if compiled is None:
+        compiled = CompiledTemplate(source)
+        with _cache_lock:
+            if len(_content_cache) >= MAX_CONTENT_CACHE:
+                _content_cache.clear()
+            _content_cache[source] = compiled
+    return compiled
+
+
+def load_compiled_template(template_path: str) -> CompiledTemplate:
+    """
+    Compiled form of a template file, re-read only when its mtime or size changes
+    
+    Args:
+        template_path: Path to template file
+        
+    Returns:
+        CompiledTemplate
+    """
+    try:
+        stat = os.stat(template_path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Template file not found: {template_path}") from None
+    key = os.path.abspath(template_path)
+    cached = _file_cache.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    with open(template_path, 'r', encoding='utf-8') as f:
+        compiled = CompiledTemplate(f.read())
+    with _cache_lock:
+        _file_cache[key] = (stat.st_mtime_ns, stat.st_size, compiled)
+    return compiled
+
+
+def clear_template_cache():
+    """Drop all compiled templates"""
+    with _cache_lock:
+        _file_cache.clear()
+        _content_cache.clear()
 
 
 class PromptFramework:
@@ -72,27 +182,7 @@ Bạn là {{AGENT.NAME}}, {{AGENT.DESCRIPTION}}
         Returns:
             String with variables replaced
         """
-        result = template
-        
-        # Replace nested variables like {{AGENT.NAME}}
-        def replace_nested(match):
-            var_path = match.group(1)
-            parts = var_path.split('.')
-            value = variables
-            try:
-                for part in parts:
-                    if isinstance(value, dict):
-                        value = value.get(part, match.group(0))
-                    else:
-                        return match.group(0)
-                return str(value) if value is not None else ""
-            except (KeyError, AttributeError, TypeError):
-                return match.group(0)
-        
-        # Replace {{VARIABLE}} patterns
-        result = re.sub(r'\{\{([^}]+)\}\}', replace_nested, result)
-        
-        return result
+        return compile_template(template).render(variables)
     
     @staticmethod
     def load_template(template_path: str) -> str:
@@ -105,13 +195,7 @@ Bạn là {{AGENT.NAME}}, {{AGENT.DESCRIPTION}}
         Returns:
             Template content as string
         """
-        template_file = Path(template_path)
-        
-        if not template_file.exists():
-            raise FileNotFoundError(f"Template file not found: {template_path}")
-        
-        with open(template_file, 'r', encoding='utf-8') as f:
-            return f.read()
+        return load_compiled_template(template_path).source
     
     @staticmethod
     def build_prompt(
@@ -130,19 +214,17 @@ Bạn là {{AGENT.NAME}}, {{AGENT.DESCRIPTION}}
         Returns:
             Final prompt with variables replaced
         """
-        # Load template
+        # Load template (compiled once, cached by path + mtime or by content)
         if template_path:
-            template = PromptFramework.load_template(template_path)
-        elif template_content:
-            template = template_content
+            compiled = load_compiled_template(template_path)
         else:
-            template = PromptFramework.DEFAULT_PROMPT_TEMPLATE
+            compiled = compile_template(template_content or PromptFramework.DEFAULT_PROMPT_TEMPLATE)
         
         # Replace variables
         if variables:
-            template = PromptFramework.replace_variables(template, variables)
+            return compiled.render(variables)
         
-        return template
+        return compiled.source
     
     @staticmethod
     def format_tools_description(tools: list) -> str:
@@ -1,12 +1,125 @@
 """OpenAI client for GPT-4.1-mini"""
+import asyncio
+import json
 import logging
-from typing import List, Optional, Dict, Any
+import random
+import time
+from collections import deque
+from typing import AsyncGenerator, Awaitable, Callable, List, Optional, Dict, Any, Tuple
+import httpx
+import openai
 from openai import AsyncOpenAI
 
-from app.core.config import OPENAI_API_KEY
+from app.core.config import OPENAI_API_KEY, OPENAI_BASE_URL
+from app.core.tracing import record_span, span
+from app.services.rate_limiter import RateLimiter, get_rate_limiter
+from app.services.token_counter import TokenCounter
 
 logger = logging.getLogger(__name__)
 
+# Status codes worth another attempt (timeouts, conflicts, rate limits, server errors)
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+# Latency samples kept for the hedge delay (p95) and stats
+LATENCY_WINDOW = 200
+# Samples needed before hedging on the observed p95
+MIN_HEDGE_SAMPLES = 20
+# 429s re-queued on the rate limiter (not counted as retries) before giving up
+MAX_RATE_LIMIT_REQUEUES = 10
+# Token counts kept for repeated prompt parts (system prompts, tool schemas)
+STATIC_TOKEN_CACHE_SIZE = 64
+
+# Pools per event loop (connections are bound to the loop that opened them), then per limits
+_http_clients: Dict[asyncio.AbstractEventLoop, Dict[Tuple, httpx.AsyncClient]] = {}
+
+
+def get_shared_http_client(
+    max_connections: int = 100,
+    max_keepalive_connections: int = 20,
+    keepalive_expiry: float = 30.0
+) -> httpx.AsyncClient:
+    """
+    Get the shared httpx client for the running event loop and pool limits
+    
+    All OpenAIClient instances with the same limits share one connection pool
+    per event loop, so agents and endpoints reuse warm keep-alive connections,
+    and a later loop (e.g. a second asyncio.run) never gets connections bound
+    to a closed one.
+    
+    Args:
+        max_connections: Max open connections
+        max_keepalive_connections: Max idle connections kept alive
+        keepalive_expiry: Seconds an idle connection is kept
+        
+    Returns:
+        Shared httpx.AsyncClient
+    """
+    loop = asyncio.get_running_loop()
+    for stale in [other for other in _http_clients if other.is_closed()]:
+        # Their connections died with the loop; nothing left to close
+        del _http_clients[stale]
+    clients = _http_clients.setdefault(loop, {})
+    key = (max_connections, max_keepalive_connections, keepalive_expiry)
+    client = clients.get(key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        ))
+        clients[key] = client
+    return client
+
+
+async def close_shared_http_clients():
+    """Close the running loop's shared connection pools (on shutdown)"""
+    clients = _http_clients.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.aclose()
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """Whether an API error is transient (connection/timeout or retryable status)"""
+    if isinstance(error, openai.APIConnectionError):  # Includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Server-requested delay in seconds (retry-after-ms / retry-after headers)"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        if "retry-after-ms" in response.headers:
+            return float(response.headers["retry-after-ms"]) / 1000
+        if "retry-after" in response.headers:
+            return float(response.headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def usage_summary(usage: Any) -> Dict[str, int]:
+    """
+    Token counts from a response's usage, including prompt tokens served from the provider's prompt cache
+
+    Args:
+        usage: CompletionUsage (None if the response carried none)
+
+    Returns:
+        {"prompt_tokens", "completion_tokens", "cached_tokens"}, or {} without usage
+    """
+    if usage is None:
+        return {}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+    }
+
 
 class OpenAIClient:
     """OpenAI client for interacting with GPT models"""
@@ -16,7 +129,21 @@ class OpenAIClient:
         api_key: Optional[str] = None,
         model_name: str = "gpt-4.1-mini-2025-04-14",
         temperature: float = 0.7,
-        max_tokens: Optional[int] = 2000
+        max_tokens: Optional[int] = 2000,
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        hedge_requests: bool = False,
+        hedge_delay_ms: Optional[float] = None,
+        rate_limit: bool = False,
+        rate_limit_rpm: int = 500,
+        rate_limit_tpm: int = 200000,
+        stream_usage: bool = True
     ):
         """
         Initialize OpenAI client
@@ -26,15 +153,115 @@ class OpenAIClient:
             model_name: Model name (gpt-4o-mini or gpt-4.1-mini)
             temperature: Temperature for generation
             max_tokens: Maximum tokens in response
+            base_url: OpenAI-compatible endpoint (defaults to OPENAI_BASE_URL env var, then api.openai.com)
+            timeout: Per-attempt read/write timeout in seconds (for streams: between chunks)
+            connect_timeout: Connection timeout in seconds
+            max_retries: Extra attempts on retryable errors (connection, timeout, 408/409/429/5xx)
+            retry_base_delay: First backoff in seconds (doubles per attempt, full jitter)
+            retry_max_delay: Backoff cap in seconds
+            max_connections: Shared connection pool size
+            max_keepalive_connections: Idle connections kept in the shared pool
+            hedge_requests: Send a duplicate request if the first is slower than the hedge delay
+            hedge_delay_ms: Hedge delay (None = observed p95 time to first response/chunk)
+            rate_limit: Queue calls on a client-side request/token limiter shared per endpoint and key
+            rate_limit_rpm: Initial requests per minute (corrected from x-ratelimit-* headers)
+            rate_limit_tpm: Initial tokens per minute (corrected from x-ratelimit-* headers)
+            stream_usage: Request a final usage chunk on streams (prompt/cached token counts)
         """
         self.api_key = api_key or OPENAI_API_KEY
         if not self.api_key:
             raise ValueError("OpenAI API Key is required. Set OPENAI_API_KEY environment variable.")
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        self.base_url = base_url or OPENAI_BASE_URL
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self._sdk_client: Optional[AsyncOpenAI] = None
+        self._http_client: Optional[httpx.AsyncClient] = None  # Pool _sdk_client was built on
         self.model_name = model_name
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_requests = hedge_requests
+        self.hedge_delay_ms = hedge_delay_ms
+        self.stream_usage = stream_usage
+        
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self._calls = 0
+        self._attempts = 0
+        self._retries: Dict[str, int] = {}
+        self._failures = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        
+        # One limiter per endpoint + key: that is the quota the provider enforces
+        self.rate_limiter: Optional[RateLimiter] = None
+        if rate_limit:
+            self.rate_limiter = get_rate_limiter(
+                f"{self.base_url or 'openai'}|{hash(self.api_key)}", rate_limit_rpm, rate_limit_tpm
+            )
+            self.token_counter = TokenCounter(model_name)
+            self._static_tokens: Dict[str, int] = {}
+        self._queue_waits: deque = deque(maxlen=LATENCY_WINDOW)
+        self._usage = {"responses": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """
+        SDK client on the running loop's shared pool
+        
+        Looked up on each call rather than fixed at construction, so the
+        client follows the pool to a new event loop or after the pools were
+        closed at shutdown.
+        """
+        http_client = get_shared_http_client(self.max_connections, self.max_keepalive_connections)
+        if self._sdk_client is None or self._http_client is not http_client:
+            # Retries are handled here (jittered, stream-aware), not by the SDK
+            self._sdk_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,
+                http_client=http_client
+            )
+            self._http_client = http_client
+        return self._sdk_client
+    
+    @classmethod
+    def from_model_config(cls, model_config, **overrides) -> "OpenAIClient":
+        """
+        Create client from ModelConfig
+        
+        Args:
+            model_config: ModelConfig
+            **overrides: Constructor arguments replacing the config values (api_key, base_url, ...)
+            
+        Returns:
+            OpenAIClient instance
+        """
+        params = dict(
+            model_name=model_config.model_name,
+            temperature=model_config.temperature,
+            max_tokens=model_config.max_tokens,
+            base_url=model_config.base_url,
+            timeout=model_config.timeout,
+            connect_timeout=model_config.connect_timeout,
+            max_retries=model_config.max_retries,
+            retry_base_delay=model_config.retry_base_delay,
+            retry_max_delay=model_config.retry_max_delay,
+            max_connections=model_config.max_connections,
+            max_keepalive_connections=model_config.max_keepalive_connections,
+            hedge_requests=model_config.hedge_requests,
+            hedge_delay_ms=model_config.hedge_delay_ms,
+            rate_limit=model_config.rate_limit,
+            rate_limit_rpm=model_config.rate_limit_rpm,
+            rate_limit_tpm=model_config.rate_limit_tpm,
+            stream_usage=model_config.stream_usage
+        )
+        params.update(overrides)
+        return cls(**params)
     
     def _convert_messages(self, prompt: List) -> List[Dict[str, str]]:
         """
@@ -158,12 +385,61 @@ class OpenAIClient:
         
         return openai_tools if openai_tools else None
     
-    async def generate_response(
+    def _build_request_params(
         self,
         prompt: List,
         tools: Optional[List] = None,
         system_instruction: Optional[str] = None,
         max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Build chat.completions.create parameters
+        
+        Args:
+            prompt: List of messages (conversation history)
+            tools: List of tools/functions available
+            system_instruction: System instruction/prompt
+            max_tokens: Maximum tokens in response
+            
+        Returns:
+            Request parameters
+        """
+        # Convert messages to OpenAI format
+        messages = self._convert_messages(prompt)
+        
+        # Add system instruction if provided
+        if system_instruction:
+            messages.insert(0, {
+                "role": "system",
+                "content": system_instruction
+            })
+        
+        # Convert tools to OpenAI format
+        openai_tools = self._convert_tools(tools)
+        
+        # Prepare request
+        request_params = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": self.temperature,
+        }
+        
+        if max_tokens or self.max_tokens:
+            request_params["max_tokens"] = max_tokens or self.max_tokens
+        
+        if openai_tools:
+            request_params["tools"] = openai_tools
+            request_params["tool_choice"] = "auto"
+        
+        return request_params
+    
+    async def generate_response(
+        self,
+        prompt: List,
+        tools: Optional[List] = None,
+        system_instruction: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        fairness_key: Optional[str] = None
     ):
         """
         Generate response from OpenAI API
@@ -173,46 +449,309 @@ class OpenAIClient:
             tools: List of tools/functions available
             system_instruction: System instruction/prompt
             max_tokens: Maximum tokens in response
+            fairness_key: Rate limiter queue (conversation ID); queues are served round-robin
             
         Returns:
             OpenAI response object
         """
         try:
-            # Convert messages to OpenAI format
-            messages = self._convert_messages(prompt)
-            
-            # Add system instruction if provided
-            if system_instruction:
-                messages.insert(0, {
-                    "role": "system",
-                    "content": system_instruction
-                })
-            
-            # Convert tools to OpenAI format
-            openai_tools = self._convert_tools(tools)
-            
-            # Prepare request
-            request_params = {
-                "model": self.model_name,
-                "messages": messages,
-                "temperature": self.temperature,
-            }
+            request_params = self._build_request_params(prompt, tools, system_instruction, max_tokens)
             
-            if max_tokens or self.max_tokens:
-                request_params["max_tokens"] = max_tokens or self.max_tokens
-            
-            if openai_tools:
-                request_params["tools"] = openai_tools
-                request_params["tool_choice"] = "auto"
-            
-            # Make API call
-            response = await self.client.chat.completions.create(**request_params)
+            # Make API call (retried on transient errors, optionally hedged)
+            with span("llm.generate", model=self.model_name):
+                response = await self._call(
+                    lambda: self._create(request_params),
+                    cost=self._estimate_tokens(request_params),
+                    fairness_key=fairness_key
+                )
+            self._record_usage(getattr(response, "usage", None))
             
             return response
             
         except Exception as e:
             logger.error(f"Error calling OpenAI API: {e}", exc_info=True)
             raise
+    
+    async def stream_response(
+        self,
+        prompt: List,
+        tools: Optional[List] = None,
+        system_instruction: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        fairness_key: Optional[str] = None
+    ) -> AsyncGenerator[Any, None]:
+        """
+        Generate response from OpenAI API as a stream of chunks
+        
+        Args:
+            prompt: List of messages (conversation history)
+            tools: List of tools/functions available
+            system_instruction: System instruction/prompt
+            max_tokens: Maximum tokens in response
+            fairness_key: Rate limiter queue (conversation ID); queues are served round-robin
+            
+        Yields:
+            OpenAI ChatCompletionChunk objects (content and tool_calls arrive as deltas)
+        """
+        try:
+            request_params = self._build_request_params(prompt, tools, system_instruction, max_tokens)
+            request_params["stream"] = True
+            if self.stream_usage:
+                # One extra chunk with no choices carries the usage at the end
+                request_params["stream_options"] = {"include_usage": True}
+            
+            # Retries and hedging cover the request up to the first chunk; once
+            # chunks have been passed on, a failure is raised to the caller
+            start = time.perf_counter()
+            with span("llm.first_chunk", model=self.model_name):
+                stream, first_chunk = await self._call(
+                    lambda: self._open_stream(request_params),
+                    discard=lambda opened: opened[0].close(),
+                    cost=self._estimate_tokens(request_params),
+                    fairness_key=fairness_key
+                )
+            try:
+                if first_chunk is not None:
+                    self._record_usage(first_chunk.usage)
+                    yield first_chunk
+                async for chunk in stream:
+                    self._record_usage(chunk.usage)
+                    yield chunk
+            finally:
+                await stream.close()
+                # Timed by hand: a span left open across yields would parent the consumer's spans
+                record_span("llm.stream", time.perf_counter() - start, model=self.model_name)
+                
+        except Exception as e:
+            logger.error(f"Error streaming from OpenAI API: {e}", exc_info=True)
+            raise
+    
+    async def _open_stream(self, request_params: Dict[str, Any]) -> Tuple[Any, Any]:
+        """Start a streamed completion and wait for its first chunk"""
+        stream = await self._create(request_params)
+        try:
+            first_chunk = await stream.__anext__()
+        except StopAsyncIteration:
+            first_chunk = None
+        except BaseException:
+            await stream.close()
+            raise
+        return stream, first_chunk
+    
+    async def _create(self, request_params: Dict[str, Any]) -> Any:
+        """Send one chat.completions request, feeding rate limit headers to the limiter"""
+        if self.rate_limiter is None:
+            return await self.client.chat.completions.create(**request_params)
+        raw = await self.client.chat.completions.with_raw_response.create(**request_params)
+        self.rate_limiter.update_from_headers(raw.headers)
+        return raw.parse()
+    
+    def _count_static(self, text: str) -> int:
+        """Token count of a prompt part that repeats across calls (cached)"""
+        count = self._static_tokens.get(text)
+        if count is None:
+            if len(self._static_tokens) >= STATIC_TOKEN_CACHE_SIZE:
+                self._static_tokens.clear()
+            count = self.token_counter.count_text(text)
+            self._static_tokens[text] = count
+        return count
+    
+    def _estimate_tokens(self, request_params: Dict[str, Any]) -> int:
+        """Quota cost of a request as the provider counts it: prompt + max_tokens"""
+        if self.rate_limiter is None:
+            return 0
+        cost = request_params.get("max_tokens") or 0
+        for message in request_params["messages"]:
+            if message.get("role") == "system":
+                cost += self._count_static(message.get("content") or "")
+            else:
+                cost += self.token_counter.count_message(message)
+        if request_params.get("tools"):
+            cost += self._count_static(json.dumps(request_params["tools"], ensure_ascii=False))
+        return cost
+    
+    async def _call(
+        self,
+        make_call: Callable[[], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        cost: int = 0,
+        fairness_key: Optional[str] = None
+    ) -> Any:
+        """
+        Run an API call with jittered exponential retries and optional hedging
+        
+        Each attempt first waits for quota on the rate limiter (if enabled);
+        a 429 then sends the call back to the queue instead of using a retry.
+        
+        Args:
+            make_call: Starts one attempt
+            discard: Releases the result of a hedged attempt that lost the race
+            cost: Estimated tokens per attempt (prompt + max_tokens)
+            fairness_key: Rate limiter queue (conversation ID)
+            
+        Returns:
+            Result of the first successful attempt
+        """
+        self._calls += 1
+        attempt = 0
+        requeues = 0
+        while True:
+            try:
+                if self.rate_limiter is not None:
+                    wait = await self.rate_limiter.acquire(cost, fairness_key or "default")
+                    self._queue_waits.append(wait)
+                    record_span("llm.queue_wait", wait)
+                return await self._hedged(make_call, discard, cost)
+            except Exception as e:
+                if (
+                    self.rate_limiter is not None
+                    and getattr(e, "status_code", None) == 429
+                    and requeues < MAX_RATE_LIMIT_REQUEUES
+                ):
+                    # The limiter has paused for the server's retry-after; wait in the queue again
+                    requeues += 1
+                    self._retries["429_requeued"] = self._retries.get("429_requeued", 0) + 1
+                    continue
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    self._failures += 1
+                    raise
+                reason = str(getattr(e, "status_code", None) or type(e).__name__)
+                self._retries[reason] = self._retries.get(reason, 0) + 1
+                backoff = min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt))
+                delay = random.uniform(0, backoff)
+                server_delay = _retry_after(e)
+                if server_delay is not None:
+                    delay = min(max(delay, server_delay), self.retry_max_delay)
+                attempt += 1
+                logger.warning(
+                    f"OpenAI call failed ({reason}), retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+    
+    async def _timed(self, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one attempt and record its latency on success"""
+        self._attempts += 1
+        start = time.perf_counter()
+        try:
+            with span("llm.attempt"):
+                result = await make_call()
+        except openai.APIStatusError as e:
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(e.response.headers)
+                if e.status_code == 429:
+                    self.rate_limiter.on_rate_limited(_retry_after(e))
+            raise
+        self._latencies.append(time.perf_counter() - start)
+        return result
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging (None = do not hedge)"""
+        if not self.hedge_requests:
+            return None
+        if self.hedge_delay_ms is not None:
+            return self.hedge_delay_ms / 1000
+        if len(self._latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+    
+    async def _hedged(
+        self,
+        make_call: Callable[[], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[Any]]] = None,
+        cost: int = 0
+    ) -> Any:
+        """
+        Run an attempt; if it is still pending after the hedge delay, start a
+        duplicate and return whichever succeeds first
+        
+        The duplicate is skipped when the rate limiter has no spare quota for it.
+        """
+        delay = self._hedge_delay()
+        primary = asyncio.ensure_future(self._timed(make_call))
+        if delay is None:
+            return await primary
+        
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+        except BaseException:
+            # Caller cancelled during the hedge delay: asyncio.wait leaves the attempt running
+            self._cancel_attempt(primary, discard)
+            raise
+        if done:
+            return primary.result()
+        if self.rate_limiter is not None and not self.rate_limiter.try_acquire(cost):
+            return await primary
+        
+        self._hedges += 1
+        hedge = asyncio.ensure_future(self._timed(make_call))
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if not task.exception()), None)
+                if winner is None:
+                    error = next(iter(done)).exception()
+                    continue
+                if winner is hedge:
+                    self._hedge_wins += 1
+                # A simultaneous second success is released too
+                for task in done:
+                    if task is not winner and not task.exception() and discard:
+                        await discard(task.result())
+                return winner.result()
+            raise error
+        finally:
+            # Losers, and both attempts if the caller was cancelled
+            for task in pending:
+                self._cancel_attempt(task, discard)
+    
+    def _cancel_attempt(self, task: asyncio.Future, discard: Optional[Callable[[Any], Awaitable[Any]]]):
+        """Cancel an attempt, releasing its result if it completes anyway"""
+        task.cancel()
+        if discard:
+            task.add_done_callback(lambda t: self._discard_late(t, discard))
+    
+    @staticmethod
+    def _discard_late(task: asyncio.Task, discard: Callable[[Any], Awaitable[Any]]):
+        """Release the result of a cancelled hedge attempt that completed anyway"""
+        if not task.cancelled() and not task.exception():
+            asyncio.ensure_future(discard(task.result()))
+    
+    def _record_usage(self, usage: Any):
+        """Add a response's token usage to the totals"""
+        if usage is None:
+            return
+        self._usage["responses"] += 1
+        for key, value in usage_summary(usage).items():
+            self._usage[key] += value
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get call, retry and hedging counters, recent latency and rate limiter queue wait percentiles"""
+        ordered = sorted(self._latencies)
+        percentile = lambda p: round(ordered[int(p * (len(ordered) - 1))] * 1000, 1) if ordered else None
+        waits = sorted(self._queue_waits)
+        wait_percentile = lambda p: round(waits[int(p * (len(waits) - 1))] * 1000, 1) if waits else None
+        return {
+            "calls": self._calls,
+            "attempts": self._attempts,
+            "retries": dict(self._retries),
+            "failures": self._failures,
+            "hedges": self._hedges,
+            "hedge_wins": self._hedge_wins,
+            "hedge_delay_ms": round(self._hedge_delay() * 1000, 1) if self._hedge_delay() is not None else None,
+            "latency_p50_ms": percentile(0.5),
+            "latency_p95_ms": percentile(0.95),
+            "queue_wait_p50_ms": wait_percentile(0.5),
+            "queue_wait_p95_ms": wait_percentile(0.95),
+            "usage": dict(self._usage),
+            "cached_token_ratio": (
+                round(self._usage["cached_tokens"] / self._usage["prompt_tokens"], 4)
+                if self._usage["prompt_tokens"] else None
+            ),
+            "rate_limiter": self.rate_limiter.stats() if self.rate_limiter is not None else None,
+        }
 
 
 # Default client instance
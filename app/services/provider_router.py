@@ -0,0 +1,268 @@
+"""Route LLM requests across several OpenAI-compatible providers with failover"""
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import openai
+
+from app.services.openai_client import OpenAIClient, is_retryable_error
+
+logger = logging.getLogger(__name__)
+
+# OpenAI-compatible endpoints and API key variables of the supported providers
+PROVIDER_DEFAULTS = {
+    "openai": (None, "OPENAI_API_KEY"),  # None = OPENAI_BASE_URL env var, then api.openai.com
+    "gemini": ("https://generativelanguage.googleapis.com/v1beta/openai/", "GEMINI_API_KEY"),
+    "anthropic": ("https://api.anthropic.com/v1/", "ANTHROPIC_API_KEY"),
+}
+
+# Provider-specific errors worth trying elsewhere (bad key, unknown model on that endpoint)
+FAILOVER_STATUS_CODES = {401, 403, 404}
+
+
+def _should_fail_over(error: BaseException) -> bool:
+    """Whether another provider may succeed where this one failed"""
+    if is_retryable_error(error):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in FAILOVER_STATUS_CODES
+
+
+class ProviderHealth:
+    """Moving averages of a provider's latency and error rate, plus circuit state"""
+
+    def __init__(self, alpha: float):
+        """
+        Initialize health record
+
+        Args:
+            alpha: Weight of the newest sample in the moving averages
+        """
+        self.alpha = alpha
+        self.latency: Optional[float] = None  # Seconds to first chunk/response
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.error_rate *= 1 - self.alpha
+        self.consecutive_failures = 0
+
+    def record_failure(self, threshold: int, cooldown: float):
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            self.cooldown_until = time.monotonic() + cooldown
+
+    def score(self, error_penalty: float) -> float:
+        """Lower is better; unmeasured providers score 0 so they get a first sample"""
+        return (self.latency or 0.0) + self.error_rate * error_penalty
+
+
+class ProviderRouter:
+    """
+    Drop-in replacement for OpenAIClient that spreads requests over providers
+
+    Each request goes to the provider with the best score (latency moving
+    average plus an error-rate penalty); a small fraction explores a random
+    provider so a recovered endpoint is noticed. When a provider fails before
+    the first chunk, the next one is tried right away. Providers failing
+    repeatedly are cooled down and only used when all others have failed.
+    """
+
+    def __init__(
+        self,
+        clients: Dict[str, OpenAIClient],
+        ewma_alpha: float = 0.2,
+        error_penalty_s: float = 5.0,
+        failure_threshold: int = 3,
+        cooldown_s: float = 30.0,
+        explore_rate: float = 0.05
+    ):
+        """
+        Initialize router
+
+        Args:
+            clients: Client per provider name, in preference order for ties
+            ewma_alpha: Weight of the newest sample in latency/error averages
+            error_penalty_s: Seconds added to the score per unit of error rate
+            failure_threshold: Consecutive failures before a cooldown
+            cooldown_s: Cooldown length in seconds
+            explore_rate: Fraction of requests sent to a random available provider
+        """
+        if not clients:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.clients = clients
+        self.health = {name: ProviderHealth(ewma_alpha) for name in clients}
+        self.error_penalty_s = error_penalty_s
+        self.failure_threshold = failure_threshold
+        self.cooldown_s = cooldown_s
+        self.explore_rate = explore_rate
+        self.model_name = next(iter(clients.values())).model_name
+        self._failovers = 0
+
+    @classmethod
+    def from_model_config(cls, model_config) -> "ProviderRouter":
+        """
+        Create router from ModelConfig.providers
+
+        Args:
+            model_config: ModelConfig with at least one provider
+
+        Returns:
+            ProviderRouter instance
+        """
+        clients = {}
+        for provider in model_config.providers:
+            default_url, default_key_env = PROVIDER_DEFAULTS.get(provider.provider, PROVIDER_DEFAULTS["openai"])
+            key_env = provider.api_key_env or default_key_env
+            api_key = os.getenv(key_env)
+            if not api_key:
+                raise ValueError(f"API key for provider {provider.name} is required. Set {key_env} environment variable.")
+            clients[provider.name] = OpenAIClient.from_model_config(
+                model_config,
+                api_key=api_key,
+                base_url=provider.base_url or default_url,
+                model_name=provider.model_name or model_config.model_name,
+                max_retries=0  # Fail over instead of retrying the same provider
+            )
+        return cls(
+            clients,
+            ewma_alpha=model_config.router_ewma_alpha,
+            error_penalty_s=model_config.router_error_penalty_s,
+            failure_threshold=model_config.router_failure_threshold,
+            cooldown_s=model_config.router_cooldown_s,
+            explore_rate=model_config.router_explore_rate
+        )
+
+    def _ranked(self, explore: bool = True) -> List[str]:
+        """Provider names in the order to try them"""
+        now = time.monotonic()
+        available = [name for name in self.clients if self.health[name].cooldown_until <= now]
+        cooling = [name for name in self.clients if name not in available]
+        available.sort(key=lambda name: self.health[name].score(self.error_penalty_s))
+        if explore and len(available) > 1 and random.random() < self.explore_rate:
+            pick = random.randrange(1, len(available))
+            available[0], available[pick] = available[pick], available[0]
+        # Last resort, soonest to recover first
+        cooling.sort(key=lambda name: self.health[name].cooldown_until)
+        return available + cooling
+
+    def _record_failure(self, name: str, error: BaseException):
+        health = self.health[name]
+        was_cooling = health.cooldown_until > time.monotonic()
+        health.record_failure(self.failure_threshold, self.cooldown_s)
+        if not was_cooling and health.cooldown_until > time.monotonic():
+            logger.warning(f"Provider {name} cooled down for {self.cooldown_s}s after {health.consecutive_failures} failures")
+        logger.warning(f"Provider {name} failed ({getattr(error, 'status_code', None) or type(error).__name__})")
+
+    async def generate_response(self, prompt: List, **kwargs):
+        """
+        Generate response from the best available provider
+
+        Args:
+            prompt: List of messages (conversation history)
+            **kwargs: OpenAIClient.generate_response arguments
+
+        Returns:
+            OpenAI response object
+        """
+        error: Optional[BaseException] = None
+        for attempt, name in enumerate(self._ranked()):
+            if attempt:
+                self._failovers += 1
+            start = time.perf_counter()
+            try:
+                response = await self.clients[name].generate_response(prompt, **kwargs)
+            except Exception as e:
+                if not _should_fail_over(e):
+                    raise
+                self._record_failure(name, e)
+                error = e
+                continue
+            self.health[name].record_success(time.perf_counter() - start)
+            return response
+        raise error
+
+    async def stream_response(self, prompt: List, **kwargs) -> AsyncGenerator[Any, None]:
+        """
+        Stream from the best available provider, failing over until the first chunk
+
+        Args:
+            prompt: List of messages (conversation history)
+            **kwargs: OpenAIClient.stream_response arguments
+
+        Yields:
+            OpenAI ChatCompletionChunk objects
+        """
+        error: Optional[BaseException] = None
+        for attempt, name in enumerate(self._ranked()):
+            if attempt:
+                self._failovers += 1
+            start = time.perf_counter()
+            stream = self.clients[name].stream_response(prompt, **kwargs)
+            try:
+                first_chunk = await stream.__anext__()
+            except StopAsyncIteration:
+                self.health[name].record_success(time.perf_counter() - start)
+                return
+            except Exception as e:
+                await stream.aclose()
+                if not _should_fail_over(e):
+                    raise
+                self._record_failure(name, e)
+                error = e
+                continue
+            self.health[name].record_success(time.perf_counter() - start)
+
+            # Chunks have been passed on: later failures go to the caller
+            try:
+                yield first_chunk
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+            return
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-provider health and client stats"""
+        now = time.monotonic()
+        return {
+            "failovers": self._failovers,
+            "order": self._ranked(explore=False),
+            "providers": {
+                name: {
+                    "model_name": client.model_name,
+                    "base_url": client.base_url,
+                    "latency_ewma_ms": round(self.health[name].latency * 1000, 1) if self.health[name].latency is not None else None,
+                    "error_rate": round(self.health[name].error_rate, 4),
+                    "requests": self.health[name].requests,
+                    "failures": self.health[name].failures,
+                    "cooldown_remaining_s": round(max(0.0, self.health[name].cooldown_until - now), 1),
+                    "client": client.stats(),
+                }
+                for name, client in self.clients.items()
+            },
+        }
+
+
+def create_llm_client(model_config):
+    """
+    Create the LLM client for an agent
+
+    Args:
+        model_config: ModelConfig
+
+    Returns:
+        ProviderRouter if providers are configured, else a single OpenAIClient
+    """
+    if model_config.providers:
+        return ProviderRouter.from_model_config(model_config)
+    return OpenAIClient.from_model_config(model_config)
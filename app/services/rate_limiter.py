@@ -0,0 +1,346 @@
+"""Client-side request/token rate limiting for LLM calls, shared by all agents"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Queue wait samples kept for percentiles
+WAIT_WINDOW = 1000
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: str) -> Optional[float]:
+    """
+    Parse an x-ratelimit-reset-* value ("1s", "6m0s", "20ms", "0.5s") to seconds
+
+    Args:
+        value: Header value
+
+    Returns:
+        Seconds, or None if unparseable
+    """
+    parts = _DURATION_PART.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Continuously refilling bucket (capacity per minute)"""
+
+    def __init__(self, per_minute: float):
+        """
+        Initialize bucket (starts full)
+
+        Args:
+            per_minute: Capacity, refilled evenly over a minute
+        """
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """Refill per second"""
+        return self.capacity / 60.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)"""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def consume(self, amount: float):
+        """Take `amount` (may go negative when a caller's cost exceeds the capacity)"""
+        self._refill()
+        self.level -= amount
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset_seconds: Optional[float]):
+        """
+        Align with the server's view of the quota
+
+        Args:
+            limit: Quota per minute reported by the server
+            remaining: Quota left reported by the server
+            reset_seconds: Time until the quota is fully restored
+        """
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            # Other processes share the quota, so the server count wins when lower
+            self.level = min(self.level, float(remaining))
+            if reset_seconds and reset_seconds > 0:
+                # Full again at the server's reset time, so at most this much is left now
+                self.level = min(self.level, self.capacity - reset_seconds * self.rate)
+
+
+class _Waiter:
+    """A queued caller"""
+
+    __slots__ = ("cost", "future", "enqueued")
+
+    def __init__(self, cost: float, future: asyncio.Future):
+        self.cost = cost
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class _LoopQueues:
+    """Waiting callers of one event loop and the task that admits them"""
+
+    __slots__ = ("queues", "wakeup", "dispatcher")
+
+    def __init__(self):
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.dispatcher: Optional[asyncio.Task] = None
+
+    def depth(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+
+class RateLimiter:
+    """
+    Request and token buckets with fair queueing
+
+    Callers wait in per-key queues (one key per conversation) that are served
+    round-robin, so a conversation with many calls cannot starve the others.
+    A call is admitted when both the request bucket and the token bucket
+    (estimated prompt + max_tokens) can cover it. Buckets are corrected from
+    the x-ratelimit-* response headers, and a 429 pauses admission until its
+    retry-after has passed.
+
+    The buckets are shared process-wide; queues and their dispatcher are kept
+    per event loop, since futures, events and tasks are bound to the loop
+    that created them.
+    """
+
+    def __init__(self, requests_per_minute: int = 500, tokens_per_minute: int = 200000):
+        """
+        Initialize limiter
+
+        Args:
+            requests_per_minute: Initial request quota (headers override it)
+            tokens_per_minute: Initial token quota (headers override it)
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self._loops: Dict[asyncio.AbstractEventLoop, _LoopQueues] = {}
+        self._paused_until = 0.0
+        self._waits: Deque[float] = deque(maxlen=WAIT_WINDOW)
+        self._granted = 0
+        self._queued_total = 0
+        self._rate_limited = 0
+        self._max_queue_depth = 0
+
+    def queue_depth(self) -> int:
+        """Callers currently waiting"""
+        return sum(state.depth() for state in self._loops.values())
+
+    def _can_admit(self, cost: float) -> float:
+        """Seconds until a call of this cost can be admitted (0 = now)"""
+        paused = self._paused_until - time.monotonic()
+        return max(paused, self.requests.time_until(1), self.tokens.time_until(cost), 0.0)
+
+    def _admit(self, cost: float, waited: float):
+        self.requests.consume(1)
+        self.tokens.consume(cost)
+        self._granted += 1
+        self._waits.append(waited)
+
+    def try_acquire(self, cost: float) -> bool:
+        """
+        Admit a call only if nobody is queued and quota is available now
+        (used for optional work such as hedged requests)
+
+        Args:
+            cost: Estimated tokens
+
+        Returns:
+            True if admitted
+        """
+        if self.queue_depth() or self._can_admit(cost) > 0:
+            return False
+        self._admit(cost, 0.0)
+        return True
+
+    async def acquire(self, cost: float, key: str = "default") -> float:
+        """
+        Wait for quota for one call
+
+        Args:
+            cost: Estimated tokens (prompt + max_tokens)
+            key: Fairness key (conversation ID)
+
+        Returns:
+            Seconds spent waiting
+        """
+        if not self.queue_depth() and self._can_admit(cost) == 0:
+            self._admit(cost, 0.0)
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        state = self._loop_queues(loop)
+        waiter = _Waiter(cost, loop.create_future())
+        state.queues.setdefault(key, deque()).append(waiter)
+        self._queued_total += 1
+        self._max_queue_depth = max(self._max_queue_depth, self.queue_depth())
+        if state.dispatcher is None or state.dispatcher.done():
+            state.dispatcher = loop.create_task(self._dispatch(state))
+        state.wakeup.set()
+        return await waiter.future
+
+    def _loop_queues(self, loop: asyncio.AbstractEventLoop) -> _LoopQueues:
+        """Queues of the running loop (created on first use)"""
+        for stale in [other for other in self._loops if other.is_closed()]:
+            # Its waiters and dispatcher died with the loop
+            del self._loops[stale]
+        state = self._loops.get(loop)
+        if state is None:
+            state = self._loops[loop] = _LoopQueues()
+        return state
+
+    @staticmethod
+    def _next_waiter(state: _LoopQueues) -> Optional[Tuple[str, _Waiter]]:
+        """Head of the next non-empty queue in round-robin order (drops cancelled waiters)"""
+        while state.queues:
+            key, queue = next(iter(state.queues.items()))
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if queue:
+                return key, queue[0]
+            del state.queues[key]
+        return None
+
+    async def _dispatch(self, state: _LoopQueues):
+        """Admit one loop's queued callers round-robin as quota becomes available"""
+        while True:
+            head = self._next_waiter(state)
+            if head is None:
+                state.wakeup.clear()
+                if self._next_waiter(state) is None:
+                    await state.wakeup.wait()
+                continue
+
+            key, waiter = head
+            delay = self._can_admit(waiter.cost)
+            if delay > 0:
+                # Also wake on header updates or new callers, which may change the delay
+                state.wakeup.clear()
+                try:
+                    await asyncio.wait_for(state.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue = state.queues.pop(key)
+            queue.popleft()
+            if queue:
+                state.queues[key] = queue  # Back of the round-robin order
+            waited = time.monotonic() - waiter.enqueued
+            self._admit(waiter.cost, waited)
+            waiter.future.set_result(waited)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Correct the buckets from x-ratelimit-* response headers
+
+        Args:
+            headers: Response headers
+        """
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers[name]) if name in headers else None
+            except ValueError:
+                return None
+
+        if "x-ratelimit-limit-requests" not in headers and "x-ratelimit-limit-tokens" not in headers:
+            return
+        self.requests.sync(
+            number("x-ratelimit-limit-requests"),
+            number("x-ratelimit-remaining-requests"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests", ""))
+        )
+        self.tokens.sync(
+            number("x-ratelimit-limit-tokens"),
+            number("x-ratelimit-remaining-tokens"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens", ""))
+        )
+        self._wake_dispatchers()
+
+    def _wake_dispatchers(self):
+        """Let every loop's dispatcher re-check its delay"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        for loop, state in list(self._loops.items()):
+            if loop is running:
+                state.wakeup.set()
+            elif not loop.is_closed():
+                loop.call_soon_threadsafe(state.wakeup.set)
+
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """
+        Pause admission after a 429
+
+        Args:
+            retry_after: Server-requested delay in seconds (default 1s)
+        """
+        self._rate_limited += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + (retry_after or 1.0))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get quota levels, queue depth and queue wait percentiles"""
+        waits = sorted(self._waits)
+        percentile = lambda p: round(waits[int(p * (len(waits) - 1))] * 1000, 1) if waits else 0.0
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity,
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level, 1),
+            "queue_depth": self.queue_depth(),
+            "queued_conversations": sum(len(state.queues) for state in self._loops.values()),
+            "max_queue_depth": self._max_queue_depth,
+            "granted": self._granted,
+            "queued_total": self._queued_total,
+            "rate_limited": self._rate_limited,
+            "queue_wait_p50_ms": percentile(0.5),
+            "queue_wait_p95_ms": percentile(0.95),
+            "queue_wait_max_ms": round(waits[-1] * 1000, 1) if waits else 0.0,
+        }
+
+
+_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(key: str, requests_per_minute: int, tokens_per_minute: int) -> RateLimiter:
+    """
+    Get the process-wide limiter for an account/endpoint (created on first use)
+
+    Args:
+        key: Quota identity (endpoint + API key)
+        requests_per_minute: Initial request quota, only used when created
+        tokens_per_minute: Initial token quota, only used when created
+
+    Returns:
+        Shared RateLimiter
+    """
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        _limiters[key] = limiter
+        logger.info(f"Rate limiter created: {requests_per_minute} RPM, {tokens_per_minute} TPM")
+    return limiter
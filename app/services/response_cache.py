@@ -0,0 +1,176 @@
+"""Semantic cache of assistant responses for stateless first turns"""
+import hashlib
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_fingerprint(*parts: Any) -> str:
+    """Stable hash of everything that shapes a response besides the query (system prompt, model, ...)"""
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class SemanticResponseCache:
+    """
+    Reuse a previous response when a new query is close enough in embedding space
+
+    Entries are scoped by a prompt fingerprint, so a changed system prompt or
+    model never serves old answers. Entries expire after `ttl_seconds`; beyond
+    `max_size` the oldest are dropped. Lookups are a dot product against the
+    stored (normalized) query embeddings.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        ttl_seconds: Optional[float] = 3600,
+        max_size: int = 1000,
+        max_query_chars: int = 200,
+        bypass_patterns: Optional[List[str]] = None
+    ):
+        """
+        Initialize cache
+
+        Args:
+            similarity_threshold: Min cosine similarity between queries for a hit
+            ttl_seconds: Entry lifetime (None = no expiry)
+            max_size: Max entries kept (oldest dropped first)
+            max_query_chars: Longer queries bypass the cache
+            bypass_patterns: Regexes; matching queries bypass the cache
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.max_query_chars = max_query_chars
+        self.bypass_patterns = [re.compile(p, re.IGNORECASE) for p in (bypass_patterns or [])]
+        # Parallel arrays, oldest first
+        self._vecs: Optional[np.ndarray] = None
+        self._entries: List[Dict[str, Any]] = []
+        self._hits = 0
+        self._misses = 0
+        self._bypassed: Dict[str, int] = {}
+        self._insertions = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def bypass_reason(self, query: str, is_first_turn: bool) -> Optional[str]:
+        """
+        Check whether a query must skip the cache
+
+        Args:
+            query: User message
+            is_first_turn: Whether the conversation has no history yet
+
+        Returns:
+            Reason string if bypassed, None if the cache may be used
+        """
+        reason = None
+        if not is_first_turn:
+            reason = "not_first_turn"
+        elif len(query) > self.max_query_chars:
+            reason = "too_long"
+        elif any(p.search(query) for p in self.bypass_patterns):
+            reason = "pattern"
+        if reason:
+            self._bypassed[reason] = self._bypassed.get(reason, 0) + 1
+        return reason
+
+    def _expire(self):
+        """Drop expired entries (they are oldest first)"""
+        if self.ttl_seconds is None or not self._entries:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = 0
+        while expired < len(self._entries) and self._entries[expired]["created"] < cutoff:
+            expired += 1
+        if expired:
+            self._drop_oldest(expired)
+            self._expirations += expired
+
+    def _drop_oldest(self, count: int):
+        del self._entries[:count]
+        self._vecs = self._vecs[count:] if self._entries else None
+
+    def lookup(self, query_vec: np.ndarray, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached response for a query embedding
+
+        Args:
+            query_vec: Normalized query embedding
+            fingerprint: Prompt fingerprint the response must match
+
+        Returns:
+            {"response", "query", "similarity"} on a hit, else None
+        """
+        self._expire()
+        if self._vecs is None:
+            self._misses += 1
+            return None
+
+        sims = self._vecs @ np.asarray(query_vec, dtype=np.float32)
+        for i in np.argsort(-sims):
+            if sims[i] < self.similarity_threshold:
+                break
+            entry = self._entries[i]
+            if entry["fingerprint"] == fingerprint:
+                entry["hits"] += 1
+                self._hits += 1
+                return {"response": entry["response"], "query": entry["query"], "similarity": float(sims[i])}
+        self._misses += 1
+        return None
+
+    def put(self, query: str, query_vec: np.ndarray, response: str, fingerprint: str):
+        """
+        Store a response
+
+        Args:
+            query: User message (kept for debugging/stats)
+            query_vec: Normalized query embedding
+            response: Assistant response
+            fingerprint: Prompt fingerprint
+        """
+        self._expire()
+        vec = np.asarray(query_vec, dtype=np.float32).reshape(1, -1)
+        self._vecs = vec if self._vecs is None else np.vstack([self._vecs, vec])
+        self._entries.append({
+            "query": query,
+            "response": response,
+            "fingerprint": fingerprint,
+            "created": time.monotonic(),
+            "hits": 0,
+        })
+        self._insertions += 1
+        overflow = len(self._entries) - self.max_size
+        if overflow > 0:
+            self._drop_oldest(overflow)
+            self._evictions += overflow
+
+    def clear(self):
+        """Drop all entries"""
+        self._entries = []
+        self._vecs = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get size and hit/miss/bypass counters"""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "similarity_threshold": self.similarity_threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            "bypassed": dict(self._bypassed),
+            "insertions": self._insertions,
+            "evictions": self._evictions,
+            "expirations": self._expirations,
+        }
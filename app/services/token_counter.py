@@ -0,0 +1,84 @@
+"""Token counting for chat messages (tiktoken if installed, else a character estimate)"""
+import json
+import logging
+import math
+from typing import Any, Dict, Optional
+
+try:
+    import tiktoken
+except ImportError:  # Optional dependency
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing tokens added by the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Fallback estimate when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """Count tokens of texts and chat messages for one model"""
+
+    def __init__(self, model_name: str = "gpt-4o-mini"):
+        """
+        Initialize token counter
+
+        Args:
+            model_name: Model whose tokenizer is used (falls back to o200k_base)
+        """
+        self.model_name = model_name
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning(f"Failed to load tiktoken encoding for {model_name}: {e}, using estimate")
+        else:
+            logger.info("tiktoken not installed, estimating tokens from characters")
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the real tokenizer"""
+        return self._encoding is not None
+
+    def count_text(self, text: Optional[str]) -> int:
+        """
+        Count tokens of a text
+
+        Args:
+            text: Text (None counts as 0)
+
+        Returns:
+            Token count
+        """
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        """
+        Count tokens of a chat message (content, tool calls and framing)
+
+        Args:
+            message: OpenAI-format message
+
+        Returns:
+            Token count
+        """
+        tokens = MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content")
+        if isinstance(content, str):
+            tokens += self.count_text(content)
+        elif content:
+            tokens += self.count_text(json.dumps(content, ensure_ascii=False))
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call.get("function", {})
+            tokens += self.count_text(function.get("name")) + self.count_text(function.get("arguments"))
+        if message.get("tool_call_id"):
+            tokens += self.count_text(message["tool_call_id"])
+        return tokens
@@ -0,0 +1,299 @@
+"""Conversation history stores with bounded memory"""
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.services.token_counter import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+def _message_bytes(message: Dict[str, Any]) -> int:
+    """Approximate in-memory size of a message (its JSON size)"""
+    return len(json.dumps(message, ensure_ascii=False).encode("utf-8"))
+
+
+class ConversationStore(ABC):
+    """Interface for conversation history storage (one message list per conversation_id)"""
+
+    @abstractmethod
+    def get_messages(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Get a copy of the conversation's messages (empty list if unknown)"""
+
+    @abstractmethod
+    def append(self, conversation_id: str, message: Dict[str, Any]):
+        """Append a message, creating the conversation if needed"""
+
+    @abstractmethod
+    def begin_turn(self, conversation_id: str):
+        """Mark a turn in progress: the conversation must not be evicted until end_turn"""
+
+    @abstractmethod
+    def end_turn(self, conversation_id: str):
+        """Mark a turn begun with begin_turn as finished"""
+
+    @abstractmethod
+    def get_token_count(self, conversation_id: str) -> int:
+        """Get the token count of the conversation's history"""
+
+    @abstractmethod
+    def reset(self, conversation_id: Optional[str] = None):
+        """Clear one conversation, or all if conversation_id is None"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get store statistics"""
+
+
+class _Conversation:
+    """Messages plus accounting for one conversation"""
+
+    __slots__ = ("messages", "sizes", "bytes", "token_counts", "tokens", "turns", "last_access")
+
+    def __init__(self):
+        self.messages: List[Dict[str, Any]] = []
+        self.sizes: List[int] = []
+        self.bytes = 0
+        self.token_counts: List[int] = []
+        self.tokens = 0
+        self.turns = 0
+        self.last_access = time.monotonic()
+
+
+class InMemoryConversationStore(ConversationStore):
+    """
+    In-process store with LRU/TTL eviction and a per-conversation turn window
+
+    - At most `max_conversations` are kept; the least recently used is evicted.
+    - Conversations idle longer than `ttl_seconds` are dropped.
+    - Conversations with a turn in progress (begin_turn/end_turn) are never
+      evicted, so a turn's tool calls and results can't start a new history
+      without its user message; the store may exceed `max_conversations`
+      while every conversation is busy.
+    - Each conversation keeps its last `max_turns` turns (a turn starts at a
+      user message and includes the assistant/tool messages after it, so tool
+      calls are never separated from their results).
+    - If `max_tokens` is set, the oldest turns are dropped until the history
+      fits the token budget (the current turn is always kept). Token counts
+      are computed once per message at append time, so trimming only
+      subtracts cached counts instead of re-encoding the history.
+    - Trimming drops down to `trim_to_fraction` of the limit, not just below
+      it, so the history prefix (and the provider's prompt cache for it)
+      stays unchanged for several turns instead of shifting every turn.
+    """
+
+    def __init__(
+        self,
+        max_conversations: int = 1000,
+        ttl_seconds: Optional[float] = 3600,
+        max_turns: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        token_counter: Optional[TokenCounter] = None,
+        trim_to_fraction: float = 1.0
+    ):
+        """
+        Initialize store
+
+        Args:
+            max_conversations: Max conversations kept in memory
+            ttl_seconds: Idle time after which a conversation is dropped (None = never)
+            max_turns: Turns kept per conversation (None = unlimited)
+            max_tokens: Token budget for a conversation's history (None = unlimited)
+            token_counter: Counter for message tokens (default: TokenCounter())
+            trim_to_fraction: When a limit is exceeded, trim to this fraction of it
+        """
+        self.max_conversations = max_conversations
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or TokenCounter()
+        self.trim_to_fraction = trim_to_fraction
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self._active_turns: Dict[str, int] = {}
+        self._lru_evictions = 0
+        self._ttl_evictions = 0
+        self._trimmed_turns = 0
+        self._token_trimmed_turns = 0
+
+    def _expire(self):
+        """Drop idle conversations (oldest access first, so stop at the first fresh one)"""
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = []
+        for conversation_id, conversation in self._conversations.items():
+            if conversation.last_access >= cutoff:
+                break
+            if conversation_id not in self._active_turns:
+                expired.append(conversation_id)
+        for conversation_id in expired:
+            del self._conversations[conversation_id]
+            self._ttl_evictions += 1
+            logger.debug(f"Expired conversation {conversation_id}")
+
+    def _touch(self, conversation_id: str, create: bool) -> Optional[_Conversation]:
+        """Look up a conversation and mark it most recently used"""
+        self._expire()
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            if not create:
+                return None
+            conversation = _Conversation()
+            self._conversations[conversation_id] = conversation
+            while len(self._conversations) > self.max_conversations:
+                evicted_id = next((cid for cid in self._conversations if cid not in self._active_turns), None)
+                if evicted_id is None:
+                    break  # Every conversation has a turn in progress
+                del self._conversations[evicted_id]
+                self._lru_evictions += 1
+                logger.debug(f"Evicted least recently used conversation {evicted_id}")
+        else:
+            self._conversations.move_to_end(conversation_id)
+        conversation.last_access = time.monotonic()
+        return conversation
+
+    def _drop_oldest_turn(self, conversation: _Conversation):
+        """Remove messages up to (not including) the second user message"""
+        end = 1
+        while end < len(conversation.messages) and conversation.messages[end].get("role") != "user":
+            end += 1
+        conversation.bytes -= sum(conversation.sizes[:end])
+        conversation.tokens -= sum(conversation.token_counts[:end])
+        del conversation.messages[:end]
+        del conversation.sizes[:end]
+        del conversation.token_counts[:end]
+        conversation.turns -= 1
+        self._trimmed_turns += 1
+
+    def get_messages(self, conversation_id: str) -> List[Dict[str, Any]]:
+        conversation = self._touch(conversation_id, create=False)
+        return list(conversation.messages) if conversation else []
+
+    def append(self, conversation_id: str, message: Dict[str, Any]):
+        conversation = self._touch(conversation_id, create=True)
+        if message.get("role") == "user":
+            conversation.turns += 1
+            if self.max_turns is not None and conversation.turns > self.max_turns:
+                target = max(1, int(self.max_turns * self.trim_to_fraction))
+                while conversation.turns > target:
+                    self._drop_oldest_turn(conversation)
+        size = _message_bytes(message)
+        tokens = self.token_counter.count_message(message)
+        conversation.messages.append(message)
+        conversation.sizes.append(size)
+        conversation.bytes += size
+        conversation.token_counts.append(tokens)
+        conversation.tokens += tokens
+        if self.max_tokens is not None and conversation.tokens > self.max_tokens:
+            target = self.max_tokens * self.trim_to_fraction
+            while conversation.tokens > target and conversation.turns > 1:
+                self._drop_oldest_turn(conversation)
+                self._token_trimmed_turns += 1
+
+    def begin_turn(self, conversation_id: str):
+        self._active_turns[conversation_id] = self._active_turns.get(conversation_id, 0) + 1
+
+    def end_turn(self, conversation_id: str):
+        remaining = self._active_turns.get(conversation_id, 0) - 1
+        if remaining > 0:
+            self._active_turns[conversation_id] = remaining
+        else:
+            self._active_turns.pop(conversation_id, None)
+
+    def get_token_count(self, conversation_id: str) -> int:
+        """Get the cached token count of a conversation's history (0 if unknown)"""
+        conversation = self._conversations.get(conversation_id)
+        return conversation.tokens if conversation else 0
+
+    def reset(self, conversation_id: Optional[str] = None):
+        if conversation_id is None:
+            self._conversations.clear()
+        else:
+            self._conversations.pop(conversation_id, None)
+
+    def stats(self, top_n: int = 10) -> Dict[str, Any]:
+        """
+        Get store statistics
+
+        Args:
+            top_n: Number of largest conversations to list
+
+        Returns:
+            Counts, byte totals, evictions and the largest conversations
+        """
+        self._expire()
+        largest = sorted(self._conversations.items(), key=lambda item: item[1].bytes, reverse=True)[:top_n]
+        return {
+            "conversations": len(self._conversations),
+            "active_turns": sum(self._active_turns.values()),
+            "max_conversations": self.max_conversations,
+            "ttl_seconds": self.ttl_seconds,
+            "max_turns": self.max_turns,
+            "trim_to_fraction": self.trim_to_fraction,
+            "max_tokens": self.max_tokens,
+            "exact_token_counts": self.token_counter.exact,
+            "total_messages": sum(len(c.messages) for c in self._conversations.values()),
+            "total_bytes": sum(c.bytes for c in self._conversations.values()),
+            "total_tokens": sum(c.tokens for c in self._conversations.values()),
+            "lru_evictions": self._lru_evictions,
+            "ttl_evictions": self._ttl_evictions,
+            "trimmed_turns": self._trimmed_turns,
+            "token_trimmed_turns": self._token_trimmed_turns,
+            "largest": [
+                {
+                    "conversation_id": cid, "bytes": c.bytes, "tokens": c.tokens,
+                    "messages": len(c.messages), "turns": c.turns
+                }
+                for cid, c in largest
+            ],
+        }
+
+    def __contains__(self, conversation_id: str) -> bool:
+        return conversation_id in self._conversations
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+
+def create_conversation_store(
+    conversation_config,
+    token_counter: Optional[TokenCounter] = None,
+    reserved_tokens: int = 0
+) -> ConversationStore:
+    """
+    Create conversation store from ConversationConfig
+
+    Args:
+        conversation_config: ConversationConfig
+        token_counter: Counter for message tokens
+        reserved_tokens: Prompt tokens outside the history (system prompt, tool
+            schemas), subtracted from max_prompt_tokens to get the history budget
+
+    Returns:
+        ConversationStore instance
+    """
+    max_tokens = None
+    if conversation_config.max_prompt_tokens is not None:
+        max_tokens = max(
+            conversation_config.max_prompt_tokens - reserved_tokens,
+            conversation_config.min_history_tokens
+        )
+        logger.info(
+            f"History token budget: {max_tokens} "
+            f"(max_prompt_tokens={conversation_config.max_prompt_tokens}, reserved={reserved_tokens})"
+        )
+
+    store_type = conversation_config.store
+    if store_type == "memory":
+        return InMemoryConversationStore(
+            max_conversations=conversation_config.max_conversations,
+            ttl_seconds=conversation_config.conversation_ttl_seconds,
+            max_turns=conversation_config.max_turns,
+            max_tokens=max_tokens,
+            token_counter=token_counter,
+            trim_to_fraction=conversation_config.trim_to_fraction
+        )
+    raise ValueError(f"Unknown conversation store: {store_type}")
@@ -1,11 +1,15 @@
 """Base agent class with tool support"""
+import asyncio
 import logging
-from typing import AsyncGenerator, Dict, Any, Optional, List
+from typing import AsyncGenerator, Callable, Dict, Any, Optional, List, Tuple
 import json
 
 from app.core.agent_config import AgentConfig
-from app.services.openai_client import OpenAIClient
+from app.services.provider_router import create_llm_client
 from app.prompts.loader import build_prompt_from_config
+from app.prompts.assembly import with_rendered_turn
+from app.services.token_counter import TokenCounter
+from app.state.conversation_store import ConversationStore, create_conversation_store
 
 logger = logging.getLogger("agent")
 
@@ -24,22 +28,32 @@ class BaseAgent:
         self.agent_name = config.agent.get('name', 'Assistant')
         self.agent_description = config.agent.get('description', '')
         
-        # Initialize OpenAI client
+        # Initialize LLM client (routes across providers if several are configured)
         model_config = config.model
-        self.client = OpenAIClient(
-            model_name=model_config.model_name,
-            temperature=model_config.temperature,
-            max_tokens=model_config.max_tokens
-        )
+        self.client = create_llm_client(model_config)
         
         # Build system prompt
         self.system_prompt = self._build_system_prompt()
         
         # Build tools
         self.tools = self._build_tools()
+        self.tool_timeouts: Dict[str, Optional[float]] = {
+            tool_config.name: tool_config.timeout for tool_config in config.tools
+        }
         
-        # Conversation history per conversation_id
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
+        # Caps tool calls running at once across all conversations of this agent
+        self._tool_semaphore = asyncio.Semaphore(max(1, config.conversation.max_parallel_tools))
+        
+        # Conversation history per conversation_id (bounded, evicting, token-budgeted)
+        self.token_counter = TokenCounter(model_config.model_name)
+        reserved_tokens = self.token_counter.count_text(self.system_prompt)
+        if self.tools:
+            reserved_tokens += self.token_counter.count_text(json.dumps(self.tools, ensure_ascii=False))
+        self.conversations: ConversationStore = create_conversation_store(
+            config.conversation,
+            token_counter=self.token_counter,
+            reserved_tokens=reserved_tokens
+        )
         
         logger.info(f"Initialized base agent: {self.agent_name} with {len(self.tools)} tools")
     
@@ -118,17 +132,81 @@ class BaseAgent:
         logger.warning(f"Tool {tool_name} not implemented, returning empty result")
         return {"result": "Tool not implemented"}
     
+    async def _run_tool_call(
+        self,
+        tool_call: Dict[str, Any],
+        conversation_id: str
+    ) -> Tuple[Dict[str, Any], Optional[str]]:
+        """
+        Execute one assembled tool call and build its tool message
+        
+        Runs under the agent's tool concurrency cap and the tool's timeout.
+        
+        Args:
+            tool_call: Tool call dict (id, function.name, function.arguments)
+            conversation_id: Conversation ID (for logging)
+            
+        Returns:
+            (tool message for history, error string or None)
+        """
+        tool_name = tool_call["function"]["name"]
+        timeout = self.tool_timeouts.get(tool_name)
+        try:
+            # Parse arguments
+            arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+            
+            # Execute tool
+            async with self._tool_semaphore:
+                try:
+                    tool_result = await asyncio.wait_for(self._execute_tool(tool_name, arguments), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Tool {tool_name} timed out after {timeout}s") from None
+            
+            logger.info(
+                f"Executed tool {tool_name} - Agent: {self.agent_name}, "
+                f"Conversation: {conversation_id}"
+            )
+            return {
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": json.dumps(tool_result, ensure_ascii=False)
+            }, None
+        except Exception as e:
+            logger.error(
+                f"Error executing tool {tool_name}: {e}",
+                exc_info=True
+            )
+            return {
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": json.dumps({"error": str(e)}, ensure_ascii=False)
+            }, str(e)
+    
+    @staticmethod
+    def _tool_event(tool_call: Dict[str, Any], status: str) -> Dict[str, Any]:
+        """Build a tool progress SSE event"""
+        return {"data": json.dumps({
+            "tool": {
+                "id": tool_call["id"],
+                "name": tool_call["function"]["name"],
+                "status": status
+            }
+        }, ensure_ascii=False)}
+    
     async def process_message(
         self,
         user_message: str,
-        conversation_id: Optional[str] = None
+        conversation_id: Optional[str] = None,
+        render_turn: Optional[Callable[[str], str]] = None
     ) -> AsyncGenerator[Dict[str, Any], None]:
         """
         Process user message and generate response (with tool support)
         
         Args:
-            user_message: User message
+            user_message: User message (stored in history as is)
             conversation_id: Conversation ID (optional, defaults to "default")
+            render_turn: Adds per-turn context to the user message for this turn's
+                requests only, keeping the history prefix cacheable
             
         Yields:
             Response chunks
@@ -138,14 +216,11 @@ class BaseAgent:
             if not conversation_id:
                 conversation_id = "default"
             
-            # Get or create conversation history
-            if conversation_id not in self.conversations:
-                self.conversations[conversation_id] = []
-            
-            conversation_history = self.conversations[conversation_id]
+            # Keep the conversation from being evicted mid-turn
+            self.conversations.begin_turn(conversation_id)
             
             # Add user message to history
-            conversation_history.append({
+            self.conversations.append(conversation_id, {
                 "role": "user",
                 "content": user_message
             })
@@ -158,104 +233,122 @@ class BaseAgent:
                 iteration += 1
                 
                 # Build messages for OpenAI
-                messages = conversation_history.copy()
+                messages = with_rendered_turn(self.conversations.get_messages(conversation_id), render_turn)
                 
                 # Call OpenAI with tools
                 logger.debug(
                     f"Calling OpenAI (iteration {iteration}) - Agent: {self.agent_name}, "
                     f"Conversation: {conversation_id}, "
-                    f"History length: {len(messages)}"
+                    f"History length: {len(messages)}, "
+                    f"History tokens: {self.conversations.get_token_count(conversation_id)}"
                 )
                 
-                response = await self.client.generate_response(
-                    prompt=messages,
-                    tools=self.tools,
-                    system_instruction=self.system_prompt
-                )
+                # Stream text deltas to the client. Tool calls arrive as
+                # fragments keyed by index, one call after another: a call is
+                # complete once a later index starts (or the stream ends), and
+                # is started right away, concurrently with the other calls and
+                # the rest of the stream.
+                content_parts: List[str] = []
+                tool_call_buffers: Dict[int, Dict[str, Any]] = {}
+                tool_tasks: Dict[int, asyncio.Task] = {}
+                current_index: Optional[int] = None
                 
-                if not response.choices:
-                    logger.warning(
-                        f"No response from OpenAI - Agent: {self.agent_name}, "
-                        f"Conversation: {conversation_id}"
+                def start_tool(index: int) -> Dict[str, Any]:
+                    tool_tasks[index] = asyncio.create_task(
+                        self._run_tool_call(tool_call_buffers[index], conversation_id)
                     )
-                    yield {"data": json.dumps({"error": "Không thể xử lý yêu cầu này. Vui lòng thử lại."})}
-                    return
-                
-                choice = response.choices[0]
-                message = choice.message
-                
-                # Add assistant message to history
-                assistant_message = {
-                    "role": "assistant",
-                    "content": message.content or None
-                }
+                    return self._tool_event(tool_call_buffers[index], "started")
                 
-                # Check if tool calls are present
-                if message.tool_calls:
-                    assistant_message["tool_calls"] = [
-                        {
-                            "id": tc.id,
-                            "type": tc.type,
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        }
-                        for tc in message.tool_calls
-                    ]
-                    conversation_history.append(assistant_message)
-                    
-                    # Execute tool calls
-                    for tool_call in message.tool_calls:
-                        tool_name = tool_call.function.name
-                        try:
-                            # Parse arguments
-                            arguments = json.loads(tool_call.function.arguments)
-                            
-                            # Execute tool
-                            tool_result = await self._execute_tool(tool_name, arguments)
+                try:
+                    async for chunk in self.client.stream_response(
+                        prompt=messages,
+                        tools=self.tools,
+                        system_instruction=self.system_prompt,
+                        fairness_key=conversation_id
+                    ):
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta
+                        
+                        if delta.content:
+                            content_parts.append(delta.content)
+                            yield {"data": json.dumps({"content": delta.content})}
+                        
+                        for tc in delta.tool_calls or []:
+                            index = tc.index or 0
+                            if current_index is not None and index != current_index and current_index not in tool_tasks:
+                                yield start_tool(current_index)
+                            current_index = index
                             
-                            # Add tool result to history
-                            conversation_history.append({
-                                "role": "tool",
-                                "tool_call_id": tool_call.id,
-                                "content": json.dumps(tool_result, ensure_ascii=False)
-                            })
-                            
-                            logger.info(
-                                f"Executed tool {tool_name} - Agent: {self.agent_name}, "
-                                f"Conversation: {conversation_id}"
-                            )
-                        except Exception as e:
-                            logger.error(
-                                f"Error executing tool {tool_name}: {e}",
-                                exc_info=True
+                            buffer = tool_call_buffers.setdefault(
+                                index,
+                                {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
                             )
-                            # Add error to history
-                            conversation_history.append({
-                                "role": "tool",
-                                "tool_call_id": tool_call.id,
-                                "content": json.dumps({"error": str(e)}, ensure_ascii=False)
-                            })
+                            if tc.id:
+                                buffer["id"] = tc.id
+                            if tc.function is not None:
+                                if tc.function.name:
+                                    buffer["function"]["name"] = tc.function.name
+                                if tc.function.arguments:
+                                    buffer["function"]["arguments"] += tc.function.arguments
                     
+                    for index in sorted(tool_call_buffers):
+                        if index not in tool_tasks:
+                            yield start_tool(index)
+                    
+                    content = "".join(content_parts)
+                    tool_calls = [tool_call_buffers[i] for i in sorted(tool_call_buffers)]
+                    
+                    if not content and not tool_calls:
+                        logger.warning(
+                            f"No response from OpenAI - Agent: {self.agent_name}, "
+                            f"Conversation: {conversation_id}"
+                        )
+                        yield {"data": json.dumps({"error": "Không thể xử lý yêu cầu này. Vui lòng thử lại."})}
+                        return
+                    
+                    # Add assistant message to history
+                    assistant_message = {
+                        "role": "assistant",
+                        "content": content or None
+                    }
+                    
+                    # Check if tool calls are present
+                    if tool_calls:
+                        assistant_message["tool_calls"] = tool_calls
+                        
+                        # Collect tool results in call order (required by the API)
+                        indexes = sorted(tool_call_buffers)
+                        results = await asyncio.gather(*(tool_tasks[index] for index in indexes))
+                        
+                        # Append the call and all its results with no yield in
+                        # between: a disconnect can't leave tool_calls unanswered
+                        self.conversations.append(conversation_id, assistant_message)
+                        for tool_message, _ in results:
+                            self.conversations.append(conversation_id, tool_message)
+                        
+                        for index, (_, error) in zip(indexes, results):
+                            yield self._tool_event(tool_call_buffers[index], "error" if error else "completed")
+                finally:
+                    # Stream failed or client disconnected: don't leave tools running
+                    for task in tool_tasks.values():
+                        if not task.done():
+                            task.cancel()
+                
+                if tool_calls:
                     # Continue loop to get final response
                     continue
                 else:
                     # No tool calls, final response
-                    conversation_history.append(assistant_message)
+                    self.conversations.append(conversation_id, assistant_message)
                     
-                    # Log response
-                    response_length = len(message.content or "")
+                    # Log response (content was already streamed)
                     logger.info(
                         f"OpenAI response - Agent: {self.agent_name}, "
                         f"Conversation: {conversation_id}, "
-                        f"Response length: {response_length}"
+                        f"Response length: {len(content)}"
                     )
                     
-                    # Stream response
-                    if message.content:
-                        yield {"data": json.dumps({"content": message.content})}
-                    
                     # Break out of loop
                     break
             
@@ -269,6 +362,9 @@ class BaseAgent:
         except Exception as e:
             logger.error(f"Error processing message: {e}", exc_info=True)
             yield {"data": json.dumps({"error": "Đã xảy ra lỗi khi xử lý yêu cầu."})}
+        finally:
+            if conversation_id:
+                self.conversations.end_turn(conversation_id)
     
     def reset_conversation(self, conversation_id: Optional[str] = None):
         """
@@ -278,10 +374,12 @@ class BaseAgent:
             conversation_id: Conversation ID to reset (if None, resets all)
         """
         if conversation_id:
-            if conversation_id in self.conversations:
-                self.conversations[conversation_id].clear()
-                logger.info(f"Reset conversation {conversation_id} for agent: {self.agent_name}")
+            self.conversations.reset(conversation_id)
+            logger.info(f"Reset conversation {conversation_id} for agent: {self.agent_name}")
         else:
-            self.conversations.clear()
+            self.conversations.reset()
             logger.info(f"Reset all conversations for agent: {self.agent_name}")
-
+    
+    def close(self):
+        """Release shared resources (none for the base agent)"""
+        pass
@@ -1,15 +1,25 @@
 """Simple agent class - chỉ chat với prompt, không có tools"""
 import logging
 import time
-from typing import AsyncGenerator, Dict, Any, Optional, List
+from typing import TYPE_CHECKING, AsyncGenerator, Dict, Any, Optional, List, Tuple
 import json
+import numpy as np
 
 from app.core.agent_config import AgentConfig
-from app.services.openai_client import OpenAIClient
+from app.core.tracing import span
+from app.services.openai_client import usage_summary
+from app.services.provider_router import create_llm_client
 from app.prompts.loader import build_prompt_from_config
-from app.memory.non_parametric import NonParametricMemory
+from app.prompts.assembly import with_rendered_turn
+from app.services.token_counter import TokenCounter
+from app.services.response_cache import SemanticResponseCache, prompt_fingerprint
+from app.state.conversation_store import ConversationStore, create_conversation_store
 from app.memory.prompt_builder import build_prompt_from_cases
-from app.evaluation.metrics import EvaluationMetrics
+from app.evaluation.metrics import get_evaluation_metrics
+
+if TYPE_CHECKING:
+    # torch/transformers are only imported when memory is enabled
+    from app.memory.non_parametric import NonParametricMemory
 
 logger = logging.getLogger("agent")
 
@@ -28,46 +38,143 @@ class SimpleAgent:
         self.agent_name = config.agent.get('name', 'Assistant')
         self.agent_description = config.agent.get('description', '')
         
-        # Initialize OpenAI client
+        # Initialize LLM client (routes across providers if several are configured)
         model_config = config.model
-        self.client = OpenAIClient(
-            model_name=model_config.model_name,
-            temperature=model_config.temperature,
-            max_tokens=model_config.max_tokens
-        )
+        self.client = create_llm_client(model_config)
         
         # Build system prompt
         self.system_prompt = self._build_system_prompt()
         
-        # Conversation history per conversation_id
-        self.conversations: Dict[str, List[Dict[str, str]]] = {}
+        # Conversation history per conversation_id (bounded, evicting, token-budgeted)
+        self.token_counter = TokenCounter(model_config.model_name)
+        self.conversations: ConversationStore = create_conversation_store(
+            config.conversation,
+            token_counter=self.token_counter,
+            reserved_tokens=self.token_counter.count_text(self.system_prompt)
+        )
         
         # Initialize memory if enabled
-        self.memory: Optional[NonParametricMemory] = None
+        self.memory: Optional["NonParametricMemory"] = None
         if config.memory.enabled:
             try:
+                from app.memory.executor import get_embedding_executor
+                from app.memory.registry import acquire_memory
+                
                 # Get memory config attributes
                 storage_path = config.memory.storage_path or 'memory/cases.jsonl'
                 embedding_model = config.memory.embedding_model or 'sentence-transformers/all-MiniLM-L6-v2'
                 device = config.memory.device or 'auto'
                 
-                self.memory = NonParametricMemory(
+                # Shared across agents using the same case file and embedding model
+                self.memory = acquire_memory(
                     storage_path=storage_path,
                     embedding_model_name=embedding_model,
                     device=device,
                     key_field='user_message',
-                    value_field='assistant_response'
+                    value_field='assistant_response',
+                    index_type=config.memory.index_type,
+                    index_params={
+                        'ivf_nlist': config.memory.ivf_nlist,
+                        'ivf_nprobe': config.memory.ivf_nprobe,
+                        'hnsw_m': config.memory.hnsw_m,
+                        'hnsw_ef_construction': config.memory.hnsw_ef_construction,
+                        'hnsw_ef_search': config.memory.hnsw_ef_search,
+                    },
+                    executor=get_embedding_executor(config.memory.executor_workers),
+                    batch_max_wait_ms=config.memory.batch_max_wait_ms,
+                    batch_max_size=config.memory.batch_max_size,
+                    embedding_backend=config.memory.embedding_backend,
+                    embedding_options={
+                        'num_threads': config.memory.embedding_threads,
+                        'onnx_dir': config.memory.onnx_dir,
+                        'min_cosine': config.memory.embedding_min_cosine,
+                    },
+                    query_cache_size=config.memory.query_cache_size,
+                    result_cache_size=config.memory.result_cache_size
                 )
                 logger.info(f"Memory enabled with {self.memory.get_case_count()} cases")
             except Exception as e:
                 logger.warning(f"Failed to initialize memory: {e}, continuing without memory", exc_info=True)
                 self.memory = None
         
+        # Semantic response cache for stateless first turns
+        self.response_cache: Optional[SemanticResponseCache] = None
+        self._cache_embedding_model = None  # Only used when memory is disabled
+        if config.response_cache.enabled:
+            try:
+                self._init_response_cache()
+            except Exception as e:
+                logger.warning(f"Failed to initialize response cache: {e}, continuing without it", exc_info=True)
+                self.response_cache = None
+        
         # Initialize evaluation metrics (optional)
-        self.metrics = EvaluationMetrics()
+        self.metrics = get_evaluation_metrics()
         
         logger.info(f"Initialized simple agent: {self.agent_name}")
     
+    def _init_response_cache(self):
+        """Create the response cache and, without memory, a shared embedding model for it"""
+        cache_config = self.config.response_cache
+        if not self.memory:
+            from app.memory.executor import get_embedding_executor
+            from app.memory.registry import acquire_embedding_model
+            
+            self._cache_embedding_model = acquire_embedding_model(
+                self.config.memory.embedding_model,
+                self.config.memory.device,
+                executor=get_embedding_executor(self.config.memory.executor_workers),
+                backend=self.config.memory.embedding_backend,
+                num_threads=self.config.memory.embedding_threads,
+                onnx_dir=self.config.memory.onnx_dir,
+                min_cosine=self.config.memory.embedding_min_cosine
+            )
+        self.response_cache = SemanticResponseCache(
+            similarity_threshold=cache_config.similarity_threshold,
+            ttl_seconds=cache_config.ttl_seconds,
+            max_size=cache_config.max_size,
+            max_query_chars=cache_config.max_query_chars,
+            bypass_patterns=cache_config.bypass_patterns
+        )
+        # Responses are only reused under the same prompt and generation settings
+        model_config = self.config.model
+        self.prompt_fingerprint = prompt_fingerprint(
+            self.system_prompt,
+            model_config.model_name,
+            model_config.temperature,
+            model_config.max_tokens,
+            self.memory is not None and self.config.conversation.enable_memory_injection
+        )
+    
+    async def _lookup_response_cache(
+        self,
+        user_message: str,
+        conversation_id: str
+    ) -> Tuple[str, Optional[np.ndarray], Optional[Dict[str, Any]]]:
+        """
+        Look up the response cache for a message
+        
+        Args:
+            user_message: User message
+            conversation_id: Conversation ID
+            
+        Returns:
+            (status, query embedding to store the response under, hit);
+            status is "hit", "miss" or "bypass:<reason>"
+        """
+        is_first_turn = not self.conversations.get_messages(conversation_id)
+        reason = self.response_cache.bypass_reason(user_message, is_first_turn)
+        if reason:
+            return f"bypass:{reason}", None, None
+        
+        if self.memory:
+            query_vec = await self.memory.aembed_query(user_message)
+        else:
+            query_vec = (await self._cache_embedding_model.aembed_texts([user_message]))[0]
+        query_vec = query_vec.numpy()
+        
+        hit = self.response_cache.lookup(query_vec, self.prompt_fingerprint)
+        return ("hit" if hit else "miss"), query_vec, hit
+    
     def _build_system_prompt(self) -> str:
         """
         Build system prompt from config
@@ -99,11 +206,40 @@ class SimpleAgent:
             if not conversation_id:
                 conversation_id = "default"
             
-            # Get or create conversation history
-            if conversation_id not in self.conversations:
-                self.conversations[conversation_id] = []
+            # Keep the conversation from being evicted mid-turn
+            self.conversations.begin_turn(conversation_id)
             
-            conversation_history = self.conversations[conversation_id]
+            # Reuse a cached answer for near-identical stateless first turns
+            cache_status, cache_vec = None, None
+            if self.response_cache:
+                try:
+                    with span("response_cache.lookup"):
+                        cache_status, cache_vec, hit = await self._lookup_response_cache(user_message, conversation_id)
+                except Exception as e:
+                    logger.warning(f"Response cache lookup failed: {e}", exc_info=True)
+                    hit = None
+                if hit:
+                    content = hit["response"]
+                    yield {"data": json.dumps({"content": content})}
+                    self.conversations.append(conversation_id, {"role": "user", "content": user_message})
+                    self.conversations.append(conversation_id, {"role": "assistant", "content": content})
+                    logger.info(
+                        f"Response cache hit - Agent: {self.agent_name}, "
+                        f"Conversation: {conversation_id}, "
+                        f"Similarity: {hit['similarity']:.4f}"
+                    )
+                    try:
+                        self.metrics.log_response(
+                            query=user_message,
+                            response=content,
+                            has_memory=self.memory is not None and self.config.memory.enabled,
+                            memory_cases_used=0,
+                            response_time=time.time() - start_time,
+                            metadata={"response_cache": cache_status, "cache_similarity": round(hit["similarity"], 4)}
+                        )
+                    except Exception as e:
+                        logger.debug(f"Failed to log metrics: {e}")
+                    return
             
             # Retrieve similar cases from memory if enabled
             memory_prompt = None
@@ -113,27 +249,31 @@ class SimpleAgent:
                     top_k = self.config.memory.top_k
                     filter_negative = self.config.memory.filter_negative
                     
-                    # Retrieve cases (filter negative if configured)
-                    retrieved_cases = self.memory.retrieve(
-                        query=user_message,
-                        top_k=top_k,
-                        filter_negative=filter_negative
-                    )
+                    # Retrieve cases (filter negative if configured), off the event loop
+                    with span("memory.retrieve", top_k=top_k) as retrieve_span:
+                        retrieved_cases = await self.memory.aretrieve(
+                            query=user_message,
+                            top_k=top_k,
+                            filter_negative=filter_negative
+                        )
+                        if retrieve_span:
+                            retrieve_span.set_attribute("cases", len(retrieved_cases))
                     
                     if retrieved_cases:
                         memory_cases_count = len(retrieved_cases)
                         # Build prompt with positive/negative examples
-                        memory_prompt = build_prompt_from_cases(
-                            query=user_message,
-                            retrieved_cases=retrieved_cases,
-                            original_cases=self.memory._cases,
-                            max_positive=top_k,
-                            max_negative=self.config.memory.max_negative_examples,
-                            include_negative=(
-                                self.config.memory.include_negative_examples 
-                                and not filter_negative  # Only if not already filtered
+                        with span("prompt.memory_examples"):
+                            memory_prompt = build_prompt_from_cases(
+                                query=user_message,
+                                retrieved_cases=retrieved_cases,
+                                original_cases=self.memory._cases,
+                                max_positive=top_k,
+                                max_negative=self.config.memory.max_negative_examples,
+                                include_negative=(
+                                    self.config.memory.include_negative_examples 
+                                    and not filter_negative  # Only if not already filtered
+                                )
                             )
-                        )
                         logger.debug(
                             f"Retrieved {len(retrieved_cases)} cases for query "
                             f"(filter_negative={filter_negative}), "
@@ -142,34 +282,51 @@ class SimpleAgent:
                 except Exception as e:
                     logger.warning(f"Memory retrieval failed: {e}", exc_info=True)
             
-            # Build user message (with memory if available)
-            user_content = user_message
-            if memory_prompt:
-                user_content = f"{memory_prompt}\n\nCurrent user message: {user_message}"
-            
-            # Add user message to history
-            conversation_history.append({
-                "role": "user",
-                "content": user_content
-            })
-            
-            # Build messages for OpenAI
-            messages = conversation_history.copy()
+            with span("prompt.assemble"):
+                # Add the raw user message to history; retrieved examples only go
+                # into this request, after the stable system prompt + history prefix
+                self.conversations.append(conversation_id, {
+                    "role": "user",
+                    "content": user_message
+                })
+                
+                # Build messages for OpenAI
+                messages = with_rendered_turn(
+                    self.conversations.get_messages(conversation_id),
+                    (lambda message: f"{memory_prompt}\n\nCurrent user message: {message}") if memory_prompt else None
+                )
             
             # Call OpenAI (no tools)
             logger.debug(
                 f"Calling OpenAI - Agent: {self.agent_name}, "
                 f"Conversation: {conversation_id}, "
-                f"History length: {len(messages)}"
+                f"History length: {len(messages)}, "
+                f"History tokens: {self.conversations.get_token_count(conversation_id)}"
             )
             
-            response = await self.client.generate_response(
+            # Stream deltas to the client while assembling the full text
+            content_parts: List[str] = []
+            time_to_first_token = None
+            usage = None
+            async for chunk in self.client.stream_response(
                 prompt=messages,
                 tools=None,  # No tools for simple agent
-                system_instruction=self.system_prompt
-            )
+                system_instruction=self.system_prompt,
+                fairness_key=conversation_id
+            ):
+                if chunk.usage:
+                    usage = chunk.usage  # Final chunk when stream usage is enabled
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if time_to_first_token is None:
+                        time_to_first_token = time.time() - start_time
+                    content_parts.append(delta)
+                    yield {"data": json.dumps({"content": delta})}
             
-            if not response.choices:
+            content = "".join(content_parts)
+            if not content:
                 logger.warning(
                     f"No response from OpenAI - Agent: {self.agent_name}, "
                     f"Conversation: {conversation_id}"
@@ -177,58 +334,62 @@ class SimpleAgent:
                 yield {"data": json.dumps({"error": "Không thể xử lý yêu cầu này. Vui lòng thử lại."})}
                 return
             
-            choice = response.choices[0]
-            message = choice.message
-            
             # Log response
-            response_length = len(message.content or "")
             logger.info(
                 f"OpenAI response - Agent: {self.agent_name}, "
                 f"Conversation: {conversation_id}, "
-                f"Response length: {response_length}"
+                f"Response length: {len(content)}"
             )
             
             # Add assistant message to history
             assistant_message = {
                 "role": "assistant",
-                "content": message.content or ""
+                "content": content
             }
-            conversation_history.append(assistant_message)
+            self.conversations.append(conversation_id, assistant_message)
+            
+            if cache_vec is not None:
+                self.response_cache.put(user_message, cache_vec, content, self.prompt_fingerprint)
             
             # Save to memory if enabled (auto-save successful conversations)
-            if self.memory and message.content:
+            if self.memory:
                 try:
                     # Auto-save successful conversations (can add reward logic later)
-                    self.memory.add_case(
-                        user_message=user_message,
-                        assistant_response=message.content,
-                        reward=1  # Default to positive (can add evaluation later)
-                    )
+                    with span("memory.write"):
+                        await self.memory.aadd_case(
+                            user_message=user_message,
+                            assistant_response=content,
+                            reward=1  # Default to positive (can add evaluation later)
+                        )
                     logger.debug(f"Saved case to memory")
                 except Exception as e:
                     logger.warning(f"Failed to save case to memory: {e}")
             
             # Log metrics for evaluation
             response_time = time.time() - start_time
-            if message.content:
-                try:
+            try:
+                with span("metrics.write"):
                     self.metrics.log_response(
                         query=user_message,
-                        response=message.content,
+                        response=content,
                         has_memory=self.memory is not None and self.config.memory.enabled,
                         memory_cases_used=memory_cases_count,
-                        response_time=response_time
+                        response_time=response_time,
+                        metadata={
+                            "time_to_first_token": round(time_to_first_token, 3),
+                            "response_cache": cache_status,
+                            **usage_summary(usage)
+                        }
                     )
-                except Exception as e:
-                    logger.debug(f"Failed to log metrics: {e}")
-            
-            # Stream response
-            if message.content:
-                yield {"data": json.dumps({"content": message.content})}
+            except Exception as e:
+                logger.debug(f"Failed to log metrics: {e}")
             
         except Exception as e:
             logger.error(f"Error processing message: {e}", exc_info=True)
             yield {"data": json.dumps({"error": "Đã xảy ra lỗi khi xử lý yêu cầu."})}
+        finally:
+            if conversation_id:
+                self.conversations.end_turn(conversation_id)
     
     def reset_conversation(self, conversation_id: Optional[str] = None):
         """
@@ -238,10 +399,19 @@ class SimpleAgent:
             conversation_id: Conversation ID to reset (if None, resets all)
         """
         if conversation_id:
-            if conversation_id in self.conversations:
-                self.conversations[conversation_id].clear()
-                logger.info(f"Reset conversation {conversation_id} for agent: {self.agent_name}")
+            self.conversations.reset(conversation_id)
+            logger.info(f"Reset conversation {conversation_id} for agent: {self.agent_name}")
         else:
-            self.conversations.clear()
+            self.conversations.reset()
             logger.info(f"Reset all conversations for agent: {self.agent_name}")
-
+    
+    def close(self):
+        """Release shared resources (memory, embedding models)"""
+        if self.memory:
+            from app.memory.registry import release_memory
+            release_memory(self.memory)
+            self.memory = None
+        if self._cache_embedding_model:
+            from app.memory.registry import release_embedding_model
+            release_embedding_model(self._cache_embedding_model)
+            self._cache_embedding_model = None
@@ -89,7 +89,9 @@ class BookingAgent(BaseAgent):
         # Get conversation state
         conversation_state = await self.get_conversation_state(conversation_id)
         
-        # Build context message with current time and booking state
+        # Build context with current time and booking state. It changes every
+        # turn, so it is only attached to this turn's requests; history keeps
+        # the raw user message and stays a cacheable prefix.
         now_vn = datetime.now(ZoneInfo("Asia/Ho_Chi_Minh"))
         now_context = (
             f"Thời gian hiện tại (giờ Việt Nam): {now_vn.strftime('%Y-%m-%d %H:%M')}\n"
@@ -98,15 +100,15 @@ class BookingAgent(BaseAgent):
         )
         
         booking_state = conversation_state.get("booking_state", {})
-        context_message = (
-            f"{now_context}\n"
-            f"Người dùng nói: '{user_message}'.\n"
-            f"Trạng thái đặt vé hiện tại là: {json.dumps(booking_state, ensure_ascii=False)}.\n"
-            "Dựa trên lịch sử hội thoại và trạng thái này, hãy quyết định bước đi tiếp theo một cách hợp lý."
-        )
         
-        # Process with base agent - use context message instead of original
-        # The base agent will add the message to history
-        async for chunk in super().process_message(context_message, conversation_id):
+        def render_turn(message: str) -> str:
+            return (
+                f"{now_context}\n"
+                f"Người dùng nói: '{message}'.\n"
+                f"Trạng thái đặt vé hiện tại là: {json.dumps(booking_state, ensure_ascii=False)}.\n"
+                "Dựa trên lịch sử hội thoại và trạng thái này, hãy quyết định bước đi tiếp theo một cách hợp lý."
+            )
+        
+        async for chunk in super().process_message(user_message, conversation_id, render_turn=render_turn):
             yield chunk
 
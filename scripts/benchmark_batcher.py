@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Load benchmark for concurrent query embedding: one forward pass per query vs micro-batching"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.memory.embedding import EmbeddingModel
+from app.memory.batcher import EmbeddingBatcher
+from app.memory.executor import EmbeddingExecutor
+
+
+QUERIES = [
+    "còn vé không", "mấy giờ xe chạy", "giá vé bao nhiêu", "đặt vé đi hải phòng",
+    "xe có wifi không", "tối mai còn chỗ không", "điểm đón ở đâu", "hủy vé thế nào",
+]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def run_load(embed, total: int, concurrency: int):
+    """Closed-loop load: `concurrency` workers issue `total` requests"""
+    latencies = []
+    remaining = total
+    rng = random.Random(0)
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            # Append a number so most texts are distinct (no dedup shortcut)
+            text = f"{rng.choice(QUERIES)} {rng.randint(0, 10 ** 6)}"
+            start = time.perf_counter()
+            await embed(text)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return total / elapsed, percentile(latencies, 50), percentile(latencies, 99)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--workers", type=int, default=2, help="Embedding executor threads")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    executor = EmbeddingExecutor(max_workers=args.workers)
+    model = EmbeddingModel(args.model, args.device, executor=executor)
+    batcher = EmbeddingBatcher(model, max_wait_ms=args.max_wait_ms, max_batch_size=args.max_batch)
+
+    async def unbatched(text):
+        return (await model.aembed_texts([text]))[0]
+
+    print("=" * 72)
+    print(f"Query embedding load ({args.requests} requests, {args.workers} executor threads)")
+    print("=" * 72)
+    print(f"{'mode':<12} {'concurrency':>12} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+
+    for concurrency in args.concurrency:
+        for mode, embed in (("unbatched", unbatched), ("batched", batcher.embed)):
+            throughput, p50, p99 = await run_load(embed, args.requests, concurrency)
+            print(f"{mode:<12} {concurrency:>12} {throughput:10.1f} {p50:10.2f} {p99:10.2f}")
+
+    print(f"\nBatcher: {batcher.stats()}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
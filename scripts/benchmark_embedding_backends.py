@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Compare embedding backends (torch fp32, torch_int8, onnx): accuracy vs fp32, single-query latency, batch throughput"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.memory.embedding import EmbeddingModel
+from app.memory.executor import EmbeddingExecutor
+
+
+PHRASES = [
+    "còn vé không", "mấy giờ xe chạy", "giá vé bao nhiêu", "đặt vé đi hải phòng",
+    "xe có wifi không", "tối mai còn chỗ không", "điểm đón ở đâu", "hủy vé thế nào",
+    "cho anh hai vé giường nằm", "xe xuất phát từ bến nào", "có trung chuyển không",
+]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def make_texts(n: int, seed: int = 0):
+    """Synthetic call-center queries of varying length"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(PHRASES) for _ in range(rng.randint(1, 4))) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch_int8", "onnx"])
+    parser.add_argument("--threads", type=int, default=0, help="Intra-op threads (0 = library default)")
+    parser.add_argument("--texts", type=int, default=512, help="Texts for accuracy and throughput")
+    parser.add_argument("--single-runs", type=int, default=200, help="Single-query latency samples")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--tolerance", type=float, default=0.98, help="Min cosine vs torch fp32")
+    parser.add_argument("--onnx-dir", default=None, help="ONNX export directory (default: temporary)")
+    args = parser.parse_args()
+
+    texts = make_texts(args.texts)
+    executor = EmbeddingExecutor(max_workers=1)
+    onnx_tmp = tempfile.TemporaryDirectory()
+    onnx_dir = args.onnx_dir or onnx_tmp.name
+
+    # fp32 torch runs first and is the accuracy reference
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    reference = None
+    rows = []
+    for backend in backends:
+        model = EmbeddingModel(
+            args.model, "cpu", executor=executor, backend=backend,
+            num_threads=args.threads, onnx_dir=onnx_dir, min_cosine=-1.0  # Measure, do not fall back
+        )
+        model.embed_texts(texts[:8])  # Warm-up
+
+        vecs = model.embed_texts(texts, batch_size=args.batch_size)
+        if reference is None:
+            reference = vecs
+        cosines = (vecs * reference).sum(dim=1)
+
+        latencies = []
+        for text in texts[:args.single_runs]:
+            start = time.perf_counter()
+            model.embed_texts([text])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        model.embed_texts(texts, batch_size=args.batch_size)
+        throughput = len(texts) / (time.perf_counter() - start)
+
+        rows.append((
+            model.backend.name, float(cosines.min()), float(cosines.mean()),
+            percentile(latencies, 50), percentile(latencies, 99), throughput
+        ))
+
+    print("=" * 72)
+    print(f"Embedding backends ({args.model}, threads={args.threads or 'default'})")
+    print("=" * 72)
+    print(f"{'backend':<12} {'min cos':>9} {'mean cos':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'texts/s':>9}  check")
+    for name, min_cos, mean_cos, p50, p99, throughput in rows:
+        check = "ok" if min_cos >= args.tolerance else f"FAIL (< {args.tolerance})"
+        print(f"{name:<12} {min_cos:9.5f} {mean_cos:9.5f} {p50:9.2f} {p99:9.2f} {throughput:9.1f}  {check}")
+
+    executor.shutdown()
+    onnx_tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Benchmark recall@k vs latency of memory index backends against exact flat search"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.memory.vector_index import FlatIndex, IVFIndex, HNSWIndex
+
+
+def make_vectors(n: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered, L2-normalized vectors (closer to sentence embeddings than uniform noise)"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def build(index, vectors) -> float:
+    """Build index, return seconds"""
+    start = time.perf_counter()
+    index.build(vectors)
+    return time.perf_counter() - start
+
+
+def measure(index, vectors, queries, truth, k):
+    """Return (mean query ms, recall@k) for an already-built index"""
+    hits = 0
+    start = time.perf_counter()
+    for q, expected in zip(queries, truth):
+        _, idx = index.search(vectors, q, k)
+        hits += len(set(idx) & expected)
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+    return latency, hits / (len(queries) * k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 16, 32, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[32, 64, 128])
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print(f"Index recall@{args.top_k} vs latency (dim={args.dim})")
+    print("=" * 72)
+
+    for n in args.sizes:
+        vectors = make_vectors(n, args.dim, clusters=max(16, n // 1000), seed=0)
+        queries = make_vectors(args.queries, args.dim, clusters=max(16, n // 1000), seed=1)
+        flat = FlatIndex()
+        truth = [set(flat.search(vectors, q, args.top_k)[1]) for q in queries]
+
+        print(f"\n{n} vectors")
+        print(f"{'backend':<24} {'build (s)':>10} {'query (ms)':>12} {'recall':>8}")
+
+        latency, recall = measure(flat, vectors, queries, truth, args.top_k)
+        print(f"{'flat':<24} {0:10.2f} {latency:12.3f} {recall:8.3f}")
+
+        ivf = IVFIndex()
+        build_time = build(ivf, vectors)
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            latency, recall = measure(ivf, vectors, queries, truth, args.top_k)
+            print(f"{f'ivf nprobe={nprobe}':<24} {build_time:10.2f} {latency:12.3f} {recall:8.3f}")
+
+        try:
+            hnsw = HNSWIndex()
+        except ImportError:
+            print(f"{'hnsw':<24} {'(faiss-cpu not installed)':>32}")
+            continue
+        build_time = build(hnsw, vectors)
+        for ef in args.ef_search:
+            hnsw._index.hnsw.efSearch = ef
+            latency, recall = measure(hnsw, vectors, queries, truth, args.top_k)
+            print(f"{f'hnsw ef_search={ef}':<24} {build_time:10.2f} {latency:12.3f} {recall:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
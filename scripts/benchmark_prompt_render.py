@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark prompt building: per-render regex substitution vs compiled templates cached by path + mtime"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.prompts.framework import CompiledTemplate, PromptFramework, clear_template_cache
+from app.prompts.loader import build_prompt_from_config, get_template_path
+
+
+def regex_render(template: str, variables: dict) -> str:
+    """Previous implementation: re.sub with a Python callback over the whole template"""
+    def replace_nested(match):
+        value = variables
+        for part in match.group(1).split('.'):
+            if isinstance(value, dict):
+                value = value.get(part, match.group(0))
+            else:
+                return match.group(0)
+        return str(value) if value is not None else ""
+    return re.sub(r'\{\{([^}]+)\}\}', replace_nested, template)
+
+
+def make_config(i: int) -> dict:
+    """Synthetic tenant agent config"""
+    return {
+        "agent": {"name": f"Nhà xe {i}", "description": f"Trợ lý đặt vé số {i}"},
+        "tools": [
+            {"name": f"tool_{t}", "description": "Tra cứu chuyến xe",
+             "parameters": {"properties": {"origin": {"type": "string", "description": "Điểm đi"}}}}
+            for t in range(3)
+        ],
+        "memory": {"enabled": i % 2 == 0, "top_k": 4},
+    }
+
+
+def timed_ms(fn, runs: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--template", default="agent", help="Template name in app/prompts/templates")
+    parser.add_argument("--runs", type=int, default=500, help="Renders per measurement")
+    parser.add_argument("--configs", type=int, default=200, help="Distinct agent configs to build")
+    parser.add_argument("--slots", type=int, default=100, help="Placeholders added for the in-memory render rows")
+    args = parser.parse_args()
+
+    path = get_template_path(args.template)
+    source = path.read_text(encoding="utf-8")
+    # Spread extra placeholders over the template so render cost includes lookups
+    lines = source.splitlines(keepends=True)
+    step = max(1, len(lines) // max(1, args.slots))
+    slotted = "".join(
+        line + ("{{AGENT.NAME}} {{tools_description}}\n" if args.slots and i % step == 0 else "")
+        for i, line in enumerate(lines)
+    )
+    config = make_config(0)
+    variables = {
+        "AGENT": {"NAME": "Sơn Hải", "DESCRIPTION": "Trợ lý", "START_MESSAGE": "Xin chào", "END_MESSAGE": "Cảm ơn"},
+        "tools_description": PromptFramework.format_tools_description(config["tools"]),
+        "memory_instructions": PromptFramework.format_memory_instructions(config["memory"]),
+    }
+    compiled = CompiledTemplate(slotted)
+    assert compiled.render(variables) == regex_render(slotted, variables), "compiled render differs from regex"
+
+    def read_and_regex():
+        with open(path, "r", encoding="utf-8") as f:
+            return regex_render(f.read(), variables)
+
+    def cold_build():
+        clear_template_cache()
+        return build_prompt_from_config(config)
+
+    rows = [
+        ("regex render (in memory)", timed_ms(lambda: regex_render(slotted, variables), args.runs)),
+        ("compiled render", timed_ms(lambda: compiled.render(variables), args.runs)),
+        ("compile template", timed_ms(lambda: CompiledTemplate(slotted), args.runs)),
+        ("read file + regex (before)", timed_ms(read_and_regex, args.runs)),
+        ("build_prompt_from_config, cold", timed_ms(cold_build, args.runs)),
+        ("build_prompt_from_config, cached", timed_ms(lambda: build_prompt_from_config(config), args.runs)),
+    ]
+
+    configs = [make_config(i) for i in range(args.configs)]
+    start = time.perf_counter()
+    for c in configs:
+        build_prompt_from_config(c)
+    per_config = (time.perf_counter() - start) * 1000 / len(configs)
+
+    print("=" * 60)
+    print(f"Prompt render ({path.name}, {len(source)} chars; in-memory rows: {sum(not isinstance(s, str) for s in compiled.segments)} slots)")
+    print("=" * 60)
+    for name, ms in rows:
+        print(f"{name:<36} {ms:8.3f} ms")
+    print(f"{f'{args.configs} distinct configs (cached template)':<36} {per_config:8.3f} ms/config")
+
+
+if __name__ == "__main__":
+    main()
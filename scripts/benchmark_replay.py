@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""Replay a recorded request log against the agent with a local fake LLM and report hot-path latency"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+# The fake server does not check the key, but OpenAIClient requires one
+os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+
+from app.core.agent_config import ToolConfig
+from app.core.agent_factory import create_agent
+from app.core.config import load_agent_config
+from app.use_cases.base.base_agent import BaseAgent
+from fake_llm_server import create_app, start_in_thread
+
+
+MESSAGE_FIELDS = ("message", "user_message", "query", "content")
+
+SYNTHETIC_QUERIES = [
+    "Còn vé đi Hải Phòng không?",
+    "Chuyến sớm nhất ngày mai mấy giờ?",
+    "Giá vé Hà Nội - Hải Phòng bao nhiêu?",
+    "Tôi muốn đặt hai vé tối nay",
+    "Xe có đón ở Mỹ Đình không?",
+    "Cho tôi đổi giờ đi sang chuyến chiều",
+]
+
+
+# Added to configs without tools so --agent base exercises the tool-call path
+SYNTHETIC_TOOL = ToolConfig(
+    name="lookup_trips",
+    description="Look up bus trips for a route and date",
+    handler="benchmark_replay.ReplayToolAgent",
+    parameters={"type": "object", "properties": {"n": {"type": "integer"}}},
+)
+
+
+class ReplayToolAgent(BaseAgent):
+    """BaseAgent whose tools answer immediately (measures the agent, not the tools)"""
+
+    async def _execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
+        return {"tool": tool_name, "arguments": arguments, "trips": []}
+
+
+def load_requests(path: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """
+    Load recorded requests from a JSONL log (or synthesize them)
+
+    Each line needs a message in one of MESSAGE_FIELDS; an optional
+    conversation_id keeps multi-turn conversations together.
+    """
+    requests = []
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                message = next((record[k] for k in MESSAGE_FIELDS if isinstance(record.get(k), str)), None)
+                if message:
+                    requests.append({"message": message, "conversation_id": record.get("conversation_id")})
+    else:
+        rng = random.Random(0)
+        requests = [{"message": f"{rng.choice(SYNTHETIC_QUERIES)} ({i})", "conversation_id": None} for i in range(limit)]
+    if not requests:
+        raise SystemExit(f"No requests with a {'/'.join(MESSAGE_FIELDS)} field in {path}")
+    # Cycle through the log to reach the requested count
+    return [dict(requests[i % len(requests)]) for i in range(limit)]
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentiles_ms(values: List[float], digits: int = 1) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 of seconds, in ms (None if no samples)"""
+    ordered = sorted(values)
+    return {
+        f"p{q}": round(ordered[min(len(ordered) - 1, q * len(ordered) // 100)] * 1000, digits) if ordered else None
+        for q in (50, 95, 99)
+    }
+
+
+def instrument_memory(agent, timings: Dict[str, List[float]]):
+    """Time retrieval and query embedding by wrapping the agent's memory methods"""
+    memory = getattr(agent, "memory", None)
+    if memory is None:
+        return
+
+    def timed_async(name, fn):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                timings[name].append(time.perf_counter() - start)
+        return wrapper
+
+    def timed_sync(name, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings[name].append(time.perf_counter() - start)
+        return wrapper
+
+    # Instance attributes shadow the methods, including calls made from inside memory
+    memory.aretrieve = timed_async("retrieval", memory.aretrieve)
+    memory.aembed_query = timed_async("embedding", memory.aembed_query)
+    memory._embed_query = timed_sync("embedding", memory._embed_query)
+
+
+async def run_request(agent, request: Dict[str, Any], index: int, results: List[Dict[str, Any]]):
+    """Send one request through process_message and record TTFB / total / error"""
+    conversation_id = request["conversation_id"] or f"replay-{index}"
+    start = time.perf_counter()
+    ttfb = None
+    error = None
+    async for chunk in agent.process_message(request["message"], conversation_id):
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        if error is None and '"error"' in chunk.get("data", ""):
+            error = json.loads(chunk["data"]).get("error")
+    results.append({"ttfb": ttfb, "total": time.perf_counter() - start, "error": error})
+
+
+async def replay(agent, requests: List[Dict[str, Any]], concurrency: int, qps: float) -> List[Dict[str, Any]]:
+    """
+    Replay requests, at most `concurrency` in flight
+
+    With qps > 0, requests start on an open-loop Poisson schedule at that
+    rate (queueing behind the concurrency cap if the agent falls behind);
+    otherwise each worker sends its next request as soon as one finishes.
+    """
+    results: List[Dict[str, Any]] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    rng = random.Random(1)
+
+    async def limited(request, index):
+        async with semaphore:
+            await run_request(agent, request, index, results)
+
+    tasks = []
+    for index, request in enumerate(requests):
+        if qps > 0 and index:
+            await asyncio.sleep(rng.expovariate(qps))
+        tasks.append(asyncio.create_task(limited(request, index)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--log", help="Recorded request JSONL (default: synthetic booking queries)")
+    parser.add_argument("--config", default="configs/agent.yaml", help="Agent config (model.base_url is replaced)")
+    parser.add_argument("--agent", choices=["simple", "base"], default="simple",
+                        help="base = BaseAgent with the config's tools (a synthetic tool if it has none)")
+    parser.add_argument("--memory", choices=["config", "on", "off"], default="off", help="Override memory.enabled")
+    parser.add_argument("--requests", type=int, default=200, help="Requests to replay (the log is cycled)")
+    parser.add_argument("--warmup", type=int, default=5, help="Requests sent before measuring")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--qps", type=float, default=0.0, help="Open-loop arrival rate (0 = closed loop)")
+    parser.add_argument("--base-url", help="Use an already running fake_llm_server.py (separate process, no GIL "
+                                           "contention) instead of starting one in a thread; its own latency flags apply")
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Lognormal sigma of the fake first-token delay")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of fake LLM calls with extra delay")
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report Python heap growth (slower)")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON (for regression tracking)")
+    args = parser.parse_args()
+
+    base_url = args.base_url or start_in_thread(create_app(
+        first_token_ms=args.first_token_ms,
+        token_ms=args.token_ms,
+        latency_sigma=args.latency_sigma,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        tool_calls=1 if args.agent == "base" else 0,
+        seed=0
+    ))
+
+    config = load_agent_config(args.config)
+    config.model.base_url = base_url
+    if args.memory != "config":
+        config.memory.enabled = args.memory == "on"
+
+    rss_start = rss_mb()
+    build_start = time.perf_counter()
+    if args.agent == "base":
+        # create_agent falls back to SimpleAgent without tools or a use-case agent class
+        if not config.tools:
+            config.tools = [SYNTHETIC_TOOL]
+        agent = ReplayToolAgent(config)
+    else:
+        agent = create_agent(config=config)
+    build_seconds = time.perf_counter() - build_start
+    timings: Dict[str, List[float]] = {"retrieval": [], "embedding": []}
+    instrument_memory(agent, timings)
+
+    requests = load_requests(args.log, args.warmup + args.requests)
+    await replay(agent, requests[:args.warmup], args.concurrency, 0.0)
+    for values in timings.values():
+        values.clear()
+
+    rss_before = rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    start = time.perf_counter()
+    results = await replay(agent, requests[args.warmup:], args.concurrency, args.qps)
+    wall = time.perf_counter() - start
+    heap_mb = None
+    if args.tracemalloc:
+        heap_mb = tracemalloc.get_traced_memory()[0] / 2**20
+        tracemalloc.stop()
+    rss_after = rss_mb()
+
+    ok = [r for r in results if not r["error"]]
+    ttfbs = [r["ttfb"] for r in ok if r["ttfb"] is not None]
+    totals = [r["total"] for r in ok]
+    report = {
+        "agent": type(agent).__name__,
+        "memory": getattr(agent, "memory", None) is not None,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "concurrency": args.concurrency,
+        "target_qps": args.qps,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(results) / wall, 2),
+        "ttfb_ms": percentiles_ms(ttfbs),
+        "e2e_ms": percentiles_ms(totals),
+        "retrieval_ms": percentiles_ms(timings["retrieval"], 2),
+        "embedding_ms": percentiles_ms(timings["embedding"], 2),
+        "retrievals": len(timings["retrieval"]),
+        "embeddings": len(timings["embedding"]),
+        "agent_build_s": round(build_seconds, 3),
+        "rss_mb": {"start": round(rss_start, 1), "before": round(rss_before, 1), "after": round(rss_after, 1),
+                   "growth": round(rss_after - rss_before, 1)},
+        "python_heap_growth_mb": round(heap_mb, 2) if heap_mb is not None else None,
+    }
+
+    print("=" * 72)
+    print(f"Replay: {report['agent']} (memory {'on' if report['memory'] else 'off'}), "
+          f"{report['requests']} requests, concurrency {args.concurrency}, "
+          f"{'closed loop' if args.qps <= 0 else f'{args.qps} qps'}")
+    if args.base_url:
+        print(f"Fake LLM: {args.base_url}")
+    else:
+        print(f"Fake LLM: first token {args.first_token_ms} ms (sigma {args.latency_sigma}), {args.token_ms} ms/token")
+    print("=" * 72)
+    print(f"{'throughput':<14} {report['throughput_rps']:10.2f} req/s   ({report['errors']} errors, {report['wall_s']} s)")
+    for name in ("ttfb_ms", "e2e_ms", "retrieval_ms", "embedding_ms"):
+        p = report[name]
+        if p["p50"] is None:
+            print(f"{name[:-3]:<14} n/a")
+            continue
+        print(f"{name[:-3]:<14} p50 {p['p50']:9.2f} ms   p95 {p['p95']:9.2f} ms   p99 {p['p99']:9.2f} ms")
+    rss = report["rss_mb"]
+    print(f"{'rss':<14} {rss['before']:.1f} -> {rss['after']:.1f} MB (growth {rss['growth']:+.1f} MB; "
+          f"{rss['start']:.1f} MB before agent build)")
+    if heap_mb is not None:
+        print(f"{'python heap':<14} {heap_mb:+.2f} MB retained during the run")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+    if hasattr(agent, "close"):
+        agent.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
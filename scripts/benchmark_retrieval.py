@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Benchmark per-query memory retrieval latency (re-embed all keys vs precomputed index)"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import torch
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.memory.non_parametric import NonParametricMemory
+
+
+WORDS = [
+    "vé", "xe", "giờ", "chạy", "hà", "nội", "hải", "phòng", "còn", "không",
+    "mấy", "đặt", "chỗ", "ngày", "mai", "tối", "sáng", "giá", "bao", "nhiêu",
+]
+
+
+def write_cases(path: Path, n: int):
+    """Write n synthetic cases to a JSONL file"""
+    rng = random.Random(0)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n):
+            message = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 10)))
+            case = {
+                "user_message": f"{message} {i}",
+                "assistant_response": f"Phản hồi {i}",
+                "reward": 1,
+            }
+            f.write(json.dumps(case, ensure_ascii=False) + '\n')
+
+
+def baseline_retrieve(memory: NonParametricMemory, query: str, top_k: int):
+    """Previous retrieve path: embed query and all keys on every call"""
+    query_vec = memory.embedding_model.embed_texts([query])[0].unsqueeze(0)
+    key_vecs = memory.embedding_model.embed_texts([p[0] for p in memory._pairs])
+    sims = (query_vec @ key_vecs.T).squeeze(0)
+    return torch.topk(sims, min(top_k, len(memory._pairs)))
+
+
+def time_queries(fn, queries) -> float:
+    """Return mean latency in milliseconds"""
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument(
+        "--baseline-max", type=int, default=10000,
+        help="Skip the re-embed baseline above this many cases (it takes minutes per query)"
+    )
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print("Memory Retrieval Latency")
+    print("=" * 72)
+    print(f"{'cases':>10} {'build (s)':>12} {'reload (s)':>12} {'before (ms)':>14} {'after (ms)':>12}")
+
+    rng = random.Random(1)
+    queries = [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(args.queries)]
+
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage_path = Path(tmp) / "cases.jsonl"
+            write_cases(storage_path, n)
+
+            # First load embeds every key and persists the index
+            start = time.perf_counter()
+            memory = NonParametricMemory(
+                storage_path=str(storage_path),
+                embedding_model_name=args.model,
+                device=args.device
+            )
+            build_time = time.perf_counter() - start
+
+            # Second load reuses the persisted index
+            start = time.perf_counter()
+            memory._reload_memory()
+            reload_time = time.perf_counter() - start
+
+            after = time_queries(lambda q: memory.retrieve(q, top_k=args.top_k), queries)
+
+            if n <= args.baseline_max:
+                before = time_queries(
+                    lambda q: baseline_retrieve(memory, q, args.top_k),
+                    queries[:max(1, min(len(queries), 3))]
+                )
+                before_str = f"{before:14.1f}"
+            else:
+                before_str = f"{'skipped':>14}"
+
+            print(f"{n:>10} {build_time:12.2f} {reload_time:12.2f} {before_str} {after:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
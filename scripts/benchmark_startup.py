@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Measure cold start and first-request latency of the API, with and without agent pre-warming"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from fake_llm_server import create_app, free_port, start_in_thread
+
+
+def measure_import(env: dict, cwd: str) -> dict:
+    """Import app.main in a fresh interpreter; report time and whether torch was loaded"""
+    code = (
+        "import sys, time; t = time.perf_counter(); import app.main; "
+        "print(time.perf_counter() - t, 'torch' in sys.modules)"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, cwd=cwd, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1].split()  # Log lines come first
+    return {"import_s": float(out[0]), "torch_loaded": out[1] == "True"}
+
+
+def chat_once(port: int, conversation_id: str) -> tuple:
+    """Send one streaming chat request; return (ttfb, total) seconds"""
+    body = {"message": "Còn vé đi Hải Phòng không?", "conversation_id": conversation_id}
+    start = time.perf_counter()
+    first = None
+    with httpx.stream("POST", f"http://127.0.0.1:{port}/api/chat/stream", json=body, timeout=120) as response:
+        for line in response.iter_lines():
+            if first is None and line.startswith("data:") and "content" in line:
+                first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def measure_server(env: dict, cwd: str, prewarm: bool, requests: int) -> dict:
+    """Start uvicorn, wait for /health, then time the first requests"""
+    env = dict(env, PREWARM_AGENT="true" if prewarm else "false")
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            time.sleep(0.02)
+        result = {"cold_start_s": time.perf_counter() - start, "requests": []}
+        for i in range(requests):
+            ttfb, total = chat_once(port, f"startup-{i}")
+            result["requests"].append({"ttfb_s": ttfb, "total_s": total})
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", default=str(project_root / "configs" / "agent.yaml"))
+    parser.add_argument("--requests", type=int, default=2, help="Requests timed after startup")
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    base_url = start_in_thread(create_app(first_token_ms=args.first_token_ms, token_ms=args.token_ms))
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(project_root),
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "fake-key"),
+        OPENAI_BASE_URL=base_url,
+        AGENT_CONFIG_PATH=str(Path(args.config).resolve()),
+    )
+
+    # Run servers from a scratch directory so logs and metrics stay out of the repo
+    with tempfile.TemporaryDirectory() as cwd:
+        imported = measure_import(env, cwd)
+        results = {
+            "lazy": measure_server(env, cwd, prewarm=False, requests=args.requests),
+            "prewarm": measure_server(env, cwd, prewarm=True, requests=args.requests),
+        }
+
+    print("=" * 60)
+    print(f"Startup benchmark ({args.config})")
+    print("=" * 60)
+    print(f"import app.main: {imported['import_s'] * 1000:8.1f} ms   torch loaded: {imported['torch_loaded']}")
+    for mode, result in results.items():
+        print(f"\n[{mode}] cold start (process start -> /health): {result['cold_start_s'] * 1000:8.1f} ms")
+        for i, request in enumerate(result["requests"], 1):
+            ttfb = f"{request['ttfb_s'] * 1000:8.1f} ms" if request["ttfb_s"] is not None else "     n/a"
+            print(f"  request {i}: TTFB {ttfb}   total {request['total_s'] * 1000:8.1f} ms")
+    print()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
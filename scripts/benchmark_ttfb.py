@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Measure time-to-first-byte of the chat pipeline against a local fake LLM server"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(Path(__file__).parent))
+
+# The fake server does not check the key, but OpenAIClient requires one
+os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+
+from app.core.agent_config import AgentConfig
+from app.use_cases.base.simple_agent import SimpleAgent
+from fake_llm_server import create_app, start_in_thread
+
+
+async def measure_agent(agent: SimpleAgent, runs: int):
+    """Return lists of (ttfb, total) seconds for process_message"""
+    ttfbs, totals = [], []
+    for i in range(runs):
+        start = time.perf_counter()
+        first = None
+        async for _ in agent.process_message("Còn vé đi Hải Phòng không?", conversation_id=f"ttfb-{i}"):
+            if first is None:
+                first = time.perf_counter() - start
+        ttfbs.append(first)
+        totals.append(time.perf_counter() - start)
+    return ttfbs, totals
+
+
+async def measure_non_streaming(agent: SimpleAgent, runs: int):
+    """Previous behaviour: the first byte is sent only after the full completion"""
+    totals = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await agent.client.generate_response(
+            prompt=[{"role": "user", "content": "Còn vé đi Hải Phòng không?"}],
+            system_instruction=agent.system_prompt
+        )
+        totals.append(time.perf_counter() - start)
+    return totals
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    base_url = start_in_thread(create_app(first_token_ms=args.first_token_ms, token_ms=args.token_ms))
+    config = AgentConfig(
+        agent={"name": "Benchmark", "description": "TTFB benchmark"},
+        memory={"enabled": False},
+        model={"base_url": base_url}
+    )
+    agent = SimpleAgent(config)
+
+    ttfbs, totals = await measure_agent(agent, args.runs)
+    non_streaming = await measure_non_streaming(agent, args.runs)
+
+    mean = lambda values: sum(values) / len(values) * 1000
+    print("=" * 60)
+    print(f"TTFB (fake LLM: first token {args.first_token_ms} ms, {args.token_ms} ms/token)")
+    print("=" * 60)
+    print(f"Streaming     TTFB: {mean(ttfbs):8.1f} ms   total: {mean(totals):8.1f} ms")
+    print(f"Non-streaming TTFB: {mean(non_streaming):8.1f} ms   (= total)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
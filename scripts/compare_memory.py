@@ -27,13 +27,13 @@ async def main():
     print("Creating agent with memory...")
     config_with_memory = config.model_copy(deep=True)
     config_with_memory.memory.enabled = True
-    agent_with_memory = create_agent(config_with_memory)
+    agent_with_memory = create_agent(config=config_with_memory)
     
     # Create agent without memory
     print("Creating agent without memory...")
     config_without_memory = config.model_copy(deep=True)
     config_without_memory.memory.enabled = False
-    agent_without_memory = create_agent(config_without_memory)
+    agent_without_memory = create_agent(config=config_without_memory)
     
     # Test queries
     test_queries = [
@@ -44,18 +44,20 @@ async def main():
     
     comparator = ResponseComparator()
     
-    for i, query in enumerate(test_queries, 1):
+    # Both arms of each query run concurrently; queries run concurrently too
+    batch = await comparator.compare_batch(
+        agent_with_memory=agent_with_memory,
+        agent_without_memory=agent_without_memory,
+        queries=test_queries,
+        concurrency=len(test_queries)
+    )
+    
+    for i, results in enumerate(batch['results'], 1):
         print(f"\n{'=' * 60}")
         print(f"Test {i}/{len(test_queries)}")
-        print(f"Query: {query}")
+        print(f"Query: {results['query']}")
         print(f"{'=' * 60}\n")
         
-        results = await comparator.compare_responses(
-            agent_with_memory=agent_with_memory,
-            agent_without_memory=agent_without_memory,
-            query=query
-        )
-        
         print("Response WITH memory:")
         print(f"  Time: {results['with_memory'].get('response_time', 'N/A')}s")
         print(f"  Cases used: {results['with_memory'].get('memory_cases_used', 0)}")
@@ -75,9 +77,19 @@ async def main():
             print(f"  Responses are different: {comp.get('responses_are_different', False)}")
         print()
     
+    summary = batch['summary']
+    print(f"Batch: {summary['compared']}/{summary['queries']} compared in {summary['wall_time']:.3f}s")
+    if summary['response_time_diff']:
+        diff = summary['response_time_diff']
+        print(f"Time difference: mean {diff['mean']:.3f}s, p50 {diff['p50']:.3f}s, p95 {diff['p95']:.3f}s")
+    print()
+    
+    agent_with_memory.close()
+    agent_without_memory.close()
+    
     # Get statistics
-    from app.evaluation.metrics import EvaluationMetrics
-    metrics = EvaluationMetrics()
+    from app.evaluation.metrics import get_evaluation_metrics
+    metrics = get_evaluation_metrics()
     stats = metrics.get_statistics()
     
     print("=" * 60)
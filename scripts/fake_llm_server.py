@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""Local fake OpenAI-compatible chat completions server for benchmarks (no OpenAI calls)"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+DEFAULT_REPLY = (
+    "Dạ, nhà xe Sơn Hải còn vé chuyến Hà Nội đi Hải Phòng lúc tám giờ sáng mai. "
+    "Anh chị muốn đặt mấy vé ạ?"
+)
+
+
+def create_app(
+    reply: str = DEFAULT_REPLY,
+    first_token_ms: float = 300.0,
+    token_ms: float = 20.0,
+    latency_sigma: float = 0.0,
+    tool_calls: int = 0,
+    error_rate: float = 0.0,
+    error_status: int = 429,
+    slow_rate: float = 0.0,
+    slow_ms: float = 0.0,
+    rpm_limit: int = 0,
+    tpm_limit: int = 0,
+    seed: Optional[int] = None
+) -> FastAPI:
+    """
+    Create fake server app
+
+    Args:
+        reply: Assistant text, streamed word by word
+        first_token_ms: Delay before the first chunk (or the whole non-streamed response)
+        token_ms: Delay between streamed chunks
+        latency_sigma: If > 0, each first-token delay is drawn from a lognormal with
+            median first_token_ms and this sigma (0 = fixed delay)
+        tool_calls: If > 0 and the request has tools, answer a user turn with this
+            many calls to the first tool (streamed as argument fragments)
+        error_rate: Fraction of requests answered with error_status
+        error_status: HTTP status for injected errors (429, 503, ...)
+        slow_rate: Fraction of requests whose first token is delayed by slow_ms (tail latency)
+        slow_ms: Extra first-token delay for slow requests
+        rpm_limit: Requests per minute before answering 429 (0 = unlimited); sends x-ratelimit-* headers
+        tpm_limit: Tokens per minute (prompt chars / 4 + max_tokens) before answering 429 (0 = unlimited)
+        seed: Random seed for error/slow injection
+
+    Returns:
+        FastAPI app serving POST /v1/chat/completions
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.errors = 0
+    app.state.rate_limited = 0
+    rng = random.Random(seed)
+    # Continuously refilling quotas, as OpenAI enforces them
+    quota = {"requests": float(rpm_limit), "tokens": float(tpm_limit), "updated": time.monotonic()}
+
+    def take_quota(body: Dict[str, Any]) -> Dict[str, str]:
+        """Consume quota for a request; returns rate limit headers ("retry-after" set if over quota)"""
+        if not rpm_limit and not tpm_limit:
+            return {}
+        now = time.monotonic()
+        elapsed, quota["updated"] = now - quota["updated"], now
+        quota["requests"] = min(rpm_limit, quota["requests"] + elapsed * rpm_limit / 60)
+        quota["tokens"] = min(tpm_limit, quota["tokens"] + elapsed * tpm_limit / 60)
+        chars = sum(len(str(m.get("content") or "")) for m in body.get("messages") or [])
+        cost = chars // 4 + (body.get("max_tokens") or 0)
+
+        headers: Dict[str, str] = {}
+        wait = 0.0
+        for name, limit, amount in (("requests", rpm_limit, 1), ("tokens", tpm_limit, cost)):
+            if not limit:
+                continue
+            if quota[name] < amount:
+                wait = max(wait, (amount - quota[name]) * 60 / limit)
+            headers[f"x-ratelimit-limit-{name}"] = str(limit)
+        if wait:
+            headers["retry-after-ms"] = str(int(wait * 1000) + 1)
+        else:
+            for name, amount in (("requests", 1), ("tokens", cost)):
+                quota[name] -= amount
+        for name, limit in (("requests", rpm_limit), ("tokens", tpm_limit)):
+            if limit:
+                headers[f"x-ratelimit-remaining-{name}"] = str(max(0, int(quota[name])))
+                headers[f"x-ratelimit-reset-{name}"] = f"{(limit - quota[name]) * 60 / limit:.3f}s"
+        return headers
+
+    def chunk(model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        body = {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body, ensure_ascii=False)}\n\n"
+
+    # Prompt prefixes seen so far, for simulated provider-side prompt caching
+    seen_prefixes: set = set()
+
+    def usage_for(body: Dict[str, Any], completion_tokens: int) -> Dict[str, Any]:
+        """
+        Usage with cached_tokens as OpenAI reports them: the longest previously
+        seen message prefix, counted only for prompts of 1024+ tokens and in
+        128-token steps (tokens estimated as chars / 4)
+        """
+        h = hashlib.sha1()
+        chars = cached_chars = 0
+        for message in (body.get("tools") or []) + (body.get("messages") or []):
+            text = json.dumps(message, ensure_ascii=False, sort_keys=True)
+            h.update(text.encode("utf-8"))
+            chars += len(text)
+            digest = h.hexdigest()
+            if digest in seen_prefixes:
+                cached_chars = chars
+            seen_prefixes.add(digest)
+        prompt_tokens = chars // 4
+        cached_tokens = (cached_chars // 4) // 128 * 128 if prompt_tokens >= 1024 else 0
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+
+    def planned_tool_calls(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        tools = body.get("tools") or []
+        messages = body.get("messages") or []
+        if not tool_calls or not tools or not messages or messages[-1].get("role") != "user":
+            return []
+        name = tools[0]["function"]["name"]
+        return [
+            {"id": f"call_{uuid.uuid4().hex[:8]}", "name": name, "arguments": json.dumps({"n": i})}
+            for i in range(tool_calls)
+        ]
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        model = body.get("model", "fake")
+        quota_headers = take_quota(body)
+        if "retry-after-ms" in quota_headers:
+            app.state.rate_limited += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers=quota_headers
+            )
+        if error_rate and rng.random() < error_rate:
+            app.state.errors += 1
+            return JSONResponse(
+                {"error": {"message": "Injected error", "type": "fake_error", "code": error_status}},
+                status_code=error_status
+            )
+        base_ms = first_token_ms * rng.lognormvariate(0.0, latency_sigma) if latency_sigma else first_token_ms
+        delay_ms = base_ms + (slow_ms if slow_rate and rng.random() < slow_rate else 0.0)
+        calls = planned_tool_calls(body)
+        words = reply.split(" ")
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay_ms / 1000 + token_ms * len(words) / 1000)
+            message: Dict[str, Any] = {"role": "assistant", "content": None if calls else reply}
+            if calls:
+                message["tool_calls"] = [
+                    {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                    for c in calls
+                ]
+            return JSONResponse({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if calls else "stop"}],
+                "usage": usage_for(body, len(words)),
+            }, headers=quota_headers)
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+        usage = usage_for(body, len(words))
+
+        async def stream():
+            await asyncio.sleep(delay_ms / 1000)
+            if calls:
+                for index, call in enumerate(calls):
+                    yield chunk(model, {"tool_calls": [{
+                        "index": index, "id": call["id"], "type": "function",
+                        "function": {"name": call["name"], "arguments": ""},
+                    }]})
+                    # Arguments arrive in two fragments
+                    half = len(call["arguments"]) // 2
+                    for part in (call["arguments"][:half], call["arguments"][half:]):
+                        await asyncio.sleep(token_ms / 1000)
+                        yield chunk(model, {"tool_calls": [{"index": index, "function": {"arguments": part}}]})
+                yield chunk(model, {}, "tool_calls")
+            else:
+                for i, word in enumerate(words):
+                    if i:
+                        await asyncio.sleep(token_ms / 1000)
+                    yield chunk(model, {"content": word if i == 0 else f" {word}"})
+                yield chunk(model, {}, "stop")
+            if include_usage:
+                final = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream", headers=quota_headers)
+
+    return app
+
+
+def free_port() -> int:
+    """Pick an unused local TCP port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_in_thread(app: FastAPI, port: Optional[int] = None) -> str:
+    """
+    Serve app from a daemon thread
+
+    Returns:
+        Base URL for OpenAIClient (http://127.0.0.1:<port>/v1)
+    """
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--first-token-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=20.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="Lognormal sigma of the first-token delay")
+    parser.add_argument("--tool-calls", type=int, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=429)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Requests per minute before 429 (0 = unlimited)")
+    parser.add_argument("--tpm-limit", type=int, default=0, help="Tokens per minute before 429 (0 = unlimited)")
+    args = parser.parse_args()
+
+    app = create_app(
+        first_token_ms=args.first_token_ms,
+        token_ms=args.token_ms,
+        latency_sigma=args.latency_sigma,
+        tool_calls=args.tool_calls,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        rpm_limit=args.rpm_limit,
+        tpm_limit=args.tpm_limit
+    )
+    print(f"Fake LLM server: OPENAI_BASE_URL=http://127.0.0.1:{args.port}/v1")
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()